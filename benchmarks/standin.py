@@ -0,0 +1,326 @@
+"""
+Локальная подмена Telegram для сравнения клиентов (benchmarks/test_clients.py).
+
+Сетевой уровень каждой библиотеки — MTProtoSender в Telethon и Session в
+Pyrogram — заменяется объектом, который отвечает на запросы готовыми
+TL-объектами и присылает ответ бота обычным обновлением (UpdateNewMessage).
+Все остальное работает как с настоящим сервером: файл сессии (SQLite),
+кэш сущностей, разбор обновлений, диспетчер событий, наш адаптер, — так
+что замеры показывают накладные расходы самих клиентов без сети.
+
+Бот отвечает на каждое сообщение одним сообщением с inline-кнопкой.
+"""
+import asyncio
+import itertools
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+SELF_ID = 100500
+BOT_ID = 200600
+BOT_USERNAME = "jugru_conf_bot"
+ACCESS_HASH = 4242
+AUTH_KEY = bytes(range(256))
+DC = (2, "127.0.0.1", 443)
+
+
+class StandInServer:
+    """Состояние «сервера»: общая нумерация сообщений чата и pts, ответы бота."""
+
+    def __init__(self, reply_delay: float = 0.0):
+        self.reply_delay = reply_delay
+        self.message_ids = itertools.count(1)
+        self.pts = 1
+        self.requests = 0
+
+    def next_pts(self) -> int:
+        self.pts += 1
+        return self.pts
+
+    @staticmethod
+    def bot_reply(text: str) -> str:
+        return f"Ответ на «{text}»"
+
+    async def deliver(self, push, updates) -> None:
+        if self.reply_delay:
+            await asyncio.sleep(self.reply_delay)
+        await push(updates)
+
+
+# --- Telethon ---
+
+
+class TelethonSender:
+    """Замена telethon.network.MTProtoSender: отвечает на запросы без сети."""
+
+    server: StandInServer | None = None
+
+    def __init__(self, auth_key, *, updates_queue=None, **kwargs):
+        self.auth_key = auth_key
+        self._updates_queue = updates_queue
+        self._connected = False
+        self._tasks: set[asyncio.Task] = set()
+
+    async def connect(self, connection) -> bool:
+        if self._connected:
+            return False
+        if self.auth_key is None or not self.auth_key.key:
+            from telethon.crypto import AuthKey
+
+            self.auth_key = AuthKey(AUTH_KEY)
+        self._connected = True
+        return True
+
+    def is_connected(self) -> bool:
+        return self._connected
+
+    async def disconnect(self) -> None:
+        self._connected = False
+        for task in self._tasks:
+            task.cancel()
+
+    @property
+    def disconnected(self):
+        future = asyncio.get_running_loop().create_future()
+        if not self._connected:
+            future.set_result(None)
+        return future
+
+    def send(self, request, ordered=False):
+        future = asyncio.get_running_loop().create_future()
+        try:
+            future.set_result(self._answer(request))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def _answer(self, request):
+        from telethon.tl import functions, types
+
+        server = self.server
+        server.requests += 1
+        while isinstance(request, (functions.InvokeWithLayerRequest, functions.InvokeWithoutUpdatesRequest)):
+            request = request.query
+        now = datetime.now(timezone.utc)  # Telethon разбирает даты в datetime
+        if isinstance(request, functions.InitConnectionRequest):
+            return None  # результат GetConfig клиент при подключении не читает
+        if isinstance(request, functions.users.GetUsersRequest):
+            return [telethon_user(SELF_ID, is_self=True)]
+        if isinstance(request, functions.updates.GetStateRequest):
+            return types.updates.State(pts=server.pts, qts=0, date=now, seq=0, unread_count=0)
+        if isinstance(request, functions.updates.GetDifferenceRequest):
+            return types.updates.DifferenceEmpty(date=now, seq=0)
+        if isinstance(request, functions.contacts.ResolveUsernameRequest):
+            return telethon_wire(
+                types.contacts.ResolvedPeer(
+                    peer=types.PeerUser(BOT_ID), chats=[], users=[telethon_user(BOT_ID)]
+                )
+            )
+        if isinstance(request, functions.PingRequest):
+            return types.Pong(msg_id=0, ping_id=request.ping_id)
+        if isinstance(request, functions.messages.SendMessageRequest):
+            sent = telethon_wire(
+                types.UpdateShortSentMessage(
+                    id=next(server.message_ids), pts=server.next_pts(), pts_count=1, date=now, out=True
+                )
+            )
+            # Как MTProtoSender._store_own_updates: свой pts клиент узнает из ответа
+            sent._self_outgoing = True
+            self._updates_queue.put_nowait(sent)
+            self._reply(request.message)
+            return sent
+        raise NotImplementedError(type(request).__name__)
+
+    def _reply(self, text: str) -> None:
+        from telethon.tl import types
+
+        server = self.server
+        message = types.Message(
+            id=next(server.message_ids),
+            peer_id=types.PeerUser(BOT_ID),
+            date=datetime.now(timezone.utc),
+            message=server.bot_reply(text),
+            reply_markup=types.ReplyInlineMarkup(
+                rows=[types.KeyboardButtonRow(buttons=[types.KeyboardButton("Дальше", types.InlineButtonTypeCallback(data=b"next"))])]
+            ),
+        )
+        updates = telethon_wire(
+            types.Updates(
+                updates=[types.UpdateNewMessage(message=message, pts=server.next_pts(), pts_count=1)],
+                users=[telethon_user(BOT_ID)],
+                chats=[],
+                date=datetime.now(timezone.utc),
+                seq=0,
+            )
+        )
+
+        async def push(updates):
+            self._updates_queue.put_nowait(updates)
+
+        task = asyncio.ensure_future(server.deliver(push, updates))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+
+def telethon_wire(obj):
+    """Сериализация и разбор, как при приеме с сервера: это тоже работа клиента."""
+    from telethon.extensions import BinaryReader
+
+    with BinaryReader(bytes(obj)) as reader:
+        return reader.tgread_object()
+
+
+def telethon_user(user_id: int, is_self: bool = False):
+    from telethon.tl import types
+
+    return types.User(
+        id=user_id,
+        is_self=is_self,
+        bot=user_id == BOT_ID,
+        bot_info_version=1 if user_id == BOT_ID else None,
+        access_hash=ACCESS_HASH,
+        first_name="Бот" if user_id == BOT_ID else "Тестер",
+        username=BOT_USERNAME if user_id == BOT_ID else None,
+    )
+
+
+async def prepare_telethon_session(path) -> None:
+    from telethon.crypto import AuthKey
+    from telethon.sessions import SQLiteSession
+
+    session = SQLiteSession(str(path))
+    session.set_dc(*DC)
+    session.auth_key = AuthKey(AUTH_KEY)
+    session.save()
+    session.close()
+
+
+# --- Pyrogram ---
+
+
+class PyrogramSession:
+    """Замена pyrogram.session.Session: отвечает на запросы без сети."""
+
+    server: StandInServer | None = None
+
+    def __init__(self, client, dc_id, auth_key, test_mode, is_media=False, is_cdn=False):
+        self.client = client
+        self._tasks: set[asyncio.Task] = set()
+
+    async def start(self) -> None:
+        pass
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+
+    async def invoke(self, query, retries=0, timeout=0, sleep_threshold=0):
+        from pyrogram import raw
+
+        server = self.server
+        server.requests += 1
+        while isinstance(query, (raw.functions.InvokeWithLayer, raw.functions.InvokeWithoutUpdates)):
+            query = query.query
+        now = int(time.time())
+        if isinstance(query, raw.functions.updates.GetState):
+            return raw.types.updates.State(pts=server.pts, qts=0, date=now, seq=0, unread_count=0)
+        if isinstance(query, raw.functions.contacts.ResolveUsername):
+            return pyrogram_wire(
+                raw.types.contacts.ResolvedPeer(
+                    peer=raw.types.PeerUser(user_id=BOT_ID), chats=[], users=[pyrogram_user(BOT_ID)]
+                )
+            )
+        if isinstance(query, raw.functions.Ping):
+            return raw.types.Pong(msg_id=0, ping_id=query.ping_id)
+        if isinstance(query, raw.functions.messages.SendMessage):
+            sent = pyrogram_wire(
+                raw.types.UpdateShortSentMessage(
+                    id=next(server.message_ids), pts=server.next_pts(), pts_count=1, date=now, out=True
+                )
+            )
+            self._reply(query.message)
+            return sent
+        raise NotImplementedError(type(query).__name__)
+
+    def _reply(self, text: str) -> None:
+        from pyrogram import raw
+
+        server = self.server
+        message = raw.types.Message(
+            id=next(server.message_ids),
+            peer_id=raw.types.PeerUser(user_id=BOT_ID),
+            date=int(time.time()),
+            message=server.bot_reply(text),
+            reply_markup=raw.types.ReplyInlineMarkup(
+                rows=[
+                    raw.types.KeyboardButtonRow(
+                        buttons=[raw.types.KeyboardButtonCallback(text="Дальше", data=b"next")]
+                    )
+                ]
+            ),
+        )
+        updates = pyrogram_wire(
+            raw.types.Updates(
+                updates=[raw.types.UpdateNewMessage(message=message, pts=server.next_pts(), pts_count=1)],
+                users=[pyrogram_user(BOT_ID)],
+                chats=[],
+                date=int(time.time()),
+                seq=0,
+            )
+        )
+        task = asyncio.ensure_future(server.deliver(self.client.handle_updates, updates))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+
+def pyrogram_wire(obj):
+    from io import BytesIO
+
+    from pyrogram.raw.core import TLObject
+
+    return TLObject.read(BytesIO(obj.write()))
+
+
+def pyrogram_user(user_id: int):
+    from pyrogram import raw
+
+    return raw.types.User(
+        id=user_id,
+        is_self=user_id == SELF_ID,
+        bot=user_id == BOT_ID,
+        bot_info_version=1 if user_id == BOT_ID else None,
+        access_hash=ACCESS_HASH,
+        first_name="Бот" if user_id == BOT_ID else "Тестер",
+        username=BOT_USERNAME if user_id == BOT_ID else None,
+    )
+
+
+async def prepare_pyrogram_session(path) -> None:
+    from pyrogram.storage import FileStorage
+
+    storage = FileStorage(path.stem, path.parent)
+    await storage.open()
+    await storage.dc_id(DC[0])
+    await storage.api_id(1)
+    await storage.test_mode(False)
+    await storage.auth_key(AUTH_KEY)
+    await storage.date(0)
+    await storage.user_id(SELF_ID)
+    await storage.is_bot(False)
+    await storage.save()
+    await storage.close()
+
+
+@contextmanager
+def stand_in(server: StandInServer):
+    """Подменяет сетевой уровень обеих библиотек на время блока."""
+    import pyrogram.methods.auth.connect as pyrogram_connect
+    import telethon.client.telegrambaseclient as telethon_base
+
+    TelethonSender.server = PyrogramSession.server = server
+    saved = telethon_base.MTProtoSender, pyrogram_connect.Session
+    telethon_base.MTProtoSender, pyrogram_connect.Session = TelethonSender, PyrogramSession
+    try:
+        yield server
+    finally:
+        telethon_base.MTProtoSender, pyrogram_connect.Session = saved
@@ -0,0 +1,80 @@
+"""
+Синтетически увеличенные сценарии для бенчмарков: тысячи шагов, вложенные
+REPEAT с UNTIL_REPLY и многоабзацные ответы с плейсхолдерами — как
+scenarios.csv через год-другой роста.
+"""
+import csv
+import io
+
+COLUMNS = ["Сценарий", "Шаги", "Действие юзера", "Ответ бота", "Что проверяем", "Как запишем ошибку"]
+
+PARAGRAPH = (
+    "Доклад начнется в большом зале сразу после перерыва. "
+    "Спикер расскажет, как команда перевела сервис на новую архитектуру, "
+    "какие метрики они смотрят каждый день и что пошло не так в первый релиз."
+)
+
+
+def long_reply(n: int, paragraphs: int = 6) -> str:
+    """
+    Ответ бота из нескольких абзацев с двумя плейсхолдерами, как в scenarios.csv;
+    первый абзац уникален, чтобы шаблоны не совпадали в кэше.
+    """
+    head = f"Шаг {n}. Привет, <username>! Вот что нашлось по твоему запросу:"
+    tail = "Напомню о начале за <минут> минут."
+    return "\n\n".join([head, *[PARAGRAPH] * (paragraphs - 2), tail])
+
+
+def _row(name: str, step: int, action: str, reply: str = "") -> dict:
+    return {
+        "Сценарий": name,
+        "Шаги": step,
+        "Действие юзера": action,
+        "Ответ бота": reply,
+        "Что проверяем": "Бот ответил",
+        "Как запишем ошибку": f"Шаг {step} не прошел",
+    }
+
+
+def flat_rows(name: str = "flat", steps: int = 2000, paragraphs: int = 6) -> list[dict]:
+    """Длинный линейный сценарий: текст, кнопки и варианты сообщений без циклов."""
+    rows = [_row(name, 1, "/start", long_reply(1, paragraphs))]
+    for step in range(2, steps + 1):
+        if step % 3 == 0:
+            action = f"Нажимает кнопку 'Дальше {step}'"
+        elif step % 7 == 0:
+            action = f"Отправляет одно из:\n1. Вариант {step}\n2. Другой {step}"
+        else:
+            action = f"Сообщение {step}"
+        rows.append(_row(name, step, action, long_reply(step, paragraphs)))
+    return rows
+
+
+def nested_rows(
+    name: str = "nested", blocks: int = 20, depth: int = 3, repeat: int = 2, paragraphs: int = 6
+) -> list[dict]:
+    """
+    Блоки из трех шагов, обернутые в depth вложенных REPEAT и UNTIL_REPLY:
+    каждый блок выполняется 3 * (repeat + 1) ** depth раз.
+    """
+    rows = [_row(name, 1, "/start", long_reply(1, paragraphs))]
+    step = 2
+    for _ in range(blocks):
+        start = step
+        for action in ("Сообщение {n}", "Нажимает кнопку 'Дальше {n}'", "Сообщение {n} еще раз"):
+            rows.append(_row(name, step, action.format(n=step), long_reply(step, paragraphs)))
+            step += 1
+        for _ in range(depth):
+            rows.append(_row(name, step, f"REPEAT {start}-{step - 1} {repeat}"))
+            step += 1
+        rows.append(_row(name, step, f"UNTIL_REPLY {start} 'Блок {start} готов'"))
+        step += 1
+    return rows
+
+
+def to_csv(rows: list[dict]) -> str:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=COLUMNS)
+    writer.writeheader()
+    writer.writerows(rows)
+    return buffer.getvalue()
@@ -0,0 +1,203 @@
+"""
+pytest-benchmark: интерпретатор сценариев (BotTester.run_scenario),
+smart_compare, загрузка CSV и пропускная способность пула на реальном
+scenarios.csv и на синтетически увеличенных сценариях. Бот — симулятор без
+задержек, ответы через get_response (без ожидания «тишины» коллектора), так
+что меряется только наш код. Кроме ops/sec в extra_info пишутся пиковая и
+удержанная память (tracemalloc) за один прогон.
+
+Зависимости — requirements-dev.txt. Запуск из корня репозитория
+(результаты сохраняются по коммитам в .benchmarks/):
+    python -m pytest benchmarks --benchmark-autosave
+    python -m pytest benchmarks --benchmark-compare --benchmark-compare-fail=mean:20%
+"""
+import asyncio
+import json
+import logging
+import re
+import subprocess
+import sys
+import tracemalloc
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from benchmarks.synthetic import flat_rows, long_reply, nested_rows, to_csv  # noqa: E402
+from src.app import BotTester, logger, run_scenarios_concurrently, scenario_repository  # noqa: E402
+from src.config import BASE_DIR  # noqa: E402
+from src.matcher import PLACEHOLDER_RE, TemplateMatcher  # noqa: E402
+from src.pool import SessionPool  # noqa: E402
+from src.scenarios import ScenarioRepository, compile_scenario  # noqa: E402
+from src.simulator import simulator_for  # noqa: E402
+
+
+@pytest.fixture(scope="module", autouse=True)
+def quiet_logger():
+    level = logger.level
+    logger.setLevel(logging.WARNING)
+    yield
+    logger.setLevel(level)
+
+
+@pytest.fixture(scope="module")
+def loop():
+    loop = asyncio.new_event_loop()
+    yield loop
+    loop.close()
+
+
+def record_memory(benchmark, func) -> None:
+    """Один прогон под tracemalloc: пик и остаток памяти в КиБ."""
+    tracemalloc.start()
+    try:
+        func()
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    benchmark.extra_info["peak_kib"] = round(peak / 1024, 1)
+    benchmark.extra_info["retained_kib"] = round(current / 1024, 1)
+
+
+def programs_for(case: str):
+    if case == "scenarios.csv":
+        return list(scenario_repository.snapshot().programs.values())
+    rows = flat_rows(steps=1000) if case == "flat-1000" else nested_rows(blocks=20, depth=3)
+    return [compile_scenario(case, rows)]
+
+
+@pytest.mark.parametrize("case", ["scenarios.csv", "flat-1000", "nested-3x20"])
+def test_run_scenario(benchmark, loop, case: str) -> None:
+    programs = programs_for(case)
+    adapter = simulator_for(programs).adapter(events=False)
+    steps = []
+
+    def count(event: dict) -> None:
+        if event["event"] == "step":
+            steps.append(event["status"])
+
+    async def run_all() -> bool:
+        results = [
+            await BotTester(adapter, listeners=[count]).run_scenario(p.name, p) for p in programs
+        ]
+        return all(results)
+
+    def run() -> bool:
+        return loop.run_until_complete(run_all())
+
+    record_memory(benchmark, run)
+    executed = len(steps)
+    assert set(steps) == {"passed"}
+    benchmark.extra_info["steps"] = executed
+    assert benchmark.pedantic(run, rounds=5, warmup_rounds=1) is True
+
+
+def legacy_compare(expected, actual) -> bool:
+    """Исходный BotTester.smart_compare: regex из шаблона на каждый вызов."""
+    if not expected:
+        return True
+    expected_l = str(expected).strip().lower()
+    actual_l = str(actual).strip().lower()
+    if expected_l == actual_l:
+        return True
+    pattern = re.escape(expected_l).replace(r"\<", "<").replace(r"\>", ">")
+    pattern = re.sub(r"<.*?>", r".*", pattern)
+    return re.search(pattern, actual_l, re.DOTALL) is not None
+
+
+@pytest.mark.parametrize("impl", ["matcher", "legacy"])
+@pytest.mark.parametrize("case", ["scenarios.csv", "long-replies"])
+def test_smart_compare(benchmark, case: str, impl: str) -> None:
+    if case == "scenarios.csv":
+        templates = [
+            step.expected_reply
+            for program in scenario_repository.snapshot().programs.values()
+            for step in program.instructions
+            if step.expected_reply
+        ]
+    else:
+        templates = [long_reply(n, paragraphs=12) for n in range(200)]
+    pairs = [(t, PLACEHOLDER_RE.sub("Значение", t) + "\n\n(кнопки ниже)") for t in templates]
+    compare = BotTester(matcher=TemplateMatcher()).smart_compare if impl == "matcher" else legacy_compare
+
+    def run() -> bool:
+        return all(compare(expected, actual) for expected, actual in pairs)
+
+    record_memory(benchmark, run)
+    benchmark.extra_info["templates"] = len(pairs)
+    assert benchmark(run) is True
+
+
+@pytest.mark.parametrize("case", ["scenarios.csv", "enlarged"])
+def test_load_scenarios(benchmark, tmp_path, case: str) -> None:
+    path = scenario_repository.path
+    if case == "enlarged":
+        path = tmp_path / "scenarios.csv"
+        rows = [*flat_rows("flat", steps=2000), *nested_rows("nested", blocks=200)]
+        path.write_text(to_csv(rows), encoding="utf-8")
+
+    def run() -> int:
+        # Новый репозиторий — холодная загрузка: чтение, разбор и компиляция
+        return len(ScenarioRepository(path).snapshot().programs)
+
+    record_memory(benchmark, run)
+    assert benchmark(run) > 0
+
+
+LOADERS = {
+    "pandas": """
+import pandas as pd
+df = pd.read_csv(SCENARIO_FILE).dropna(subset=["Сценарий"])
+groups = {name: steps.to_dict("records") for name, steps in df.groupby("Сценарий")}
+""",
+    "stdlib": """
+from src.scenarios import load_steps
+groups = load_steps(SCENARIO_FILE)
+""",
+}
+
+COLD_START = """
+import json, resource
+from src.config import SCENARIO_FILE
+{loader}
+print(json.dumps({{"rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}}))
+"""
+
+
+@pytest.mark.parametrize("loader", sorted(LOADERS))
+def test_cold_start(benchmark, loader: str) -> None:
+    """Импорт и загрузка scenarios.csv в новом процессе: pandas против stdlib-загрузчика."""
+    pytest.importorskip("resource")
+    command = [sys.executable, "-c", COLD_START.format(loader=LOADERS[loader])]
+
+    def run() -> dict:
+        out = subprocess.run(command, cwd=BASE_DIR, capture_output=True, text=True, check=True)
+        return json.loads(out.stdout)
+
+    stats = benchmark.pedantic(run, rounds=5, warmup_rounds=1)
+    benchmark.extra_info["peak_rss_kib"] = stats["rss_kb"]
+
+
+@pytest.mark.parametrize("users", [10, 50])
+def test_pool_throughput(benchmark, loop, users: int) -> None:
+    """Сценарии scenarios.csv через SessionPool с users «пользователями» симулятора."""
+    programs = list(scenario_repository.snapshot().programs.values())
+    batch = [(p.name, p) for p in programs] * max(1, 200 // len(programs))
+
+    async def run_batch() -> bool:
+        bot = simulator_for(programs, seed=1)
+        pool = SessionPool([bot.adapter(f"user{i}", events=False) for i in range(users)])
+        await pool.start()
+        try:
+            results = await run_scenarios_concurrently(pool, batch)
+        finally:
+            await pool.stop()
+        return all(r.success for r in results)
+
+    def run() -> bool:
+        return loop.run_until_complete(run_batch())
+
+    assert benchmark.pedantic(run, rounds=3, warmup_rounds=1) is True
+    benchmark.extra_info["scenarios"] = len(batch)
+    if benchmark.stats:  # нет при --benchmark-disable
+        benchmark.extra_info["scenarios_per_min"] = round(len(batch) / benchmark.stats.stats.mean * 60)
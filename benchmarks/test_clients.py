@@ -0,0 +1,165 @@
+"""
+Сравнение клиентов Telegram: TelegramConversationAdapter (Telethon) и
+PyrogramConversationAdapter (Pyrogram) против локальной подмены сервера
+(benchmarks/standin.py). Сеть исключена, поэтому разница — это накладные
+расходы библиотек: открытие файла сессии и подключение, разбор ответов и
+обновлений, диспетчер событий. В extra_info — пиковая и удержанная память
+(tracemalloc) и число запросов к «серверу».
+
+Цикл событий работает в отдельном потоке: стек там неглубокий, как у
+раннера под uvicorn. Это важно для Pyrogram — его SQLite-хранилище сессии
+вызывает inspect.stack() на каждое чтение поля, и под глубоким стеком
+pytest подключение выглядело бы в разы медленнее, чем в работе.
+
+Запуск из корня репозитория:
+    python -m pytest benchmarks/test_clients.py --benchmark-group-by=func
+"""
+import asyncio
+import logging
+import threading
+import tracemalloc
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+pytest.importorskip("pyrogram")
+
+import src.app  # noqa: E402
+import src.pyrogram_adapter  # noqa: E402
+from benchmarks.standin import (  # noqa: E402
+    BOT_USERNAME,
+    StandInServer,
+    prepare_pyrogram_session,
+    prepare_telethon_session,
+    stand_in,
+)
+from src.app import TelegramConversationAdapter  # noqa: E402
+from src.pyrogram_adapter import PyrogramConversationAdapter  # noqa: E402
+
+CLIENTS = {
+    "telethon": (TelegramConversationAdapter, prepare_telethon_session),
+    # Telethon прямо на SQLite-файле (SESSION_STORAGE=sqlite), без src.sessions
+    "telethon-sqlite": (TelegramConversationAdapter, prepare_telethon_session),
+    "pyrogram": (PyrogramConversationAdapter, prepare_pyrogram_session),
+}
+MESSAGES = 50  # сообщений боту за раунд замера round-trip
+
+
+@pytest.fixture(scope="module", autouse=True)
+def quiet_loggers():
+    loggers = [logging.getLogger(name) for name in ("TestEngine", "pyrogram", "telethon")]
+    levels = [logger.level for logger in loggers]
+    for logger in loggers:
+        logger.setLevel(logging.WARNING)
+    yield
+    for logger, level in zip(loggers, levels):
+        logger.setLevel(level)
+
+
+class LoopThread:
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def _run(self) -> None:
+        asyncio.set_event_loop(self.loop)  # Pyrogram запоминает цикл при создании клиента
+        self.loop.run_forever()
+
+    def run_until_complete(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result(timeout=60)
+
+    def close(self) -> None:
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
+
+
+@pytest.fixture(scope="module")
+def loop():
+    loop = LoopThread()
+    yield loop
+    loop.close()
+
+
+@pytest.fixture
+def server(monkeypatch, client):
+    if client == "telethon-sqlite":
+        monkeypatch.setattr(src.app, "SESSION_STORAGE", "sqlite")
+    for module in (src.app, src.pyrogram_adapter):
+        monkeypatch.setattr(module, "API_ID", 1)
+        monkeypatch.setattr(module, "API_HASH", "standin")
+        monkeypatch.setattr(module, "SEND_RATE", 0)  # меряем клиент, а не наш троттлинг
+    with stand_in(StandInServer()) as server:
+        yield server
+
+
+async def make_adapter(client: str, tmp_path):
+    adapter_class, prepare = CLIENTS[client]
+    session_file = tmp_path / f"{client}.session"
+    if not session_file.exists():
+        await prepare(session_file)
+    return adapter_class(session_file)
+
+
+def record_memory(benchmark, func) -> None:
+    """
+    Один прогон под tracemalloc после прогрева (ленивые импорты и кэши
+    библиотек в замер не попадают): пик и остаток памяти в КиБ.
+    """
+    func()
+    tracemalloc.start()
+    try:
+        func()
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    benchmark.extra_info["peak_kib"] = round(peak / 1024, 1)
+    benchmark.extra_info["retained_kib"] = round(current / 1024, 1)
+
+
+@pytest.mark.parametrize("client", sorted(CLIENTS))
+def test_connect(benchmark, loop, server, tmp_path, client: str) -> None:
+    """Новый адаптер: открытие сессии, подключение, проверка авторизации, отключение."""
+
+    async def cycle() -> bool:
+        adapter = await make_adapter(client, tmp_path)
+        await adapter.connect()
+        authorized = await adapter.is_user_authorized()
+        await adapter.disconnect()
+        return authorized
+
+    def run() -> bool:
+        return loop.run_until_complete(cycle())
+
+    record_memory(benchmark, run)
+    benchmark.extra_info["requests_per_connect"] = server.requests // 2
+    assert benchmark.pedantic(run, rounds=20, warmup_rounds=2) is True
+
+
+@pytest.mark.parametrize("client", sorted(CLIENTS))
+def test_round_trip(benchmark, loop, server, tmp_path, client: str) -> None:
+    """MESSAGES сообщений боту и ответов через conversation подключенного адаптера."""
+    adapter = loop.run_until_complete(make_adapter(client, tmp_path))
+    loop.run_until_complete(adapter.connect())
+
+    async def exchange() -> int:
+        replies = 0
+        async with adapter.conversation(f"@{BOT_USERNAME}", timeout=5) as conv:
+            for n in range(MESSAGES):
+                await conv.send_message(f"Сообщение {n}")
+                response = await conv.get_response()
+                replies += bool(response.buttons) and response.text.startswith("Ответ")
+        return replies
+
+    def run() -> int:
+        return loop.run_until_complete(exchange())
+
+    try:
+        record_memory(benchmark, run)
+        before = server.requests
+        assert benchmark.pedantic(run, rounds=10, warmup_rounds=1) == MESSAGES
+        benchmark.extra_info["messages"] = MESSAGES
+        benchmark.extra_info["requests_per_round"] = (server.requests - before) // 11  # + прогрев
+    finally:
+        loop.run_until_complete(adapter.disconnect())
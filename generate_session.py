@@ -1,6 +1,5 @@
 import asyncio
 import os
-import re
 import sys
 from getpass import getpass
 from pathlib import Path
@@ -16,11 +15,14 @@ from pyrogram.errors import (
     SessionPasswordNeeded,
 )
 
+from src.testdc import get_confirmation_code
+
 # --- ИНСТРУКЦИЯ ---
 # 1. Запустите скрипт: python generate_session.py
 # 2. Введите номер (для Test DC: 9996612023)
 # 3. Введите код (для Test DC: 11111 или вычислится из номера)
 # 4. Если приглашение ">>" не появилось через 5 секунд, нажмите Enter.
+# Пул из нескольких аккаунтов Test DC без вопросов: python -m src.provision --count N
 
 BASE_DIR = Path(__file__).parent.resolve()
 ENV_PATH = BASE_DIR / '.env'
@@ -39,13 +41,6 @@ CONNECT_TIMEOUT = int(os.getenv("TELEGRAM_CONNECT_TIMEOUT", "20"))
 USE_TEST_DC = True  # Переключите в False для реального номера
 DEFAULT_TEST_PHONE = "99966" + "1" + "2023"
 
-
-def get_confirmation_code(phone: str) -> str | None:
-    match = re.match(r"99966(?P<dc>[0-3]{1})(?P<rand_part>[0-9]{4})", phone)
-    if not match:
-        return None
-    return match.group("dc") * 5
-
 SESSION_DIR.mkdir(parents=True, exist_ok=True)
 
 def print_header(title: str) -> None:
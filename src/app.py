@@ -1,25 +1,99 @@
 import logging
 import asyncio
-import re
 import random
+import time
+from contextlib import AsyncExitStack, asynccontextmanager
+from dataclasses import dataclass
+from logging.handlers import RotatingFileHandler
+from pathlib import Path
 from typing import Protocol
 
-import pandas as pd
-from fastapi import FastAPI, HTTPException, Query
-from telethon import TelegramClient
+from fastapi import APIRouter, FastAPI, HTTPException, Query, Request
+from fastapi.responses import HTMLResponse, JSONResponse, Response, StreamingResponse
+from fastapi.templating import Jinja2Templates
+from pydantic import BaseModel
+from telethon import TelegramClient, events
+from telethon.errors import BotResponseTimeoutError
+from telethon.tl.functions import PingRequest
 from src.config import (
     API_ID,
     API_HASH,
     BOT_USERNAME,
+    CASSETTE_FILE,
+    CASSETTE_MODE,
+    CASSETTE_SPEED,
+    CHECKPOINTS_ENABLED,
+    CHECKPOINTS_FILE,
+    CHECKPOINTS_KEEP,
+    CHECKPOINTS_MAX_AGE,
     CONNECTION_RETRIES,
     CONNECT_TIMEOUT,
+    FLOOD_WAIT_MAX,
+    JOB_HISTORY,
+    JOB_QUEUE_SIZE,
+    JOB_WORKERS,
+    KEEPALIVE_INTERVAL,
+    LOG_BACKUP_COUNT,
     LOG_DIR,
+    LOG_MAX_BYTES,
+    NO_REPLY_TIMEOUT,
+    OUTCOMES_FILE,
+    RECONNECT_ATTEMPTS,
+    RECONNECT_BACKOFF_MAX,
+    REPORT_DIR,
+    REPORT_KEEP_RUNS,
+    REPORT_MAX_BYTES,
     REQUEST_TIMEOUT,
+    RESPONSE_HARD_CAP,
+    RESPONSE_SETTLE_MS,
+    RESPONSE_TIMEOUT,
     RETRY_DELAY,
+    RPC_RETRIES,
+    RUN_CONCURRENCY,
+    SCENARIO_DEPENDENCIES_FILE,
     SCENARIO_FILE,
+    SEND_BURST,
+    SEND_RATE,
     SESSION_FILE,
+    SESSION_FILES,
+    SESSION_STORAGE,
+    SSE_HEARTBEAT,
+    STEP_RETRIES,
+    STEP_RETRY_DELAY,
+    TELEGRAM_CLIENT,
     TELEGRAM_DC,
+    VARIANT_LIMIT,
+    VARIANT_PLACEHOLDER_VALUES,
+    VARIANT_SAMPLES,
+    VARIANT_SEED,
 )
+from src import metrics
+from src.buttons import ButtonResolver
+from src.cassette import Cassette, RecordingAdapter, ReplayAdapter
+from src.checkpoints import Checkpoint, CheckpointStore, program_digest
+from src.collector import ResponseCollector, supports_collector
+from src.jobs import COMPLETED, Job, JobManager, QueueFullError
+from src.matcher import TemplateMatcher, default_matcher
+from src.outcomes import MODE_ALL, MODES, OutcomeStore
+from src.pool import CONNECTED, NoSessionError, SessionPool
+from src.reports import RunReport, read_index, read_run
+from src.scenarios import (
+    PressButton,
+    Repeat,
+    ScenarioCompileError,
+    ScenarioProgram,
+    ScenarioRepository,
+    SendOneOf,
+    UntilReply,
+    compile_scenario,
+    dependency_groups,
+    load_dependencies,
+    suite_digest,
+)
+from src.sessions import SessionStore
+from src.stream import format_sse
+from src.throttle import SessionThrottle, ThrottledTelegramClient
+from src.variants import SAMPLE, STRATEGIES, check_expansion, expand_program
 
 # --- НАСТРОЙКА ЛОГГЕРА ---
 logger = logging.getLogger("TestEngine")
@@ -28,12 +102,19 @@ formatter = logging.Formatter("%(asctime)s - %(levelname)s - %(message)s")
 
 
 def setup_file_logging():
-    """Очищает старые логи и готовит файл для новой сессии тестирования."""
+    """
+    Готовит текстовый лог. Файл дописывается и ротируется по размеру, а не
+    очищается на каждый прогон: структурированные результаты — в RunReport.
+    """
     log_file = LOG_DIR / "test_run.log"
-    file_handler = logging.FileHandler(log_file, mode="w", encoding="utf-8")
+    file_handler = RotatingFileHandler(
+        log_file, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT, encoding="utf-8"
+    )
     file_handler.setFormatter(formatter)
 
     if logger.hasHandlers():
+        for handler in logger.handlers:
+            handler.close()
         logger.handlers.clear()
     logger.addHandler(file_handler)
     return log_file
@@ -50,17 +131,36 @@ class ConversationAdapter(Protocol):
 
 
 class TelegramConversationAdapter:
-    def __init__(self):
+    def __init__(self, session_file=SESSION_FILE):
+        self.session_file = session_file
         self.client: TelegramClient | None = None
+        self.throttle = SessionThrottle(
+            self.name,
+            rate=SEND_RATE,
+            burst=SEND_BURST,
+            retries=RPC_RETRIES,
+            max_flood_wait=FLOOD_WAIT_MAX,
+        )
 
-    async def connect(self) -> None:
-        if API_ID is None or not API_HASH:
-            logger.error("ОШИБКА: TELEGRAM_API_ID/TELEGRAM_API_HASH не заданы.")
-            raise Exception("Missing Telegram API credentials")
-        self.client = TelegramClient(
-            str(SESSION_FILE),
+    @property
+    def name(self) -> str:
+        return Path(self.session_file).stem
+
+    def cooldown(self) -> float:
+        return self.throttle.cooldown()
+
+    def _create_client(self) -> TelegramClient:
+        # В памяти ключ читается с диска один раз на процесс, а пишется только при изменении
+        session = (
+            session_store.session(self.session_file)
+            if SESSION_STORAGE == "memory"
+            else str(self.session_file)
+        )
+        client = ThrottledTelegramClient(
+            session,
             API_ID,
             API_HASH,
+            throttle=self.throttle,
             timeout=REQUEST_TIMEOUT,
             connection_retries=CONNECTION_RETRIES,
             retry_delay=RETRY_DELAY,
@@ -68,8 +168,17 @@ class TelegramConversationAdapter:
         if TELEGRAM_DC:
             dc_id, dc_ip, dc_port = TELEGRAM_DC
             logger.info(f"📡 Используем тестовый DC {dc_id} ({dc_ip}:{dc_port}).")
-            self.client.session.set_dc(dc_id, dc_ip, dc_port)
-            self.client.session.save()
+            client.session.set_dc(dc_id, dc_ip, dc_port)
+            client.session.save()
+        return client
+
+    async def connect(self) -> None:
+        if API_ID is None or not API_HASH:
+            logger.error("ОШИБКА: TELEGRAM_API_ID/TELEGRAM_API_HASH не заданы.")
+            raise Exception("Missing Telegram API credentials")
+        # Клиент создается один раз, переподключение использует ту же сессию
+        if self.client is None:
+            self.client = self._create_client()
 
         try:
             await asyncio.wait_for(self.client.connect(), timeout=CONNECT_TIMEOUT)
@@ -80,6 +189,18 @@ class TelegramConversationAdapter:
             )
             raise exc
 
+    def is_connected(self) -> bool:
+        return bool(self.client and self.client.is_connected())
+
+    async def ping(self) -> None:
+        """Легкий RPC-запрос для проверки живости соединения."""
+        if not self.is_connected():
+            raise ConnectionError("Telegram client is not connected.")
+        await asyncio.wait_for(
+            self.client(PingRequest(ping_id=random.getrandbits(63))),
+            timeout=REQUEST_TIMEOUT,
+        )
+
     async def disconnect(self) -> None:
         if self.client:
             await self.client.disconnect()
@@ -94,17 +215,82 @@ class TelegramConversationAdapter:
             raise RuntimeError("Telegram client is not initialized.")
         return self.client.conversation(bot_username, timeout=timeout)
 
+    async def last_message(self, bot_username: str):
+        """Последнее сообщение бота в чате (для продолжения сценария с чекпоинта)."""
+        if not self.client:
+            raise RuntimeError("Telegram client is not initialized.")
+        async for message in self.client.iter_messages(bot_username, limit=10):
+            if not message.out:
+                return message
+        return None
+
+    @asynccontextmanager
+    async def collector(self, bot_username: str):
+        """Подписка на новые и отредактированные сообщения бота на время сценария."""
+        if not self.client:
+            raise RuntimeError("Telegram client is not initialized.")
+        collector = ResponseCollector()
+
+        async def on_message(event):
+            collector.feed(event.message)
+
+        self.client.add_event_handler(on_message, events.NewMessage(chats=bot_username, incoming=True))
+        self.client.add_event_handler(on_message, events.MessageEdited(chats=bot_username, incoming=True))
+        try:
+            yield collector
+        finally:
+            self.client.remove_event_handler(on_message)
+
+
+scenario_repository = ScenarioRepository(SCENARIO_FILE)
+outcome_store = OutcomeStore(OUTCOMES_FILE)
+checkpoint_store = CheckpointStore(CHECKPOINTS_FILE, keep=CHECKPOINTS_KEEP, max_age=CHECKPOINTS_MAX_AGE)
+session_store = SessionStore()
+
 
 class BotTester:
-    def __init__(self, conversation_adapter: ConversationAdapter | None = None):
+    def __init__(
+        self,
+        conversation_adapter: ConversationAdapter | None = None,
+        matcher: TemplateMatcher | None = None,
+        listeners=None,
+        checkpoints: CheckpointStore | None = None,
+        step_retries: int = STEP_RETRIES,
+        retry_delay: float = STEP_RETRY_DELAY,
+        run_id: str | None = None,
+    ):
         self.conversation_adapter = conversation_adapter
+        self.matcher = matcher or default_matcher
+        # Чекпоинты состояния перед каждым действием (None — выключены)
+        self.checkpoints = checkpoints
+        self.run_id = run_id  # прогон, к которому относятся чекпоинты
+        # Сколько раз повторить шаг после таймаута/ошибки, прежде чем провалить сценарий
+        self.step_retries = step_retries
+        self.retry_delay = retry_delay
+        # Подписчики событий прогона: callable(dict), см. _emit
+        self.listeners = list(listeners or [])
+        self.failure_reason: str | None = None
         self.last_bot_response = ""  # последний текст от бота (для UNTIL_REPLY)
         self.last_bot_message = None  # последнее сообщение от бота
+        self.buttons = ButtonResolver()  # кнопки последних сообщений бота
+        self.variant: str | None = None  # вариант развернутого сценария (в событиях — отдельным полем)
+        self._collector: ResponseCollector | None = None
 
     def _update_last_bot_message(self, message):
         self.last_bot_message = message
         self.last_bot_response = message.text or ""
 
+    def _update_from_batch(self, batch, matched=None):
+        """Запоминает ответ из пачки; для кнопок — последнее сообщение пачки с кнопками."""
+        for received in batch:
+            self.buttons.add(received)
+        message = matched if matched is not None else batch[-1]
+        self._update_last_bot_message(message)
+        if not getattr(message, "buttons", None):
+            with_buttons = [m for m in batch if getattr(m, "buttons", None)]
+            if with_buttons:
+                self.last_bot_message = with_buttons[-1]
+
     async def _try_get_response(self, conv, timeout=1):
         try:
             response = await asyncio.wait_for(conv.get_response(), timeout=timeout)
@@ -113,6 +299,66 @@ class BotTester:
             return None
         return response
 
+    def _observe_replies(self, scenario_name, step_num, sent_at: float) -> dict:
+        """
+        Задержки бота: до первого и до последнего сообщения пачки. Окно
+        тишины RESPONSE_SETTLE_MS, которым пачка закрывается, в settled не входит.
+        """
+        settled_at = first_at = asyncio.get_running_loop().time()
+        collector = self._collector
+        if collector is not None and collector.batch_first_arrival is not None:
+            first_at = collector.batch_first_arrival
+            settled_at = collector.batch_last_arrival
+        first, settled = first_at - sent_at, settled_at - sent_at
+        metrics.observe_reply(scenario_name, step_num, first, settled)
+        return {"first_response": max(first, 0.0), "settled": max(settled, 0.0)}
+
+    async def _await_replies(self, conv) -> list:
+        """Ответ обязателен: пачка сообщений от коллектора или одно через get_response."""
+        if self._collector is not None:
+            return await self._collector.collect(
+                RESPONSE_TIMEOUT, RESPONSE_SETTLE_MS / 1000, RESPONSE_HARD_CAP
+            )
+        return [await conv.get_response()]
+
+    async def _poll_replies(self, conv) -> list:
+        """Ответ не проверяется: забираем то, что бот успел прислать, без ошибки на тишине."""
+        if self._collector is not None:
+            try:
+                return await self._collector.collect(
+                    NO_REPLY_TIMEOUT, RESPONSE_SETTLE_MS / 1000, RESPONSE_HARD_CAP
+                )
+            except asyncio.TimeoutError:
+                logger.debug("Нет ответа от бота в коротком таймауте. Продолжаем.")
+                return []
+        response = await self._try_get_response(conv, timeout=NO_REPLY_TIMEOUT)
+        return [] if response is None else [response]
+
+    async def _click(self, conv, button, expect_reply: bool) -> list:
+        """
+        Нажатие и ожидание ответа бота — одна операция: ответ ждем параллельно
+        с callback-запросом. Если бот не ответил на сам callback (нет
+        answerCallbackQuery), это не ошибка — важны его сообщения.
+        """
+        click = asyncio.ensure_future(button.click())
+        replies = asyncio.ensure_future(
+            self._await_replies(conv) if expect_reply else self._poll_replies(conv)
+        )
+        try:
+            done, _ = await asyncio.wait({click, replies}, return_when=asyncio.FIRST_COMPLETED)
+            if click in done and not replies.done():
+                error = click.exception()
+                if error is not None and not isinstance(
+                    error, (asyncio.TimeoutError, BotResponseTimeoutError)
+                ):
+                    raise error
+            return await replies
+        finally:
+            for task in (click, replies):
+                if task.done() and not task.cancelled():
+                    task.exception()  # ошибка уже учтена выше или не важна
+                task.cancel()
+
     async def start_client(self):
         """Подключение к Telegram."""
         if not self.conversation_adapter:
@@ -129,11 +375,9 @@ class BotTester:
             await self.conversation_adapter.disconnect()
 
     def load_scenarios(self):
-        """Загрузка CSV и группировка по 'Сценарий'."""
+        """Снимок сценариев из CSV (перечитывается только при изменении файла)."""
         try:
-            df = pd.read_csv(SCENARIO_FILE)
-            df = df.dropna(subset=["Сценарий"])
-            return df.groupby("Сценарий")
+            return scenario_repository.snapshot()
         except Exception as e:
             logger.error(f"Критическая ошибка чтения CSV. Проверьте файл сценариев: {e}")
             return None
@@ -143,111 +387,204 @@ class BotTester:
         Сравнение текстов с поддержкой шаблонов <...> (как wildcard) и без учета регистра.
         Пример expected: "Привет, <username>!" матчится с "Привет, Юля!"
         """
-        if not expected or pd.isna(expected):
-            return True
-
-        expected = str(expected).strip()
-        actual = str(actual).strip()
+        return self.matcher.match(expected, actual)
 
-        # Приводим к lower (логика v2/v3)
-        expected_l = expected.lower()
-        actual_l = actual.lower()
-
-        if expected_l == actual_l:
-            return True
-
-        # Делаем regex из expected, где <...> -> .*
-        pattern = re.escape(expected_l).replace(r"\<", "<").replace(r"\>", ">")
-        pattern = re.sub(r"<.*?>", r".*", pattern)
-        return re.search(pattern, actual_l, re.DOTALL) is not None
-
-    async def run_scenario(self, scenario_name, steps_df):
+    async def run_scenario(self, scenario_name, steps, resume: bool = False):
         """
         Выполняет сценарий. Поддерживает:
         - REPEAT a-b n (как в v0)
         - UNTIL_REPLY step "text" (как в v1+)
+        steps — скомпилированная ScenarioProgram или строки сценария (DataFrame / dict'ы).
+        resume — продолжить с чекпоинта прошлого упавшего/прерванного прогона, если он есть.
+        Вариант развернутого сценария (program.variant) не входит в scenario_name:
+        метки метрик — по имени сценария, вариант — отдельным полем событий.
         """
-        logger.info(f"=== ЗАПУСК СЦЕНАРИЯ: {scenario_name} ===")
+        self.variant = getattr(steps, "variant", None)
+        variant = f" [{self.variant}]" if self.variant else ""
+        logger.info(f"=== ЗАПУСК СЦЕНАРИЯ: {scenario_name}{variant} ===")
+        started = time.perf_counter()
+        self.failure_reason = None
+
+        if isinstance(steps, ScenarioProgram):
+            program = steps
+        else:
+            rows = steps.to_dict("records") if hasattr(steps, "to_dict") else steps
+            try:
+                program = compile_scenario(scenario_name, rows)
+            except ScenarioCompileError as e:
+                logger.error(f"❌ Сценарий не скомпилирован: {e}")
+                self.failure_reason = str(e)
+                self._emit("scenario_finished", scenario_name, success=False, duration=0.0, reason=str(e))
+                return False
+
+        self._emit("scenario_started", scenario_name, steps=len(program))
+        success = await self._run_program(scenario_name, program, resume)
+        self._emit(
+            "scenario_finished",
+            scenario_name,
+            success=success,
+            duration=time.perf_counter() - started,
+            reason=self.failure_reason,
+        )
+        return success
+
+    def _emit(self, event: str, scenario_name: str, **fields) -> None:
+        """Отдает событие прогона подписчикам (отчеты, стриминг в UI)."""
+        if not self.listeners:
+            return
+        record = {"event": event, "scenario": scenario_name, "ts": time.time(), **fields}
+        if self.variant:
+            record["variant"] = self.variant
+        for listener in self.listeners:
+            try:
+                listener(record)
+            except Exception as e:
+                logger.warning(f"⚠️ Подписчик событий упал: {e}")
+
+    def _finish_step(self, scenario_name, step, status, started, reason=None, timing=None):
+        if reason:
+            self.failure_reason = reason
+        self._emit(
+            "step",
+            scenario_name,
+            step=step.step_num,
+            action=step.action,
+            status=status,
+            expected=step.expected_reply,
+            actual=self.last_bot_response if timing else None,
+            reason=reason,
+            duration=time.perf_counter() - started,
+            **(timing or {}),
+        )
+
+    async def _save_checkpoint(self, checkpoint: Checkpoint) -> None:
+        try:
+            await self.checkpoints.save(checkpoint)
+        except OSError as e:
+            logger.warning(f"⚠️ Чекпоинт '{checkpoint.scenario}' не сохранен: {e}")
+
+    async def _clear_checkpoints(self, scenario_name, session) -> None:
+        try:
+            await self.checkpoints.clear(scenario_name, session)
+        except OSError as e:
+            logger.warning(f"⚠️ Чекпоинты '{scenario_name}' не удалены: {e}")
+
+    async def _restore_checkpoint(self, checkpoint: Checkpoint) -> None:
+        """Текст ответа — из чекпоинта, сообщение с кнопками — заново из чата (если адаптер умеет)."""
+        self.last_bot_response = checkpoint.last_bot_response
+        self.last_bot_message = None
+        # Кнопки — только восстановленного сообщения, а не того, что было в этом BotTester до resume
+        self.buttons.clear()
+        fetch = getattr(self.conversation_adapter, "last_message", None)
+        if fetch:
+            try:
+                self.last_bot_message = await fetch(BOT_USERNAME)
+                if self.last_bot_message is not None:
+                    self.buttons.add(self.last_bot_message)
+            except Exception as e:
+                logger.warning(f"⚠️ Не удалось перечитать последнее сообщение бота: {e}")
+
+    async def _retry_step(self, scenario_name, step, attempt: int, saved, reason: str) -> bool:
+        """Откатывает состояние к чекпоинту перед шагом и ждет перед повтором; False — попытки кончились."""
+        if attempt >= self.step_retries:
+            return False
+        self.last_bot_message, self.last_bot_response = saved
+        metrics.STEP_RETRIES.labels(scenario_name, str(step.step_num)).inc()
+        logger.warning(
+            f"🔁 Шаг {step.step_num}: {reason}. Повтор {attempt + 1} из {self.step_retries}."
+        )
+        self._emit("retry", scenario_name, step=step.step_num, attempt=attempt + 1, reason=reason)
+        await asyncio.sleep(self.retry_delay * (attempt + 1))
+        return True
 
-        steps = steps_df.to_dict("records")
+    async def _run_program(self, scenario_name, program: ScenarioProgram, resume: bool = False) -> bool:
+        instructions = program.instructions
         i = 0
 
         # Счетчики циклов REPEAT: {index_of_repeat_row: current_iter}
         repeat_counters = {}
+        attempt = 0  # повторы текущего шага
+        digest = program_digest(program) if self.checkpoints else None
+        session = getattr(self.conversation_adapter, "name", None)
+        # Варианты одного сценария — разные чекпоинты
+        checkpoint_name = f"{scenario_name} [{program.variant}]" if program.variant else scenario_name
 
         if not self.conversation_adapter:
             raise RuntimeError("Conversation adapter is not configured.")
 
-        async with self.conversation_adapter.conversation(BOT_USERNAME, timeout=15) as conv:
-            while i < len(steps):
-                row = steps[i]
-                step_num = row.get("Шаги", i + 1)
-                user_action = str(row.get("Действие юзера", "")).strip()
-                expected_reply = row.get("Ответ бота", "")
-                error_log_msg = str(row.get("Как запишем ошибку", f"Ошибка на шаге {step_num}"))
+        async with AsyncExitStack() as stack:
+            conv = await stack.enter_async_context(
+                self.conversation_adapter.conversation(BOT_USERNAME, timeout=RESPONSE_TIMEOUT)
+            )
+            # Адаптеры с подпиской на события отдают ответы пачками (см. ResponseCollector)
+            self._collector = (
+                await stack.enter_async_context(self.conversation_adapter.collector(BOT_USERNAME))
+                if supports_collector(self.conversation_adapter)
+                else None
+            )
+
+            if resume and self.checkpoints:
+                checkpoint = self.checkpoints.load(checkpoint_name, digest, session)
+                if checkpoint is not None:
+                    i = checkpoint.index
+                    repeat_counters = dict(checkpoint.repeat_counters)
+                    await self._restore_checkpoint(checkpoint)
+                    logger.info(f"⏩ Продолжаем '{scenario_name}' с шага {checkpoint.step}.")
+                    self._emit("resumed", scenario_name, step=checkpoint.step)
+
+            while i < len(instructions):
+                step = instructions[i]
+                step_num = step.step_num
+                user_action = step.action
+                expected_reply = step.expected_reply
+                error_log_msg = step.error_msg
+                step_started = time.perf_counter()
+                timing = None
+                saved = (self.last_bot_message, self.last_bot_response)
 
                 try:
                     # -----------------------------
                     # 1) ДИНАМИЧЕСКИЙ ЦИКЛ UNTIL_REPLY
                     # Формат: UNTIL_REPLY 6 "Твой маршрут сформирован"
                     # -----------------------------
-                    if user_action.startswith("UNTIL_REPLY"):
-                        match = re.search(r'UNTIL_REPLY\s+(\d+)\s+["\'](.*?)["\']', user_action)
-                        if not match:
-                            logger.warning(f"⚠️ Неверный формат UNTIL_REPLY на шаге {step_num}. Пропускаю.")
+                    if isinstance(step, UntilReply):
+                        if self.smart_compare(step.trigger, self.last_bot_response):
+                            logger.info(f"🎯 ТРИГГЕР НАЙДЕН: '{step.trigger}'. Выходим из цикла.")
                             i += 1
                             continue
 
-                        target_step_num = int(match.group(1))
-                        trigger_text = match.group(2)
-
-                        if self.smart_compare(trigger_text, self.last_bot_response):
-                            logger.info(f"🎯 ТРИГГЕР НАЙДЕН: '{trigger_text}'. Выходим из цикла.")
-                            i += 1
-                            continue
-
-                        logger.info(f"🔄 Триггер '{trigger_text}' не найден. Прыгаем назад на шаг {target_step_num}")
-                        target_index = next(
-                            (idx for idx, s in enumerate(steps) if s.get("Шаги") == target_step_num),
-                            None,
+                        logger.info(
+                            f"🔄 Триггер '{step.trigger}' не найден. Прыгаем назад на шаг {step.target_step}"
                         )
-                        if target_index is None:
-                            logger.error(f"❌ Ошибка: Шаг {target_step_num} не найден.")
-                            return False
-                        i = target_index
+                        metrics.LOOP_ITERATIONS.labels(scenario_name, str(step_num), "until_reply").inc()
+                        self._emit(
+                            "loop", scenario_name, step=step_num, kind="until_reply", target=step.target_step
+                        )
+                        i = step.target
                         continue
 
                     # -----------------------------
                     # 2) СТАТИЧЕСКИЙ ЦИКЛ REPEAT (как в v0)
                     # Формат: REPEAT 6-9 3
                     # -----------------------------
-                    if user_action.startswith("REPEAT"):
-                        match = re.search(r"REPEAT\s+(\d+)-(\d+)\s+(\d+)", user_action)
-                        if not match:
-                            logger.warning(f"⚠️ Непонятный формат REPEAT на шаге {step_num}. Пропускаю.")
-                            i += 1
-                            continue
-
-                        start_step_num = int(match.group(1))
-                        # end_step_num = int(match.group(2))  # сейчас не используется
-                        count = int(match.group(3))
-
+                    if isinstance(step, Repeat):
                         current_iter = repeat_counters.get(i, 0)
-                        if current_iter < count:
+                        if current_iter < step.count:
                             logger.info(
-                                f"🔄 ЦИКЛ REPEAT: Повтор с шага {start_step_num}. Итерация {current_iter + 1} из {count}"
+                                f"🔄 ЦИКЛ REPEAT: Повтор с шага {step.start_step}. "
+                                f"Итерация {current_iter + 1} из {step.count}"
                             )
                             repeat_counters[i] = current_iter + 1
-
-                            target_index = next(
-                                (idx for idx, s in enumerate(steps) if s.get("Шаги") == start_step_num),
-                                None,
+                            metrics.LOOP_ITERATIONS.labels(scenario_name, str(step_num), "repeat").inc()
+                            self._emit(
+                                "loop",
+                                scenario_name,
+                                step=step_num,
+                                kind="repeat",
+                                target=step.start_step,
+                                iteration=current_iter + 1,
                             )
-                            if target_index is None:
-                                logger.error(f"❌ Ошибка цикла: Не найден шаг номер {start_step_num}")
-                                return False
-
-                            i = target_index
+                            i = step.target
                             continue
                         else:
                             logger.info("✅ ЦИКЛ REPEAT ЗАВЕРШЕН. Идем дальше.")
@@ -258,148 +595,638 @@ class BotTester:
                     # -----------------------------
                     # 3) ОБЫЧНЫЕ ДЕЙСТВИЯ
                     # -----------------------------
+                    if self.checkpoints:
+                        await self._save_checkpoint(
+                            Checkpoint(
+                                checkpoint_name,
+                                digest,
+                                i,
+                                step_num,
+                                dict(repeat_counters),
+                                self.last_bot_response,
+                                session,
+                                self.run_id,
+                            )
+                        )
                     logger.info(f"👉 Шаг {step_num}: '{user_action[:60]}...'")
+                    self._emit("step_started", scenario_name, step=step_num, action=user_action)
+                    sent_at = asyncio.get_running_loop().time()
+                    batch = None  # нажатие кнопки сразу возвращает ответ бота
 
                     # 3.1 Случайный выбор сообщения
-                    if "Отправляет одно из сообщений" in user_action or "Отправляет одно из" in user_action:
-                        lines = user_action.split("\n")
-                        options = [l for l in lines if l.strip() and not l.strip().startswith("Отправляет")]
-                        if options:
-                            chosen = random.choice(options).strip()
-                            chosen = re.sub(r"^\d+\.\s*", "", chosen)  # убрать нумерацию "1. "
-                            # Защита как в v0: если в варианте плейсхолдер вида <...>, отправляем безопасную строку
-                            if "<" in chosen and ">" in chosen:
-                                chosen = "Тестировщик"
-                            logger.info(f"🎲 Выбрано: {chosen}")
-                            await conv.send_message(chosen)
+                    if isinstance(step, SendOneOf):
+                        chosen = step.choose()
+                        logger.info(f"🎲 Выбрано: {chosen}")
+                        await conv.send_message(chosen)
+
+                    # 3.2 Кнопки
+                    elif isinstance(step, PressButton):
+                        resolved = self.buttons.resolve(step.label)
+                        if resolved is None:
+                            # Кнопки еще не пришли — ждем сообщения бота
+                            self._update_from_batch(await self._await_replies(conv))
+                            resolved = self.buttons.resolve(step.label)
+
+                        if resolved is not None:
+                            btn, tier = resolved
+                            logger.info(f"🔘 Нажата: {btn.text} ({tier})")
+                            batch = await self._click(conv, btn, expected_reply is not None)
                         else:
-                            await conv.send_message("Test message")
-
-                    # 3.2 Команды (/start)
-                    elif user_action.startswith("/"):
-                        await conv.send_message(user_action)
-
-                    # 3.3 Кнопки
-                    elif ("Нажимает" in user_action) or ("кнопку" in user_action):
-                        # Ждем сообщение, где должны быть кнопки
-                        last_msg = self.last_bot_message
-                        if last_msg is None:
-                            last_msg = await conv.get_response()
-                        self._update_last_bot_message(last_msg)
-
-                        m = re.search(r'["\'](.*?)["\']', user_action)
-                        btn_text = (m.group(1) if m else "").strip()
-                        if not btn_text:
-                            logger.error(f"❌ {error_log_msg}. Не найден текст кнопки в кавычках.")
-                            return False
-
-                        btn_found = False
-                        if last_msg.buttons:
-                            for row_btns in last_msg.buttons:
-                                for btn in row_btns:
-                                    if btn_text.lower() in (btn.text or "").lower():
-                                        await btn.click()
-                                        btn_found = True
-                                        logger.info(f"🔘 Нажата: {btn.text}")
-                                        break
-                                if btn_found:
-                                    break
-
-                        if not btn_found:
-                            logger.error(f"❌ {error_log_msg}. Кнопка '{btn_text}' не найдена.")
+                            logger.error(f"❌ {error_log_msg}. Кнопка '{step.label}' не найдена.")
+                            self._finish_step(
+                                scenario_name,
+                                step,
+                                "failed",
+                                step_started,
+                                reason=f"Кнопка '{step.label}' не найдена",
+                            )
                             return False
 
-                    # 3.4 Просто текст
+                    # 3.3 Команды (/start) и просто текст
                     else:
                         await conv.send_message(user_action)
 
                     # -----------------------------
                     # 4) ПРОВЕРКА ОТВЕТА
                     # -----------------------------
-                    if expected_reply and not pd.isna(expected_reply):
-                        response = await conv.get_response()
-                        self._update_last_bot_message(response)
-                        if self.smart_compare(expected_reply, self.last_bot_response):
+                    if expected_reply is not None:
+                        if batch is None:
+                            batch = await self._await_replies(conv)
+                        matched = next(
+                            (m for m in batch if self.smart_compare(expected_reply, m.text or "")),
+                            None,
+                        )
+                        self._update_from_batch(batch, matched)
+                        timing = self._observe_replies(scenario_name, step_num, sent_at)
+                        self._emit_response(scenario_name, step_num, batch, timing)
+                        if matched is not None:
                             logger.info("👌 Ответ корректен.")
                         else:
                             logger.error(f"❌ {error_log_msg}")
                             logger.info(f"   Ждали: {expected_reply}")
                             logger.info(f"   Получили: {self.last_bot_response[:200]}...")
+                            self._finish_step(
+                                scenario_name,
+                                step,
+                                "failed",
+                                step_started,
+                                reason="Ответ не совпал с ожидаемым",
+                                timing=timing,
+                            )
                             return False
                     else:
                         # Если не ждем конкретного текста — пробуем короткий неблокирующий ответ.
-                        response = await self._try_get_response(conv)
-                        if response is not None:
-                            self._update_last_bot_message(response)
-
+                        if batch is None:
+                            batch = await self._poll_replies(conv)
+                        if batch:
+                            self._update_from_batch(batch)
+                            timing = self._observe_replies(scenario_name, step_num, sent_at)
+                            self._emit_response(scenario_name, step_num, batch, timing)
+
+                    self._finish_step(scenario_name, step, "passed", step_started, timing=timing)
                     i += 1
+                    attempt = 0
 
                 except asyncio.TimeoutError:
                     logger.error(f"⏳ Таймаут на шаге {step_num}")
+                    metrics.STEP_TIMEOUTS.labels(scenario_name, str(step_num)).inc()
+                    if await self._retry_step(scenario_name, step, attempt, saved, "таймаут"):
+                        attempt += 1
+                        continue
+                    self._finish_step(
+                        scenario_name, step, "timeout", step_started, reason="Таймаут ожидания ответа"
+                    )
                     return False
                 except Exception as e:
                     logger.exception(f"💥 Ошибка на шаге {step_num}: {e}")
+                    if await self._retry_step(scenario_name, step, attempt, saved, str(e)):
+                        attempt += 1
+                        continue
+                    self._finish_step(scenario_name, step, "error", step_started, reason=str(e))
                     return False
 
+        if self.checkpoints:
+            await self._clear_checkpoints(checkpoint_name, session)
         logger.info("🏁 Сценарий завершен.")
         return True
 
+    def _emit_response(self, scenario_name, step_num, batch, timing) -> None:
+        self._emit(
+            "response",
+            scenario_name,
+            step=step_num,
+            messages=[m.text or "" for m in batch],
+            **timing,
+        )
 
-tester = BotTester()
+
+@dataclass
+class ScenarioResult:
+    name: str
+    success: bool
+    duration: float
+    skipped: bool = False  # не запускался: fail_fast или упала зависимость
+    variant: str | None = None  # выбор в шагах-вариантах (run_suite(expand=...))
+
+
+async def run_scenarios_concurrently(
+    pool: SessionPool,
+    scenarios,
+    listeners=None,
+    dependencies=None,
+    fail_fast: bool = False,
+    resume: bool = False,
+    run_id: str | None = None,
+) -> list[ScenarioResult]:
+    """
+    Запускает сценарии параллельно на сессиях пула.
+    Каждый сценарий получает свой BotTester, поэтому состояние (last_bot_response)
+    не разделяется между одновременными прогонами. Результаты — в порядке сценариев.
+
+    Связанные зависимостями сценарии (dependencies: имя -> предшественники)
+    идут одной группой: по порядку, на одной сессии. Если предшественник упал,
+    зависимый сценарий не запускается и считается упавшим.
+
+    fail_fast: первый упавший сценарий останавливает прогон — идущие сценарии
+    прерываются, не начатые не запускаются (все они помечаются skipped).
+
+    resume: сценарии с чекпоинтом прошлого прогона продолжаются с него
+    (чекпоинты пишутся, только если включен SCENARIO_CHECKPOINTS; run_id
+    отделяет чекпоинты этого прогона от параллельных). Группа с чекпоинтом
+    арендует сессию, на которой он снят.
+    """
+    scenarios = list(scenarios)
+    checkpoints = checkpoint_store if CHECKPOINTS_ENABLED else None
+    dependencies = dependencies or {}
+    results: list[ScenarioResult | None] = [None] * len(scenarios)
+    tasks: list[asyncio.Task] = []
+    stopped = False
+
+    def stop(current: asyncio.Task) -> None:
+        nonlocal stopped
+        stopped = True
+        for task in tasks:
+            if task is not current:
+                task.cancel()
+
+    def checkpoint_session(indexes: list[int]) -> str | None:
+        # Состояние бота живет на аккаунте: продолжать можно только на той же сессии
+        for idx in indexes:
+            name, steps = scenarios[idx]
+            variant = getattr(steps, "variant", None)
+            session = checkpoints.latest_session(f"{name} [{variant}]" if variant else name)
+            if session is not None:
+                return session
+        return None
+
+    async def run_group(indexes: list[int]) -> None:
+        prefer = checkpoint_session(indexes) if resume and checkpoints else None
+        try:
+            async with pool.lease(prefer=prefer) as adapter:
+                await run_on(adapter, indexes)
+        except NoSessionError as e:
+            # Ни одна сессия не подключилась: группа падает, остальные идут дальше
+            for idx in indexes:
+                if results[idx] is None:
+                    name, steps = scenarios[idx]
+                    logger.error(f"❌ Сценарий '{name}' не запущен: {e}")
+                    metrics.observe_scenario(name, False, 0.0)
+                    results[idx] = ScenarioResult(name, False, 0.0, variant=getattr(steps, "variant", None))
+            if fail_fast and not stopped:
+                stop(asyncio.current_task())
+
+    async def run_on(adapter, indexes: list[int]) -> None:
+        failed: set[str] = set()
+        for idx in indexes:
+            name, steps = scenarios[idx]
+            variant = getattr(steps, "variant", None)
+            label = f"{name} [{variant}]" if variant else name
+            if stopped:
+                results[idx] = ScenarioResult(name, False, 0.0, skipped=True, variant=variant)
+                continue
+            blocked = [dep for dep in dependencies.get(name, ()) if dep in failed]
+            if blocked:
+                logger.error(f"⏭ Сценарий '{name}' пропущен: упал '{blocked[0]}'.")
+                failed.add(name)
+                results[idx] = ScenarioResult(name, False, 0.0, skipped=True, variant=variant)
+                continue
+            started = time.perf_counter()
+            try:
+                tester = BotTester(adapter, listeners=listeners, checkpoints=checkpoints, run_id=run_id)
+                success = await tester.run_scenario(name, steps, resume=resume)
+            except Exception as e:
+                logger.exception(f"💥 Сценарий '{label}' упал: {e}")
+                success = False
+            duration = time.perf_counter() - started
+            metrics.observe_scenario(name, success, duration)
+            results[idx] = ScenarioResult(name, success, duration, variant=variant)
+            if not success:
+                failed.add(name)
+                if fail_fast and not stopped:
+                    logger.error(f"🛑 fail_fast: '{label}' упал, прогон остановлен.")
+                    stop(asyncio.current_task())
+
+    groups = dependency_groups([name for name, _ in scenarios], dependencies)
+    tasks.extend(asyncio.create_task(run_group(group)) for group in groups)
+    try:
+        # С fail_fast отмененные группы — норма; настоящие ошибки пробрасываем
+        for outcome in await asyncio.gather(*tasks, return_exceptions=fail_fast):
+            if isinstance(outcome, Exception):
+                raise outcome
+    finally:
+        for task in tasks:
+            task.cancel()
+    return [
+        result or ScenarioResult(name, False, 0.0, skipped=True, variant=getattr(steps, "variant", None))
+        for result, (name, steps) in zip(results, scenarios)
+    ]
+
+
+def create_session_pool() -> SessionPool:
+    """
+    Пул сессий Telegram на клиенте TELEGRAM_CLIENT; CASSETTE_MODE=record пишет
+    разговоры в кассету, replay — играет ее без сети.
+    """
+    adapter_class = TelegramConversationAdapter
+    if TELEGRAM_CLIENT == "pyrogram":
+        from src.pyrogram_adapter import PyrogramConversationAdapter  # pyrogram грузим, только если выбран
+
+        adapter_class = PyrogramConversationAdapter
+    adapters = [adapter_class(session_file) for session_file in SESSION_FILES]
+    if CASSETTE_MODE == "record":
+        logger.info(f"📼 Запись разговоров в {CASSETTE_FILE}.")
+        cassette = Cassette()
+        adapters = [RecordingAdapter(adapter, cassette, CASSETTE_FILE) for adapter in adapters]
+    elif CASSETTE_MODE == "replay":
+        logger.info(f"📼 Воспроизведение кассеты {CASSETTE_FILE}, Telegram не используется.")
+        cassette = Cassette.load(CASSETTE_FILE)
+        adapters = [
+            ReplayAdapter(cassette, name=adapter.name, speed=CASSETTE_SPEED) for adapter in adapters
+        ]
+    return SessionPool(
+        adapters,
+        concurrency=RUN_CONCURRENCY,
+        keepalive_interval=KEEPALIVE_INTERVAL,
+        backoff_max=RECONNECT_BACKOFF_MAX,
+        reconnect_attempts=RECONNECT_ATTEMPTS,
+    )
+
+
+def create_run_report(run_id: str | None = None) -> RunReport:
+    return RunReport(REPORT_DIR, run_id, max_bytes=REPORT_MAX_BYTES, keep_runs=REPORT_KEEP_RUNS)
+
+
+def _linked(dependencies) -> set[str]:
+    """Сценарии со связями в dependencies.json: они не разворачиваются в варианты."""
+    return set(dependencies) | {dep for deps in dependencies.values() for dep in deps}
+
+
+def check_batch_expansion(programs, strategy: str, dependencies=None) -> None:
+    """Проверка до постановки прогона в очередь: ValueError, как при развертывании (VARIANT_LIMIT)."""
+    linked = _linked(dependencies or {})
+    for name, program in programs:
+        if name not in linked:
+            check_expansion(
+                program, strategy, limit=VARIANT_LIMIT, placeholder_values=VARIANT_PLACEHOLDER_VALUES
+            )
 
 
-async def run_tests(specific_scenario=None):
+def expand_batch(batch, strategy: str, dependencies=None) -> list[tuple[str, ScenarioProgram]]:
+    """Разворачивает сценарии прогона в варианты (src.variants), кроме связанных зависимостями."""
+    linked = _linked(dependencies or {})
+    seed = VARIANT_SEED if VARIANT_SEED is not None else random.randrange(2**32)
+    if strategy == SAMPLE:
+        logger.info(f"🎲 Выборка вариантов с seed={seed} (повторить: VARIANT_SEED={seed}).")
+    expanded = []
+    for name, program in batch:
+        if name in linked:
+            expanded.append((name, program))
+            continue
+        variants = expand_program(
+            program,
+            strategy,
+            samples=VARIANT_SAMPLES,
+            seed=seed,
+            limit=VARIANT_LIMIT,
+            placeholder_values=VARIANT_PLACEHOLDER_VALUES,
+        )
+        expanded.extend((name, variant) for variant in variants)
+    return expanded
+
+
+async def run_suite(
+    specific_scenario=None,
+    pool: SessionPool | None = None,
+    listeners=None,
+    fail_fast: bool = False,
+    resume: bool = False,
+    expand: str | None = None,
+    run_id: str | None = None,
+) -> list[ScenarioResult]:
+    """
+    Прогон сценариев с результатами по каждому: всех, одного (имя) или
+    нескольких (список имен). Если передан пул (постоянный,
+    из lifespan приложения), он используется как есть; иначе пул создается
+    и закрывается на время прогона. Ошибки загрузки CSV — исключение LookupError.
+    Итоги сохраняются в outcome_store для режимов failed/changed.
+
+    expand (cartesian | pairwise | sample) разворачивает шаги «Отправляет одно
+    из» в варианты, которые идут параллельно, с результатом по каждому.
+    Сценарии со связями в dependencies.json не разворачиваются: им нужна
+    одна последовательность на одном аккаунте.
+    """
+    snapshot = BotTester().load_scenarios()
+    if snapshot is None:
+        raise LookupError("Не удалось загрузить сценарии: ошибка чтения CSV.")
+
+    if specific_scenario:
+        names = [specific_scenario] if isinstance(specific_scenario, str) else list(specific_scenario)
+        missing = [name for name in names if name not in snapshot.names]
+        if missing:
+            raise LookupError(f"Сценарий '{missing[0]}' не найден.")
+    else:
+        names = list(snapshot.names)
+
+    programs, errors = snapshot.programs, snapshot.errors
+    dependencies = load_dependencies(SCENARIO_DEPENDENCIES_FILE)
+    batch = [(name, programs[name]) for name in names if name in programs]
+    if expand:
+        batch = expand_batch(batch, expand, dependencies)
+    own_pool = pool is None
+    if own_pool:
+        pool = create_session_pool()
+    try:
+        await pool.start()
+        results = await run_scenarios_concurrently(
+            pool,
+            batch,
+            listeners=listeners,
+            dependencies=dependencies,
+            fail_fast=fail_fast,
+            resume=resume,
+            run_id=run_id,
+        )
+    finally:
+        if own_pool:
+            await pool.stop()
+
+    results += [ScenarioResult(name, False, 0.0) for name in names if name in errors]
+    for result in results:
+        status = "⏭" if result.skipped else "✅" if result.success else "❌"
+        variant = f" [{result.variant}]" if result.variant else ""
+        logger.info(f"{status} {result.name}{variant}: {result.duration:.1f} с")
+    # Чтение и запись файла исходов — в потоке, чтобы не блокировать event loop
+    await asyncio.to_thread(outcome_store.update, results, snapshot.hashes)
+    return results
+
+
+async def run_reported(
+    run_id,
+    specific_scenario=None,
+    pool: SessionPool | None = None,
+    listeners=(),
+    fail_fast: bool = False,
+    resume: bool = False,
+    expand: str | None = None,
+):
+    """run_suite с записью JSONL-отчета; отчет закрывается и при ошибке, и при отмене."""
     setup_file_logging()
-    success = True
+    report = await create_run_report(run_id).start()
+    results, status = [], None
     try:
-        await tester.start_client()
-        grouped = tester.load_scenarios()
+        results = await run_suite(
+            specific_scenario,
+            pool,
+            listeners=[report, *listeners],
+            fail_fast=fail_fast,
+            resume=resume,
+            expand=expand,
+            run_id=report.run_id,
+        )
+        return results
+    except asyncio.CancelledError:
+        status = "cancelled"
+        raise
+    except Exception:
+        status = "error"
+        raise
+    finally:
+        await asyncio.shield(report.close(results, status))
 
-        if grouped is None:
-            logger.error("Не удалось загрузить сценарии: ошибка чтения CSV.")
-            return False
 
-        if specific_scenario:
-            if (
-                isinstance(grouped, pd.core.groupby.generic.DataFrameGroupBy)
-                and specific_scenario in grouped.groups
-            ):
-                success = await tester.run_scenario(
-                    specific_scenario,
-                    grouped.get_group(specific_scenario),
-                )
-            else:
-                logger.error(f"Сценарий '{specific_scenario}' не найден.")
-                success = False
-        else:
-            if isinstance(grouped, pd.core.groupby.generic.DataFrameGroupBy):
-                for name, steps in grouped:
-                    scenario_success = await tester.run_scenario(name, steps)
-                    success = success and scenario_success
-            else:
-                logger.error("Не удалось загрузить сценарии (grouped пустой).")
-                success = False
+async def run_tests(specific_scenario=None, pool: SessionPool | None = None):
+    try:
+        results = await run_reported(None, specific_scenario, pool)
     except Exception as e:
         logger.error(f"Global Error: {e}")
-        success = False
+        return False
+    return bool(results) and all(result.success for result in results)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Пул сессий подключается один раз при старте сервиса и переиспользуется всеми
+    прогонами; прогоны выполняются воркерами очереди задач.
+    """
+    pool = app.state.pool_factory()
+    app.state.session_pool = pool
+    keepalive = asyncio.create_task(pool.keepalive())
+
+    async def run_job(job: Job) -> list[ScenarioResult]:
+        return await run_reported(
+            job.id,
+            job.scenario,
+            pool,
+            listeners=[job.events],
+            fail_fast=job.fail_fast,
+            resume=job.resume,
+            expand=job.expand,
+        )
+
+    jobs = JobManager(run_job, workers=JOB_WORKERS, max_queue=JOB_QUEUE_SIZE, history=JOB_HISTORY)
+    app.state.jobs = jobs
+    await jobs.start()
+    try:
+        yield
     finally:
-        await tester.stop_client()
-    return success
+        await jobs.stop()
+        keepalive.cancel()
+        await asyncio.gather(keepalive, return_exceptions=True)
+        await pool.stop()
+
+
+router = APIRouter()
+templates = Jinja2Templates(directory=Path(__file__).parent / "templates")
+
+
+@router.get("/", response_class=HTMLResponse)
+def index(request: Request):
+    snapshot = BotTester().load_scenarios()
+    scenarios = list(snapshot.names) if snapshot else []
+    return templates.TemplateResponse(request, "index.html", {"scenarios": scenarios})
 
 
-app = FastAPI(title="Bot Testing Service")
+@router.get("/health")
+def health_check(request: Request):
+    pool: SessionPool = request.app.state.session_pool
+    sessions = pool.health()
+    connected = sum(1 for session in sessions.values() if session["state"] == CONNECTED)
+    return {
+        "status": "ok" if connected else "degraded",
+        "connected": connected,
+        "sessions": sessions,
+    }
 
 
-@app.get("/health")
-def health_check():
-    return {"status": "ok"}
+@router.get("/metrics")
+def metrics_endpoint():
+    body, content_type = metrics.render()
+    return Response(content=body, media_type=content_type)
 
 
-@app.post("/run")
+@router.post("/run", status_code=202)
 async def run_scenarios(
+    request: Request,
     scenario: str | None = Query(default=None, description="Имя сценария для запуска"),
+    mode: str = Query(default=MODE_ALL, description="all | failed | changed"),
+    fail_fast: bool = Query(default=False, description="Остановить прогон на первом падении"),
+    resume: bool = Query(default=False, description="Продолжить сценарии с последнего чекпоинта"),
+    expand: str | None = Query(default=None, description="Варианты шагов: cartesian | pairwise | sample"),
+    wait: bool = Query(default=False, description="Дождаться окончания прогона"),
 ):
-    success = await run_tests(scenario)
-    if not success:
+    snapshot = BotTester().load_scenarios()
+    if snapshot is None:
+        raise HTTPException(status_code=500, detail="Failed to load scenarios")
+    if scenario and scenario not in snapshot.names:
+        raise HTTPException(status_code=404, detail=f"Scenario '{scenario}' not found")
+    if mode not in MODES:
+        raise HTTPException(status_code=422, detail=f"Unknown mode '{mode}'")
+    if expand is not None and expand not in STRATEGIES:
+        raise HTTPException(status_code=422, detail=f"Unknown expansion '{expand}'")
+
+    if mode != MODE_ALL:
+        selected = await asyncio.to_thread(outcome_store.select, snapshot, mode, [scenario] if scenario else None)
+        if not selected:
+            return JSONResponse({"status": "nothing_to_run", "mode": mode, "scenarios": []})
+        scenario = selected
+
+    if expand is not None:
+        names = [scenario] if isinstance(scenario, str) else scenario or snapshot.names
+        programs = [(name, snapshot.programs[name]) for name in names if name in snapshot.programs]
+        try:
+            check_batch_expansion(programs, expand, load_dependencies(SCENARIO_DEPENDENCIES_FILE))
+        except ValueError as e:
+            raise HTTPException(status_code=422, detail=str(e))
+
+    jobs: JobManager = request.app.state.jobs
+    try:
+        job = jobs.submit(scenario, fail_fast=fail_fast, resume=resume, expand=expand)
+    except QueueFullError:
+        raise HTTPException(status_code=429, detail="Job queue is full")
+
+    if not wait:
+        return {"job_id": job.id, "status": job.status, "scenario": scenario}
+
+    await jobs.wait(job)
+    if job.status != COMPLETED:
         raise HTTPException(status_code=500, detail="Test run failed")
-    return {"status": "completed", "scenario": scenario}
+    return JSONResponse({"status": "completed", "scenario": scenario, "job_id": job.id})
+
+
+class ShardRequest(BaseModel):
+    scenarios: list[str]
+    digest: str | None = None  # suite_digest координатора (CSV + зависимости): воркер должен гонять ту же версию
+
+
+@router.post("/shards", status_code=202)
+async def run_shard(shard: ShardRequest, request: Request):
+    """Часть распределенного прогона: координатор присылает список сценариев (см. src/distributed.py)."""
+    snapshot = BotTester().load_scenarios()
+    if snapshot is None:
+        raise HTTPException(status_code=500, detail="Failed to load scenarios")
+    if shard.digest and shard.digest != suite_digest(snapshot.digest, SCENARIO_DEPENDENCIES_FILE):
+        raise HTTPException(status_code=409, detail="Scenario or dependencies file differs from coordinator")
+    missing = [name for name in shard.scenarios if name not in snapshot.names]
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Scenario '{missing[0]}' not found")
+
+    try:
+        job = request.app.state.jobs.submit(shard.scenarios)
+    except QueueFullError:
+        raise HTTPException(status_code=429, detail="Job queue is full")
+    return {"job_id": job.id, "status": job.status, "scenarios": shard.scenarios}
+
+
+@router.get("/jobs")
+async def list_jobs(request: Request):
+    jobs: JobManager = request.app.state.jobs
+    return [job.to_dict(with_results=False) for job in jobs.list()]
+
+
+@router.get("/jobs/{job_id}")
+async def get_job(job_id: str, request: Request):
+    job = request.app.state.jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
+
+
+@router.get("/jobs/{job_id}/events")
+async def stream_job_events(job_id: str, request: Request):
+    """
+    Server-Sent Events: события шагов прогона по мере выполнения
+    (step_started, response, step, loop, scenario_*, job_finished).
+    Подписка посреди прогона сначала отдает уже случившиеся события.
+    """
+    job = request.app.state.jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    async def frames():
+        async for record in job.events.subscribe(heartbeat=SSE_HEARTBEAT):
+            yield format_sse(record)
+
+    return StreamingResponse(
+        frames(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.post("/jobs/{job_id}/cancel")
+async def cancel_job(job_id: str, request: Request):
+    job = request.app.state.jobs.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict(with_results=False)
+
+
+@router.get("/runs")
+def list_runs(limit: int = Query(default=50, ge=1, le=1000)):
+    return read_index(REPORT_DIR, limit)
+
+
+@router.get("/runs/{run_id}")
+def get_run(
+    run_id: str,
+    event: str | None = Query(default=None, description="Тип записей: step, scenario_finished, ..."),
+):
+    records = read_run(REPORT_DIR, run_id, event)
+    if records is None:
+        raise HTTPException(status_code=404, detail="Run not found")
+    return records
+
+
+def create_app(pool_factory=create_session_pool) -> FastAPI:
+    """
+    Экземпляр сервиса. pool_factory создает пул сессий при старте: в тестах
+    и при локальной проверке распределенного режима — пул на симуляторе.
+    """
+    application = FastAPI(title="Bot Testing Service", lifespan=lifespan)
+    application.state.pool_factory = pool_factory
+    application.include_router(router)
+    return application
+
+
+app = create_app()
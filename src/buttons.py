@@ -0,0 +1,80 @@
+import difflib
+import re
+from collections import OrderedDict
+
+# --- ПОИСК КНОПОК ---
+# Кнопки последних сообщений бота индексируются по нормализованному тексту
+# один раз при получении сообщения. Поиск по последнему сообщению идет ярусами:
+# точное совпадение, префикс, вхождение подстроки (прежнее поведение), похожий
+# текст; кнопки более старых сообщений нажимаются только при точном совпадении.
+
+EXACT = "exact"
+PREFIX = "prefix"
+CONTAINS = "contains"
+FUZZY = "fuzzy"
+
+_NOISE_RE = re.compile(r"[^\w\s]+")  # эмодзи и пунктуация: "✅ Да!" -> "да"
+_DIGITS_RE = re.compile(r"\d+")
+
+
+def normalize(text: str | None) -> str:
+    return " ".join(_NOISE_RE.sub(" ", (text or "").casefold()).split())
+
+
+class ButtonResolver:
+    """
+    Кнопки depth последних сообщений бота с кнопками. Более новое сообщение
+    важнее: при одинаковом тексте побеждает его кнопка, а у старых подходит
+    только точный текст — префикс или опечатка не нажмут устаревшую кнопку.
+    Отредактированное сообщение (тот же id) заменяет свои кнопки.
+    """
+
+    def __init__(self, depth: int = 5, cutoff: float = 0.75):
+        self.depth = depth
+        self.cutoff = cutoff  # минимальная похожесть для яруса fuzzy (difflib ratio)
+        self._messages: OrderedDict[object, list[tuple[str, object]]] = OrderedDict()
+        self._exact: dict[str, object] = {}
+
+    def add(self, message) -> None:
+        key = getattr(message, "id", None)
+        key = id(message) if key is None else key
+        rows = getattr(message, "buttons", None)
+        self._messages.pop(key, None)
+        if rows:
+            self._messages[key] = [(normalize(btn.text), btn) for row in rows for btn in row]
+            while len(self._messages) > self.depth:
+                self._messages.popitem(last=False)
+        self._exact = {text: btn for entries in self._messages.values() for text, btn in entries}
+
+    def clear(self) -> None:
+        self._messages.clear()
+        self._exact = {}
+
+    def resolve(self, label: str) -> tuple[object, str] | None:
+        """(кнопка, ярус) или None, если ничего похожего нет."""
+        target = normalize(label)
+        if not target:
+            return None
+        latest = next(reversed(self._messages.values()), [])
+        for tier, matches in (
+            (EXACT, lambda text: text == target),
+            (PREFIX, lambda text: text.startswith(target)),
+            (CONTAINS, lambda text: target in text),
+        ):
+            for text, btn in latest:
+                if matches(text):
+                    return btn, tier
+        # Опечатки в словах допустимы, в числах — нет: "Доклад 2" не нажмет "Доклад 3"
+        digits = _DIGITS_RE.findall(target)
+        best, best_ratio = None, self.cutoff
+        for text, btn in latest:
+            if _DIGITS_RE.findall(text) != digits:
+                continue
+            ratio = difflib.SequenceMatcher(None, target, text).ratio()
+            if ratio > best_ratio or (best is None and ratio == best_ratio):
+                best, best_ratio = btn, ratio
+        if best is not None:
+            return best, FUZZY
+        if target in self._exact:
+            return self._exact[target], EXACT
+        return None
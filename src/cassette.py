@@ -0,0 +1,400 @@
+"""
+Кассеты: запись разговоров с настоящим ботом и воспроизведение без сети.
+
+RecordingAdapter оборачивает любой ConversationAdapter и пишет каждое
+действие (сообщение, нажатие кнопки), пачку ответов бота (текст, раскладка
+кнопок) и задержки в JSON-файл. ReplayAdapter отдает записанные ответы
+через тот же протокол, поэтому BotTester прогоняет по кассете измененные
+сценарии и правила сравнения за миллисекунды.
+
+Проверка сценариев по кассете из корня репозитория:
+    python -m src.cassette logs/cassette.json
+    python -m src.cassette logs/cassette.json --scenario "Сценарий 1" --speed 1
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import time
+from contextlib import asynccontextmanager
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+
+from src.collector import ResponseCollector, supports_collector
+from src.simulator import SimulatedButton, SimulatedMessage
+
+logger = logging.getLogger("TestEngine")
+
+SEND = "send"
+CLICK = "click"
+
+
+@dataclass
+class RecordedReply:
+    id: int | None
+    text: str
+    buttons: list[list[str]] | None = None
+
+    @classmethod
+    def from_message(cls, message) -> "RecordedReply":
+        rows = getattr(message, "buttons", None)
+        buttons = [[btn.text or "" for btn in row] for row in rows] if rows else None
+        return cls(getattr(message, "id", None), message.text or "", buttons)
+
+
+@dataclass
+class Exchange:
+    """Действие пользователя (None — ответ пришел без действия) и пачка ответов на него."""
+
+    action: str | None
+    text: str | None
+    replies: list[RecordedReply] = field(default_factory=list)
+    delay: float = 0.0  # от действия до первого сообщения
+    settled: float = 0.0  # от действия до конца пачки
+
+    def to_dict(self) -> dict:
+        data = asdict(self)
+        data["delay"], data["settled"] = round(self.delay, 3), round(self.settled, 3)
+        for reply in data["replies"]:
+            if reply["buttons"] is None:
+                del reply["buttons"]
+        return data
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Exchange":
+        replies = [RecordedReply(**reply) for reply in data.get("replies", [])]
+        return cls(
+            data.get("action"),
+            data.get("text"),
+            replies,
+            data.get("delay", 0.0),
+            data.get("settled", 0.0),
+        )
+
+
+class Cassette:
+    """Записанные разговоры: каждый — список обменов по порядку."""
+
+    VERSION = 1
+
+    def __init__(self, conversations: list[list[Exchange]] | None = None):
+        self.conversations = conversations or []
+
+    @classmethod
+    def load(cls, path) -> "Cassette":
+        data = json.loads(Path(path).read_text(encoding="utf-8"))
+        if data.get("version") != cls.VERSION:
+            raise ValueError(f"Unsupported cassette version: {data.get('version')}")
+        return cls([[Exchange.from_dict(e) for e in tape] for tape in data["conversations"]])
+
+    def save(self, path) -> None:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        data = {
+            "version": self.VERSION,
+            "recorded_at": time.time(),
+            "conversations": [[e.to_dict() for e in tape] for tape in self.conversations],
+        }
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(data, ensure_ascii=False, separators=(",", ":")), encoding="utf-8")
+        os.replace(tmp, path)
+
+
+# --- ЗАПИСЬ ---
+
+
+class _Tape:
+    """Обмены одного разговора; время — loop.time()."""
+
+    def __init__(self):
+        self.exchanges: list[Exchange] = []
+        self.acted_at = asyncio.get_running_loop().time()
+
+    def action(self, kind: str, text: str) -> None:
+        self.exchanges.append(Exchange(kind, text))
+        self.acted_at = asyncio.get_running_loop().time()
+
+    def replies(self, messages: list, first_at: float | None = None) -> None:
+        if not messages:
+            return
+        if not self.exchanges:
+            self.exchanges.append(Exchange(None, None))
+        exchange = self.exchanges[-1]
+        now = asyncio.get_running_loop().time()
+        if not exchange.replies:
+            exchange.delay = max((first_at or now) - self.acted_at, 0.0)
+        exchange.settled = max(now - self.acted_at, 0.0)
+        exchange.replies.extend(RecordedReply.from_message(m) for m in messages)
+
+
+class _RecordingButton:
+    def __init__(self, button, tape: _Tape):
+        self._button = button
+        self._tape = tape
+        self.text = button.text
+
+    async def click(self):
+        self._tape.action(CLICK, self.text or "")
+        return await self._button.click()
+
+
+class _RecordingMessage:
+    """Сообщение бота, у которого нажатия кнопок попадают в кассету."""
+
+    def __init__(self, message, tape: _Tape):
+        self._message = message
+        rows = getattr(message, "buttons", None)
+        self.buttons = [[_RecordingButton(b, tape) for b in row] for row in rows] if rows else rows
+
+    def __getattr__(self, name):
+        return getattr(self._message, name)
+
+
+class _RecordingConversation:
+    def __init__(self, conversation, tape: _Tape):
+        self._conversation = conversation
+        self._tape = tape
+
+    async def send_message(self, message: str):
+        self._tape.action(SEND, message)
+        return await self._conversation.send_message(message)
+
+    async def get_response(self):
+        response = await self._conversation.get_response()
+        self._tape.replies([response])
+        return _RecordingMessage(response, self._tape)
+
+    def __getattr__(self, name):
+        return getattr(self._conversation, name)
+
+
+class _RecordingCollector:
+    def __init__(self, collector, tape: _Tape):
+        self._collector = collector
+        self._tape = tape
+
+    async def collect(self, first_timeout: float, settle: float, hard_cap: float) -> list:
+        batch = await self._collector.collect(first_timeout, settle, hard_cap)
+        self._tape.replies(batch, self._collector.batch_first_arrival)
+        return [_RecordingMessage(m, self._tape) for m in batch]
+
+    def __getattr__(self, name):
+        return getattr(self._collector, name)
+
+
+class RecordingAdapter:
+    """
+    Обертка над адаптером, которая пишет разговоры в кассету. Кассета
+    сохраняется в path после каждого разговора, поэтому прерванный прогон
+    не теряет уже записанное. Остальные методы (ping, name, cooldown)
+    делегируются обернутому адаптеру.
+    """
+
+    def __init__(self, adapter, cassette: Cassette, path=None):
+        self.adapter = adapter
+        self.cassette = cassette
+        self.path = path
+        self._tape: _Tape | None = None
+        self.supports_collector = supports_collector(adapter)
+
+    def __getattr__(self, name):
+        return getattr(self.adapter, name)
+
+    @asynccontextmanager
+    async def conversation(self, bot_username: str, timeout: float = 15):
+        tape = self._tape = _Tape()
+        try:
+            async with self.adapter.conversation(bot_username, timeout=timeout) as conversation:
+                yield _RecordingConversation(conversation, tape)
+        finally:
+            self._tape = None
+            if tape.exchanges:
+                self.cassette.conversations.append(tape.exchanges)
+                if self.path is not None:
+                    self.cassette.save(self.path)
+
+    @asynccontextmanager
+    async def collector(self, bot_username: str):
+        async with self.adapter.collector(bot_username) as collector:
+            yield _RecordingCollector(collector, self._tape) if self._tape else collector
+
+
+# --- ВОСПРОИЗВЕДЕНИЕ ---
+
+
+class ReplayConversation:
+    """
+    Разговор по кассете. Кандидаты — записанные разговоры, которые совпадают
+    со всеми действиями до сих пор; ответ берется из ближайшего совпадения
+    после курсора (лишние записанные шаги пропускаются, циклы идут дальше по
+    записи). Без strict действие, которого нет в записи (другой вариант
+    «Отправляет одно из»), получает ответ на следующее действие того же вида.
+    """
+
+    def __init__(self, adapter: "ReplayAdapter", timeout: float):
+        self.adapter = adapter
+        self.timeout = timeout
+        self.candidates = [(idx, 0) for idx in range(len(adapter.cassette.conversations))]
+        self.sent_messages: list[str] = []
+        self._responses: asyncio.Queue = asyncio.Queue()
+        self._tasks: set[asyncio.Task] = set()
+
+    def _advance(self, kind: str, text: str, loose: bool) -> Exchange | None:
+        key = text.strip().lower()
+        matches = []
+        for idx, cursor in self.candidates:
+            tape = self.adapter.cassette.conversations[idx]
+            for pos in range(cursor, len(tape)):
+                exchange = tape[pos]
+                if exchange.action == kind and (loose or (exchange.text or "").strip().lower() == key):
+                    matches.append((pos - cursor, idx, pos))
+                    break
+        if not matches:
+            return None
+        self.candidates = [(idx, pos + 1) for _, idx, pos in sorted(matches)]
+        _, idx, pos = min(matches)
+        return self.adapter.cassette.conversations[idx][pos]
+
+    def on_action(self, kind: str, text: str) -> None:
+        exchange = self._advance(kind, text, loose=False)
+        if exchange is None and not self.adapter.strict:
+            exchange = self._advance(kind, text, loose=True)
+        if exchange is None:
+            logger.warning(f"📼 В кассете нет ответа на {kind} '{text[:60]}', бот молчит.")
+            return
+        task = asyncio.create_task(self._deliver(exchange))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _deliver(self, exchange: Exchange) -> None:
+        speed = self.adapter.speed
+        await asyncio.sleep(exchange.delay * speed)
+        count = len(exchange.replies)
+        gap = (exchange.settled - exchange.delay) / (count - 1) if count > 1 else 0.0
+        for idx, reply in enumerate(exchange.replies):
+            if idx and gap > 0:
+                await asyncio.sleep(gap * speed)
+            buttons = (
+                [[SimulatedButton(label, self) for label in row] for row in reply.buttons]
+                if reply.buttons
+                else None
+            )
+            message = SimulatedMessage(reply.id, reply.text, buttons)
+            self._responses.put_nowait(message)
+            self.adapter.emit(message)
+
+    def on_button(self, label: str) -> None:
+        self.on_action(CLICK, label)
+
+    async def send_message(self, message: str) -> None:
+        self.sent_messages.append(message)
+        self.on_action(SEND, message)
+
+    async def get_response(self):
+        return await asyncio.wait_for(self._responses.get(), timeout=self.timeout)
+
+    def close(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+
+
+class ReplayAdapter:
+    """
+    ConversationAdapter поверх кассеты. speed — множитель записанных задержек
+    (0 — мгновенно, 1 — как у настоящего бота); events=False отключает collector.
+    """
+
+    def __init__(
+        self,
+        cassette: Cassette,
+        name: str = "replay",
+        speed: float = 0.0,
+        strict: bool = False,
+        events: bool = True,
+    ):
+        self.cassette = cassette
+        self.name = name
+        self.speed = speed
+        self.strict = strict
+        self.connected = False
+        self._collectors: list[ResponseCollector] = []
+        self.supports_collector = events
+
+    async def connect(self) -> None:
+        self.connected = True
+
+    async def disconnect(self) -> None:
+        self.connected = False
+
+    async def is_user_authorized(self) -> bool:
+        return True
+
+    async def ping(self) -> None:
+        if not self.connected:
+            raise ConnectionError("Replay adapter is not connected.")
+
+    def emit(self, message: SimulatedMessage) -> None:
+        for collector in self._collectors:
+            collector.feed(message)
+
+    @asynccontextmanager
+    async def conversation(self, bot_username: str, timeout: float = 15):
+        conversation = ReplayConversation(self, timeout)
+        try:
+            yield conversation
+        finally:
+            conversation.close()
+
+    @asynccontextmanager
+    async def collector(self, bot_username: str):
+        collector = ResponseCollector()
+        self._collectors.append(collector)
+        try:
+            yield collector
+        finally:
+            self._collectors.remove(collector)
+
+
+async def replay_suite(path, names=None, speed: float = 0.0, strict: bool = False, sessions: int = 4):
+    """Прогон сценариев из CSV по кассете: без Telegram, результаты — как у run_suite."""
+    from src.app import run_scenarios_concurrently, scenario_repository
+    from src.pool import SessionPool
+
+    cassette = Cassette.load(path)
+    snapshot = scenario_repository.snapshot()
+    names = list(names or snapshot.names)
+    adapters = [
+        ReplayAdapter(cassette, name=f"replay-{idx}", speed=speed, strict=strict)
+        for idx in range(max(1, sessions))
+    ]
+    pool = SessionPool(adapters)
+    await pool.start()
+    try:
+        return await run_scenarios_concurrently(
+            pool, [(name, snapshot.programs[name]) for name in names if name in snapshot.programs]
+        )
+    finally:
+        await pool.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("cassette", help="файл кассеты (JSON)")
+    parser.add_argument("--scenario", action="append", help="сценарий (по умолчанию — все)")
+    parser.add_argument("--speed", type=float, default=0.0, help="множитель записанных задержек")
+    parser.add_argument("--strict", action="store_true", help="только точные совпадения действий")
+    args = parser.parse_args()
+
+    results = asyncio.run(replay_suite(args.cassette, args.scenario, args.speed, args.strict))
+    for result in results:
+        status = "✅" if result.success else "❌"
+        print(f"{status} {result.name}: {result.duration:.3f} с")
+    raise SystemExit(0 if results and all(r.success for r in results) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+
+logger = logging.getLogger("TestEngine")
+
+
+def program_digest(program) -> str:
+    """Хеш скомпилированных инструкций: чекпоинт чужой версии сценария не подойдет."""
+    return hashlib.sha256(repr(program.instructions).encode("utf-8")).hexdigest()
+
+
+@dataclass
+class Checkpoint:
+    """
+    Состояние интерпретатора перед шагом index: счетчики REPEAT и текст
+    последнего ответа бота. Само сообщение (с кнопками) не сериализуется —
+    при возобновлении адаптер перечитывает его из чата.
+    """
+
+    scenario: str
+    digest: str
+    index: int
+    step: int | str
+    repeat_counters: dict[int, int] = field(default_factory=dict)
+    last_bot_response: str = ""
+    session: str | None = None
+    run_id: str | None = None
+    ts: float = field(default_factory=time.time)
+
+    @property
+    def key(self) -> str:
+        return f"{self.run_id}/{self.scenario}" if self.run_id else self.scenario
+
+
+class CheckpointStore:
+    """
+    Чекпоинты сценариев в JSON-файле, ключ — прогон и сценарий (с вариантом),
+    так что параллельные прогоны и варианты не затирают друг друга. Файл
+    читается один раз, дальше состояние живет в памяти; запись — только при
+    изменении и в потоке (asyncio.to_thread), чтобы не блокировать event loop.
+    Успешный прогон удаляет чекпоинты своего сценария на своей сессии, от
+    упавших и брошенных остаются keep последних на сценарий (и не старше max_age
+    секунд, если он задан).
+    """
+
+    def __init__(self, path, keep: int = 3, max_age: float | None = None):
+        self.path = Path(path)
+        self.keep = keep
+        self.max_age = max_age
+        self._lock = threading.Lock()  # состояние в памяти
+        self._write_lock = threading.Lock()  # запись файла
+        self._data: dict[str, dict] | None = None
+        self._version = 0
+        self._written = 0
+
+    def _read(self) -> dict[str, dict]:
+        if not self.path.exists():
+            return {}
+        try:
+            return json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError) as e:
+            logger.warning(f"⚠️ Не удалось прочитать {self.path.name}, чекпоинты сброшены: {e}")
+            return {}
+
+    def _entries(self) -> dict[str, dict]:
+        if self._data is None:
+            self._data = self._read()
+            if self._prune():
+                self._version += 1
+        return self._data
+
+    def _prune(self, scenario: str | None = None) -> bool:
+        """Удаляет устаревшие чекпоинты и лишние сверх keep на сценарий; True — что-то удалено."""
+        deadline = time.time() - self.max_age if self.max_age is not None else float("-inf")
+        by_scenario: dict[str, list[tuple[float, str]]] = {}
+        stale = []
+        for key, data in self._data.items():
+            if scenario is not None and data.get("scenario") != scenario:
+                continue
+            if data.get("ts", 0.0) < deadline:
+                stale.append(key)
+            else:
+                by_scenario.setdefault(data.get("scenario"), []).append((data.get("ts", 0.0), key))
+        for entries in by_scenario.values():
+            stale.extend(key for _, key in sorted(entries, reverse=True)[self.keep :])
+        for key in stale:
+            del self._data[key]
+        return bool(stale)
+
+    def latest_session(self, scenario: str) -> str | None:
+        """Сессия последнего чекпоинта сценария: resume арендует именно ее."""
+        with self._lock:
+            found = [data for data in self._entries().values() if data.get("scenario") == scenario]
+        if not found:
+            return None
+        return max(found, key=lambda data: data.get("ts", 0.0)).get("session")
+
+    def _flush(self) -> None:
+        """Пишет последнее состояние; запись, которую уже обогнала более новая, пропускается."""
+        with self._write_lock:
+            with self._lock:
+                if self._version == self._written:
+                    return
+                version = self._version
+                payload = json.dumps(self._data, ensure_ascii=False, indent=1)
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(".tmp")
+            tmp.write_text(payload, encoding="utf-8")
+            os.replace(tmp, self.path)
+            self._written = version
+
+    def load(self, scenario: str, digest: str, session: str | None = None) -> Checkpoint | None:
+        """
+        Последний чекпоинт сценария, если он снят с той же версии и той же
+        сессии (состояние бота — на аккаунте).
+        """
+        with self._lock:
+            found = [dict(data) for data in self._entries().values() if data.get("scenario") == scenario]
+        if not found:
+            return None
+        own = [data for data in found if data.get("session") == session]
+        if not own:
+            latest = max(found, key=lambda data: data.get("ts", 0.0))
+            logger.error(
+                f"❌ Чекпоинт '{scenario}' снят на сессии {latest.get('session')}, а выдана {session}: "
+                f"продолжить нельзя (сессия не подключилась?), запуск с начала."
+            )
+            return None
+        checkpoint = Checkpoint(**max(own, key=lambda data: data.get("ts", 0.0)))
+        checkpoint.repeat_counters = {int(k): v for k, v in checkpoint.repeat_counters.items()}
+        if checkpoint.digest != digest:
+            logger.warning(f"⚠️ Сценарий '{scenario}' изменился после чекпоинта, запуск с начала.")
+            return None
+        return checkpoint
+
+    async def save(self, checkpoint: Checkpoint) -> None:
+        data = asdict(checkpoint)
+        with self._lock:
+            entries = self._entries()
+            previous = entries.get(checkpoint.key)
+            # Тот же шаг с тем же состоянием (повтор шага) — писать нечего
+            if previous is not None and {**previous, "ts": data["ts"]} == data:
+                return
+            entries[checkpoint.key] = data
+            self._prune(checkpoint.scenario)
+            self._version += 1
+        await asyncio.to_thread(self._flush)
+
+    async def clear(self, scenario: str, session: str | None = None) -> None:
+        with self._lock:
+            entries = self._entries()
+            stale = [
+                key
+                for key, data in entries.items()
+                if data.get("scenario") == scenario and data.get("session") == session
+            ]
+            if not stale:
+                return
+            for key in stale:
+                del entries[key]
+            self._version += 1
+        await asyncio.to_thread(self._flush)
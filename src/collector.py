@@ -0,0 +1,66 @@
+import asyncio
+
+
+class ResponseCollector:
+    """
+    Копит сообщения бота из событий «новое сообщение» и «редактирование».
+    collect() ждет первое сообщение, а затем «тишину»: пачка считается
+    полной, если settle секунд не приходило ничего нового (но не дольше hard_cap).
+    Редактирование еще не прочитанного сообщения заменяет его в пачке.
+    """
+
+    def __init__(self):
+        self._pending: list = []
+        self._changed = asyncio.Event()
+        self.first_arrival: float | None = None
+        self.last_arrival: float | None = None
+        # Время первого и последнего сообщения последней выданной пачки (loop.time())
+        self.batch_first_arrival: float | None = None
+        self.batch_last_arrival: float | None = None
+
+    def feed(self, message) -> None:
+        now = asyncio.get_running_loop().time()
+        message_id = getattr(message, "id", None)
+        for idx, pending in enumerate(self._pending):
+            if message_id is not None and getattr(pending, "id", None) == message_id:
+                self._pending[idx] = message
+                break
+        else:
+            self._pending.append(message)
+        if self.first_arrival is None:
+            self.first_arrival = now
+        self.last_arrival = now
+        self._changed.set()
+
+    async def _wait_change(self, timeout: float) -> bool:
+        self._changed.clear()
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+    async def collect(self, first_timeout: float, settle: float, hard_cap: float) -> list:
+        """Возвращает пачку сообщений; asyncio.TimeoutError, если бот молчит first_timeout."""
+        loop = asyncio.get_running_loop()
+        if not self._pending and not await self._wait_change(first_timeout):
+            raise asyncio.TimeoutError("No response from bot")
+
+        deadline = loop.time() + hard_cap
+        while (remaining := deadline - loop.time()) > 0:
+            if not await self._wait_change(min(settle, remaining)):
+                break
+
+        batch, self._pending = self._pending, []
+        self.batch_first_arrival, self.first_arrival = self.first_arrival, None
+        self.batch_last_arrival, self.last_arrival = self.last_arrival, None
+        return batch
+
+
+def supports_collector(adapter) -> bool:
+    """
+    Адаптер отдает ответы пачками через collector(). Адаптер может выключить
+    подписку флагом supports_collector = False (симулятор с events=False,
+    кассеты): тогда ответы читаются через get_response.
+    """
+    return callable(getattr(adapter, "collector", None)) and getattr(adapter, "supports_collector", True)
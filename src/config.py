@@ -1,3 +1,4 @@
+import json
 import os
 from pathlib import Path
 
@@ -20,6 +21,10 @@ TELEGRAM_DC = (
     else None
 )
 
+# Клиентская библиотека: telethon (по умолчанию) или pyrogram. Форматы сессий
+# несовместимы: для pyrogram нужны сессии из generate_session.py.
+TELEGRAM_CLIENT = os.getenv("TELEGRAM_CLIENT", "telethon")
+
 # Имя бота, которого тестируем
 BOT_USERNAME = '@jugru_conf_bot'
 
@@ -34,3 +39,110 @@ LOG_DIR.mkdir(exist_ok=True)
 SESSION_DIR.mkdir(exist_ok=True)
 
 SESSION_FILE = SESSION_DIR / "tester.session"
+
+# Манифест пула, который пишет python -m src.provision (аккаунты Test DC)
+SESSION_MANIFEST = Path(os.getenv("SESSION_MANIFEST", SESSION_DIR / "pool.json"))
+
+
+def _manifest_sessions(path: Path) -> list[str]:
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return []
+    return [entry["name"] for entry in data.get("sessions", []) if entry.get("status") == "ok"]
+
+
+# Пул сессий для параллельного прогона: TELEGRAM_SESSIONS=tester,tester2,tester3,
+# иначе — готовые сессии из манифеста, иначе — одна tester.
+# Каждой сессии соответствует свой файл sessions/<имя>.session.
+SESSION_NAMES = [
+    name.strip()
+    for name in os.getenv("TELEGRAM_SESSIONS", "").split(",")
+    if name.strip()
+] or _manifest_sessions(SESSION_MANIFEST) or ["tester"]
+SESSION_FILES = [SESSION_DIR / f"{name}.session" for name in SESSION_NAMES]
+# Где клиент Telethon держит сессию: memory — ключи читаются с диска один раз
+# и живут в памяти (src/sessions.py), sqlite — прежняя работа прямо с файлом
+SESSION_STORAGE = os.getenv("SESSION_STORAGE", "memory")
+# Сколько сценариев выполняется одновременно (по умолчанию — по числу сессий)
+RUN_CONCURRENCY = int(os.getenv("RUN_CONCURRENCY", "0")) or len(SESSION_FILES)
+
+# Постоянное соединение: проверка живости и переподключение
+KEEPALIVE_INTERVAL = float(os.getenv("TELEGRAM_KEEPALIVE_INTERVAL", "60"))
+RECONNECT_BACKOFF_MAX = float(os.getenv("TELEGRAM_RECONNECT_BACKOFF_MAX", "60"))
+RECONNECT_ATTEMPTS = int(os.getenv("TELEGRAM_RECONNECT_ATTEMPTS", "3"))
+
+# Очередь прогонов: число воркеров, размер очереди и сколько задач помнить
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "1"))
+JOB_QUEUE_SIZE = int(os.getenv("JOB_QUEUE_SIZE", "20"))
+JOB_HISTORY = int(os.getenv("JOB_HISTORY", "100"))
+
+# Ожидание ответов бота: пачка сообщений закрывается после паузы RESPONSE_SETTLE_MS
+RESPONSE_TIMEOUT = float(os.getenv("RESPONSE_TIMEOUT", "15"))
+RESPONSE_SETTLE_MS = int(os.getenv("RESPONSE_SETTLE_MS", "400"))
+RESPONSE_HARD_CAP = float(os.getenv("RESPONSE_HARD_CAP", "10"))
+# Сколько ждать ответа на шаге, где ответ не проверяется
+NO_REPLY_TIMEOUT = float(os.getenv("NO_REPLY_TIMEOUT", "1"))
+# Кэш скомпилированных шаблонов ответов: должен вмещать все шаблоны набора
+# сценариев, иначе прогон по кругу вытесняет их раньше повторного использования
+MATCHER_CACHE_SIZE = int(os.getenv("MATCHER_CACHE_SIZE", "4096"))
+
+# Отчеты прогонов (JSONL) и текстовый лог
+REPORT_DIR = LOG_DIR / "runs"
+REPORT_MAX_BYTES = int(os.getenv("REPORT_MAX_BYTES", str(10 * 1024 * 1024)))
+REPORT_KEEP_RUNS = int(os.getenv("REPORT_KEEP_RUNS", "200"))
+LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", str(5 * 1024 * 1024)))
+LOG_BACKUP_COUNT = int(os.getenv("LOG_BACKUP_COUNT", "5"))
+
+# Живой поток событий прогона (SSE): keep-alive, пока шаг ждет ответа
+SSE_HEARTBEAT = float(os.getenv("SSE_HEARTBEAT", "15"))
+
+# Троттлинг запросов каждой сессии: частота и пачка отправок сообщений (по
+# умолчанию 1 в секунду и до 3 подряд — в пределах лимитов Telegram на личные
+# чаты; прочтение, кнопки и служебные запросы не ограничиваются), повторы
+# после временных сбоев, самый длинный FloodWait, который еще пережидаем
+SEND_RATE = float(os.getenv("TELEGRAM_SEND_RATE", "1"))
+SEND_BURST = float(os.getenv("TELEGRAM_SEND_BURST", "3"))
+RPC_RETRIES = int(os.getenv("TELEGRAM_RPC_RETRIES", "3"))
+FLOOD_WAIT_MAX = float(os.getenv("TELEGRAM_FLOOD_WAIT_MAX", "60"))
+
+# Зависимости сценариев (JSON: {"Сценарий B": ["Сценарий A"]}) и воркеры
+# распределенного прогона (через запятую: http://worker1:8000,http://worker2:8000)
+SCENARIO_DEPENDENCIES_FILE = Path(os.getenv("SCENARIO_DEPENDENCIES", BASE_DIR / "dependencies.json"))
+WORKER_URLS = [url.strip() for url in os.getenv("WORKER_URLS", "").split(",") if url.strip()]
+WORKER_POLL_INTERVAL = float(os.getenv("WORKER_POLL_INTERVAL", "2"))
+
+# Последний результат каждого сценария (для /run?mode=failed|changed)
+OUTCOMES_FILE = Path(os.getenv("OUTCOMES_FILE", LOG_DIR / "outcomes.json"))
+
+# Повторы шага после таймаута/ошибки и чекпоинты состояния сценария
+# (SCENARIO_CHECKPOINTS=1): упавший или прерванный сценарий можно продолжить
+# с последнего пройденного шага (/run?resume=true)
+STEP_RETRIES = int(os.getenv("STEP_RETRIES", "0"))
+STEP_RETRY_DELAY = float(os.getenv("STEP_RETRY_DELAY", "1"))
+CHECKPOINTS_ENABLED = os.getenv("SCENARIO_CHECKPOINTS", "0") == "1"
+CHECKPOINTS_FILE = Path(os.getenv("CHECKPOINTS_FILE", LOG_DIR / "checkpoints.json"))
+# Чекпоинты упавших и брошенных прогонов: сколько хранить на сценарий и как долго
+CHECKPOINTS_KEEP = int(os.getenv("CHECKPOINTS_KEEP", "3"))
+CHECKPOINTS_MAX_AGE = float(os.getenv("CHECKPOINTS_MAX_AGE_HOURS", "168")) * 3600
+
+# Кассеты: record — писать разговоры с ботом в CASSETTE_FILE, replay — отвечать
+# по записи без Telegram (CASSETTE_SPEED: 0 — мгновенно, 1 — с записанными задержками)
+CASSETTE_MODE = os.getenv("CASSETTE_MODE", "")
+CASSETTE_FILE = Path(os.getenv("CASSETTE_FILE", LOG_DIR / "cassette.json"))
+CASSETTE_SPEED = float(os.getenv("CASSETTE_SPEED", "0"))
+
+# Развертывание шагов «Отправляет одно из» в варианты (/run?expand=...):
+# размер выборки sample, seed (пусто — случайный), предел числа вариантов и
+# значения для вариантов-плейсхолдеров (<название случайной профессии>)
+VARIANT_SAMPLES = int(os.getenv("VARIANT_SAMPLES", "20"))
+VARIANT_SEED = int(os.getenv("VARIANT_SEED")) if os.getenv("VARIANT_SEED") else None
+VARIANT_LIMIT = int(os.getenv("VARIANT_LIMIT", "256"))
+VARIANT_PLACEHOLDER_VALUES = [
+    value.strip() for value in os.getenv("VARIANT_PLACEHOLDER_VALUES", "").split(",") if value.strip()
+]
+
+# Пакетное создание аккаунтов Test DC (python -m src.provision): сколько
+# аккаунтов регистрируется одновременно и частота запросов кода на весь пакет
+PROVISION_CONCURRENCY = int(os.getenv("PROVISION_CONCURRENCY", "3"))
+PROVISION_RATE = float(os.getenv("PROVISION_RATE", "0.2"))
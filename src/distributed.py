@@ -0,0 +1,178 @@
+"""
+Распределенный прогон: координатор делит сценарии на шарды по историческим
+длительностям и раздает их воркерам — обычным экземплярам сервиса со своими
+аккаунтами. Воркер выполняет шард как задачу (POST /shards), координатор
+опрашивает GET /jobs/{id} и собирает результаты.
+
+Запуск из корня репозитория:
+    python -m src.distributed --worker http://worker1:8000 --worker http://worker2:8000
+    WORKER_URLS=http://worker1:8000,http://worker2:8000 python -m src.distributed
+"""
+import argparse
+import asyncio
+import heapq
+import json
+import logging
+import statistics
+import urllib.error
+import urllib.request
+
+from src.app import ScenarioResult, create_run_report, outcome_store, scenario_repository
+from src.config import REPORT_DIR, SCENARIO_DEPENDENCIES_FILE, WORKER_POLL_INTERVAL, WORKER_URLS
+from src.jobs import FINISHED
+from src.reports import read_index
+from src.scenarios import dependency_groups, load_dependencies, suite_digest
+
+logger = logging.getLogger("TestEngine")
+
+
+class WorkerError(Exception):
+    """Воркер недоступен или отклонил шард."""
+
+
+def historical_durations(directory, runs: int = 20) -> dict[str, float]:
+    """Медианная длительность сценариев по последним runs прогонам из индекса отчетов."""
+    samples: dict[str, list[float]] = {}
+    for entry in read_index(directory, runs):
+        for scenario in entry.get("scenarios", []):
+            if scenario.get("duration"):
+                samples.setdefault(scenario["name"], []).append(scenario["duration"])
+    return {name: statistics.median(values) for name, values in samples.items()}
+
+
+def plan_shards(
+    groups: list[list[str]], durations: dict[str, float], workers: int
+) -> list[list[str]]:
+    """
+    Раскладывает группы сценариев по workers шардам жадным LPT: самые долгие
+    группы первыми, каждая — в наименее загруженный шард. Сценарии без истории
+    получают медиану известных длительностей. Группа не делится между шардами.
+    """
+    default = statistics.median(durations.values()) if durations else 1.0
+
+    def cost(group: list[str]) -> float:
+        return sum(durations.get(name, default) for name in group)
+
+    shards: list[list[str]] = [[] for _ in range(max(1, workers))]
+    heap = [(0.0, idx) for idx in range(len(shards))]
+    for group in sorted(groups, key=cost, reverse=True):
+        load, idx = heapq.heappop(heap)
+        shards[idx].extend(group)
+        heapq.heappush(heap, (load + cost(group), idx))
+    return [shard for shard in shards if shard]
+
+
+class WorkerClient:
+    """HTTP-клиент воркера на stdlib: запросы уходят в поток, event loop не блокируется."""
+
+    def __init__(self, url: str, timeout: float = 30):
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+
+    def _request(self, method: str, path: str, body: dict | None = None) -> dict:
+        data = json.dumps(body).encode("utf-8") if body is not None else None
+        request = urllib.request.Request(
+            self.url + path,
+            data=data,
+            method=method,
+            headers={"Content-Type": "application/json"},
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return json.loads(response.read().decode("utf-8"))
+        except urllib.error.HTTPError as e:
+            detail = e.read().decode("utf-8", "replace")
+            raise WorkerError(f"{self.url}{path}: HTTP {e.code} {detail}") from e
+        except (urllib.error.URLError, OSError) as e:
+            raise WorkerError(f"{self.url}{path}: {e}") from e
+
+    async def submit(self, scenarios: list[str], digest: str) -> str:
+        body = {"scenarios": scenarios, "digest": digest}
+        return (await asyncio.to_thread(self._request, "POST", "/shards", body))["job_id"]
+
+    async def job(self, job_id: str) -> dict:
+        return await asyncio.to_thread(self._request, "GET", f"/jobs/{job_id}")
+
+
+async def _run_shard(
+    clients: list[WorkerClient], first: int, shard: list[str], digest: str, poll: float
+) -> list[ScenarioResult]:
+    """Шард выполняется на своем воркере; если воркер недоступен — на следующем по кругу."""
+    last_error = None
+    for offset in range(len(clients)):
+        client = clients[(first + offset) % len(clients)]
+        try:
+            job_id = await client.submit(shard, digest)
+            logger.info(f"🛰 Шард из {len(shard)} сценариев -> {client.url} (задача {job_id}).")
+            while (job := await client.job(job_id))["status"] not in FINISHED:
+                await asyncio.sleep(poll)
+        except WorkerError as e:
+            logger.error(f"🛰 Воркер {client.url} не выполнил шард: {e}")
+            last_error = e
+            continue
+        done = {
+            r["name"]: ScenarioResult(r["name"], r["success"], r["duration"]) for r in job["results"]
+        }
+        return [done.get(name, ScenarioResult(name, False, 0.0)) for name in shard]
+    logger.error(f"🛰 Шард не выполнен ни одним воркером: {last_error}")
+    return [ScenarioResult(name, False, 0.0) for name in shard]
+
+
+async def run_distributed(
+    workers: list[str], names=None, poll_interval: float = WORKER_POLL_INTERVAL
+) -> list[ScenarioResult]:
+    """
+    Прогон сценариев (всех или names) на воркерах. Итог пишется в индекс
+    отчетов координатора, поэтому следующий прогон балансируется по нему.
+    """
+    if not workers:
+        raise ValueError("Distributed run requires at least one worker URL.")
+    snapshot = scenario_repository.snapshot()
+    names = list(names or snapshot.names)
+    missing = [name for name in names if name not in snapshot.names]
+    if missing:
+        raise LookupError(f"Сценарий '{missing[0]}' не найден.")
+
+    groups = [
+        [names[idx] for idx in group]
+        for group in dependency_groups(names, load_dependencies(SCENARIO_DEPENDENCIES_FILE))
+    ]
+    shards = plan_shards(groups, historical_durations(REPORT_DIR), len(workers))
+    digest = suite_digest(snapshot.digest, SCENARIO_DEPENDENCIES_FILE)
+    clients = [WorkerClient(url) for url in workers]
+
+    report = await create_run_report().start()
+    results: list[ScenarioResult] = []
+    try:
+        per_shard = await asyncio.gather(
+            *(
+                _run_shard(clients, idx, shard, digest, poll_interval)
+                for idx, shard in enumerate(shards)
+            )
+        )
+        by_name = {r.name: r for shard in per_shard for r in shard}
+        results = [by_name[name] for name in names]
+        outcome_store.update(results, snapshot.hashes)
+        return results
+    finally:
+        await asyncio.shield(report.close(results))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("--worker", action="append", help="URL воркера (можно несколько раз)")
+    parser.add_argument("--scenario", action="append", help="сценарий (по умолчанию — все)")
+    args = parser.parse_args()
+
+    results = asyncio.run(run_distributed(args.worker or WORKER_URLS, args.scenario))
+    for result in results:
+        status = "✅" if result.success else "❌"
+        print(f"{status} {result.name}: {result.duration:.1f} с")
+    raise SystemExit(0 if results and all(r.success for r in results) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+import asyncio
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, field, is_dataclass
+
+from src.stream import EventStream
+
+logger = logging.getLogger("TestEngine")
+
+# Статусы задачи
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+FINISHED = frozenset({COMPLETED, FAILED, CANCELLED})
+
+
+class QueueFullError(Exception):
+    """Очередь задач заполнена — новый прогон не принят."""
+
+
+@dataclass
+class Job:
+    id: str
+    scenario: str | list[str] | None  # None — все сценарии
+    fail_fast: bool = False
+    resume: bool = False  # продолжить сценарии с чекпоинтов
+    expand: str | None = None  # развернуть шаги-варианты (src.variants)
+    status: str = QUEUED
+    created_at: float = field(default_factory=time.time)
+    started_at: float | None = None
+    finished_at: float | None = None
+    results: list = field(default_factory=list)
+    error: str | None = None
+    task: asyncio.Task | None = field(default=None, repr=False)
+    done: asyncio.Event = field(default_factory=asyncio.Event, repr=False)
+    events: EventStream = field(default_factory=EventStream, repr=False)
+
+    @property
+    def duration(self) -> float | None:
+        if self.started_at is None:
+            return None
+        return (self.finished_at or time.time()) - self.started_at
+
+    def to_dict(self, with_results: bool = True) -> dict:
+        data = {
+            "id": self.id,
+            "scenario": self.scenario,
+            "fail_fast": self.fail_fast,
+            "resume": self.resume,
+            "expand": self.expand,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "duration": self.duration,
+            "error": self.error,
+        }
+        if with_results:
+            data["results"] = [asdict(r) if is_dataclass(r) else r for r in self.results]
+        return data
+
+
+class JobManager:
+    """
+    Очередь прогонов с ограниченным числом воркеров.
+    runner(job) — корутина, возвращающая список результатов по сценариям;
+    успех задачи = все результаты успешны.
+    """
+
+    def __init__(self, runner, workers: int = 1, max_queue: int = 20, history: int = 100):
+        self.runner = runner
+        self.workers = workers
+        self.history = history
+        self.jobs: OrderedDict[str, Job] = OrderedDict()
+        self._queue: asyncio.Queue[Job] = asyncio.Queue(maxsize=max_queue)
+        self._workers: list[asyncio.Task] = []
+
+    async def start(self) -> None:
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        for job in self.jobs.values():
+            if job.status not in FINISHED:
+                self.cancel(job.id)
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    def submit(
+        self,
+        scenario: str | list[str] | None = None,
+        fail_fast: bool = False,
+        resume: bool = False,
+        expand: str | None = None,
+    ) -> Job:
+        job = Job(
+            id=uuid.uuid4().hex, scenario=scenario, fail_fast=fail_fast, resume=resume, expand=expand
+        )
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            raise QueueFullError("Job queue is full") from None
+        self.jobs[job.id] = job
+        self._prune()
+        logger.info(f"📥 Задача {job.id} поставлена в очередь (сценарий: {scenario or 'все'}).")
+        return job
+
+    def get(self, job_id: str) -> Job | None:
+        return self.jobs.get(job_id)
+
+    def list(self) -> list[Job]:
+        return list(reversed(self.jobs.values()))
+
+    def cancel(self, job_id: str) -> Job | None:
+        job = self.jobs.get(job_id)
+        if job is None or job.status in FINISHED:
+            return job
+        if job.status == QUEUED:
+            self._finish(job, CANCELLED)
+        elif job.task is not None:
+            job.task.cancel()
+        return job
+
+    async def wait(self, job: Job) -> Job:
+        await job.done.wait()
+        return job
+
+    def _finish(self, job: Job, status: str, error: str | None = None) -> None:
+        job.status = status
+        job.error = error
+        job.finished_at = time.time()
+        job.done.set()
+        job.events.close(
+            {"event": "job_finished", "job_id": job.id, "status": status, "error": error, "ts": job.finished_at}
+        )
+
+    def _prune(self) -> None:
+        """Храним ограниченную историю: удаляем самые старые завершенные задачи."""
+        finished = [job_id for job_id, job in self.jobs.items() if job.status in FINISHED]
+        for job_id in finished[: max(0, len(self.jobs) - self.history)]:
+            del self.jobs[job_id]
+
+    async def _worker(self) -> None:
+        while True:
+            job = await self._queue.get()
+            try:
+                if job.status == CANCELLED:
+                    continue
+                job.status = RUNNING
+                job.started_at = time.time()
+                job.events({"event": "job_started", "job_id": job.id, "ts": job.started_at})
+                job.task = asyncio.create_task(self.runner(job))
+                try:
+                    job.results = list(await job.task)
+                except asyncio.CancelledError:
+                    self._finish(job, CANCELLED)
+                    logger.info(f"🛑 Задача {job.id} отменена.")
+                    if asyncio.current_task().cancelling():
+                        raise  # останавливают сам воркер
+                except Exception as e:
+                    logger.exception(f"💥 Задача {job.id} упала: {e}")
+                    self._finish(job, FAILED, str(e))
+                else:
+                    success = bool(job.results) and all(r.success for r in job.results)
+                    self._finish(job, COMPLETED if success else FAILED)
+            finally:
+                self._queue.task_done()
@@ -0,0 +1,398 @@
+"""
+Нагрузочный режим: много виртуальных пользователей проходят сценарии из
+scenarios.csv одновременно. Каждый пользователь арендует сессию из пула на
+итерацию, поэтому нагрузка идет через настоящие диалоги с ботом (или через
+симулятор без сети).
+
+Запуск из корня репозитория:
+    python -m src.load --simulator --users 50 --ramp-up 10 --duration 60
+    python -m src.load --users 5 --duration 300 --pacing 30 --scenario "Регистрация"
+    python -m src.load --simulator --users 50 --rate 20 --arrival poisson --duration 60
+"""
+import argparse
+import asyncio
+import json
+import logging
+import math
+import random
+import time
+from collections import Counter
+from dataclasses import dataclass
+
+from src.app import BotTester, create_session_pool, scenario_repository
+from src.histogram import HdrHistogram
+from src.pool import SessionPool
+from src.scenarios import ScenarioProgram
+from src.simulator import Latency, simulator_for
+
+logger = logging.getLogger("TestEngine")
+
+
+@dataclass
+class LoadProfile:
+    users: int = 10  # целевое число одновременных пользователей
+    ramp_up: float = 0.0  # за сколько секунд стартуют все пользователи
+    duration: float = 60.0  # удержание нагрузки после разгона, с
+    pacing: float = 0.0  # интервал между стартами итераций одного пользователя (0 — без пауз)
+    iterations: int | None = None  # лимит итераций на пользователя
+
+    @property
+    def target_rate(self) -> float | None:
+        """Целевая частота сценариев в секунду при заданном pacing."""
+        return self.users / self.pacing if self.pacing else None
+
+
+class LatencyStats:
+    """Выборка задержек (в секундах) с перцентилями."""
+
+    def __init__(self):
+        self.values: list[float] = []
+        self._sorted = True
+
+    def record(self, value: float) -> None:
+        if self.values and value < self.values[-1]:
+            self._sorted = False
+        self.values.append(value)
+
+    @property
+    def count(self) -> int:
+        return len(self.values)
+
+    def percentile(self, q: float) -> float:
+        if not self.values:
+            return 0.0
+        if not self._sorted:
+            self.values.sort()
+            self._sorted = True
+        rank = max(1, math.ceil(q / 100 * len(self.values)))
+        return self.values[rank - 1]
+
+    def summary(self) -> dict:
+        if not self.values:
+            return {"count": 0}
+        return {
+            "count": self.count,
+            "mean": sum(self.values) / self.count,
+            "p50": self.percentile(50),
+            "p90": self.percentile(90),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99),
+            "max": self.percentile(100),
+        }
+
+
+class LoadStats:
+    """
+    Listener для BotTester: собирает задержки шагов (от отправки до
+    устоявшегося ответа) и первого ответа бота, плюс итоги сценариев.
+    """
+
+    def __init__(self, histogram=LatencyStats):
+        self.histogram = histogram
+        self.steps: dict[tuple[str, object], LatencyStats] = {}
+        self.first_response: dict[tuple[str, object], LatencyStats] = {}
+        self.step_failures: Counter = Counter()
+        self.scenarios: dict[str, LatencyStats] = {}
+        self.scenario_failures: Counter = Counter()
+        self.active_users = 0
+        self.peak_users = 0
+
+    def __call__(self, record: dict) -> None:
+        if record.get("event") != "step":
+            return
+        key = (record["scenario"], record["step"])
+        self.steps.setdefault(key, self.histogram()).record(record["duration"])
+        if record.get("first_response") is not None:
+            self.first_response.setdefault(key, self.histogram()).record(record["first_response"])
+        if record.get("status") != "passed":
+            self.step_failures[key] += 1
+
+    def record_scenario(self, name: str, success: bool, duration: float) -> None:
+        self.scenarios.setdefault(name, self.histogram()).record(duration)
+        if not success:
+            self.scenario_failures[name] += 1
+
+    def user_started(self) -> None:
+        self.active_users += 1
+        self.peak_users = max(self.peak_users, self.active_users)
+
+    def user_finished(self) -> None:
+        self.active_users -= 1
+
+    def report(self, elapsed: float) -> dict:
+        scenarios_done = sum(s.count for s in self.scenarios.values())
+        steps_done = sum(s.count for s in self.steps.values())
+        return {
+            "elapsed": elapsed,
+            "peak_users": self.peak_users,
+            "scenarios": scenarios_done,
+            "scenario_failures": sum(self.scenario_failures.values()),
+            "scenarios_per_sec": scenarios_done / elapsed if elapsed else 0.0,
+            "steps_per_sec": steps_done / elapsed if elapsed else 0.0,
+            "by_scenario": {
+                name: {**stats.summary(), "failures": self.scenario_failures[name]}
+                for name, stats in self.scenarios.items()
+            },
+            "by_step": [
+                {
+                    "scenario": scenario,
+                    "step": step,
+                    **stats.summary(),
+                    "failures": self.step_failures[(scenario, step)],
+                    "first_response_p95": self.first_response[(scenario, step)].percentile(95)
+                    if (scenario, step) in self.first_response
+                    else None,
+                }
+                for (scenario, step), stats in self.steps.items()
+            ],
+        }
+
+
+async def run_load(pool, programs: list[ScenarioProgram], profile: LoadProfile, stats=None) -> dict:
+    """
+    Замкнутая нагрузка: profile.users пользователей стартуют равномерно за
+    ramp_up секунд и крутят сценарии по кругу, пока не истечет duration.
+    Начатая итерация доигрывается до конца. Возвращает LoadStats.report().
+    """
+    if not programs:
+        raise ValueError("Load run requires at least one scenario.")
+    stats = stats or LoadStats()
+    await pool.start()
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    deadline = started + profile.ramp_up + profile.duration
+
+    async def user(idx: int) -> None:
+        if profile.users > 1:
+            await asyncio.sleep(profile.ramp_up * idx / profile.users)
+        stats.user_started()
+        try:
+            iteration = 0
+            while loop.time() < deadline:
+                if profile.iterations is not None and iteration >= profile.iterations:
+                    break
+                program = programs[(idx + iteration) % len(programs)]
+                iteration_start = loop.time()
+                async with pool.lease() as adapter:
+                    began = time.perf_counter()
+                    try:
+                        success = await BotTester(adapter, listeners=[stats]).run_scenario(
+                            program.name, program
+                        )
+                    except Exception as e:
+                        logger.error(f"💥 Сценарий '{program.name}' упал под нагрузкой: {e}")
+                        success = False
+                    stats.record_scenario(program.name, success, time.perf_counter() - began)
+                iteration += 1
+                if profile.pacing:
+                    await asyncio.sleep(max(0.0, iteration_start + profile.pacing - loop.time()))
+        finally:
+            stats.user_finished()
+
+    await asyncio.gather(*(user(idx) for idx in range(profile.users)))
+    return stats.report(loop.time() - started)
+
+
+@dataclass
+class ArrivalProfile:
+    rate: float  # целевая частота стартов сценариев, в секунду
+    duration: float = 60.0  # сколько секунд генерировать старты
+    process: str = "constant"  # constant | poisson
+    max_in_flight: int | None = None  # сверх этого старт не выполняется и считается отброшенным
+    seed: int | None = None
+
+
+def arrival_offsets(profile: ArrivalProfile):
+    """Плановые моменты стартов (секунды от начала) для постоянного или пуассоновского потока."""
+    if profile.rate <= 0:
+        raise ValueError("Arrival rate must be positive.")
+    if profile.process not in ("constant", "poisson"):
+        raise ValueError(f"Unknown arrival process: {profile.process}")
+    rng = random.Random(profile.seed)
+    n, offset = 0, 0.0
+    while True:
+        if profile.process == "constant":
+            offset = n / profile.rate
+        elif n:
+            offset += rng.expovariate(profile.rate)
+        if offset >= profile.duration:
+            return
+        yield offset
+        n += 1
+
+
+class OpenLoopStats(LoadStats):
+    """
+    Статистика открытой нагрузки. Задержка сценария считается от планового
+    момента старта, а не от фактического: ожидание свободной сессии и опоздание
+    планировщика входят в нее (без coordinated omission).
+    """
+
+    def __init__(self, significant_figures: int = 3):
+        super().__init__(histogram=lambda: HdrHistogram(significant_figures))
+        self.latency = self.histogram()  # от плана до конца сценария
+        self.service = self.histogram()  # от фактического старта до конца
+        self.start_delay = self.histogram()  # от плана до получения сессии
+        self.scheduled = 0
+        self.dropped = 0
+
+    def report(self, elapsed: float) -> dict:
+        return {
+            **super().report(elapsed),
+            "scheduled": self.scheduled,
+            "dropped": self.dropped,
+            "latency": self.latency.summary(),
+            "service": self.service.summary(),
+            "start_delay": self.start_delay.summary(),
+        }
+
+
+async def run_open_loop(
+    pool, programs: list[ScenarioProgram], profile: ArrivalProfile, stats=None
+) -> dict:
+    """
+    Открытая нагрузка: сценарии стартуют по расписанию с частотой profile.rate,
+    независимо от того, успевает ли бот. Медленный бот копит очередь на сессии
+    пула, и это видно в задержке от плана. Возвращает OpenLoopStats.report().
+    """
+    if not programs:
+        raise ValueError("Load run requires at least one scenario.")
+    stats = stats or OpenLoopStats()
+    await pool.start()
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    in_flight: set[asyncio.Task] = set()
+
+    async def instance(program: ScenarioProgram, intended: float) -> None:
+        stats.user_started()
+        try:
+            async with pool.lease() as adapter:
+                began = loop.time()
+                stats.start_delay.record(began - intended)
+                try:
+                    success = await BotTester(adapter, listeners=[stats]).run_scenario(
+                        program.name, program
+                    )
+                except Exception as e:
+                    logger.error(f"💥 Сценарий '{program.name}' упал под нагрузкой: {e}")
+                    success = False
+            finished = loop.time()
+            stats.service.record(finished - began)
+            stats.latency.record(finished - intended)
+            stats.record_scenario(program.name, success, finished - intended)
+        finally:
+            stats.user_finished()
+
+    for n, offset in enumerate(arrival_offsets(profile)):
+        intended = started + offset
+        delay = intended - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        stats.scheduled += 1
+        if profile.max_in_flight is not None and len(in_flight) >= profile.max_in_flight:
+            stats.dropped += 1
+            continue
+        task = asyncio.create_task(instance(programs[n % len(programs)], intended))
+        in_flight.add(task)
+        task.add_done_callback(in_flight.discard)
+
+    await asyncio.gather(*in_flight)
+    return stats.report(loop.time() - started)
+
+
+def simulator_pool(
+    programs, users: int, latency: float = 0.0, jitter: float = 0.0, seed=None, events: bool = True
+):
+    """Пул из users сессий на одном симуляторе бота — нагрузка без Telegram."""
+    bot = simulator_for(programs, latency=Latency(latency, jitter), seed=seed)
+    return SessionPool([bot.adapter(f"user{i}", events=events) for i in range(users)])
+
+
+def _ms(value: float) -> str:
+    return f"{value * 1000:8.0f}"
+
+
+def format_report(report: dict) -> str:
+    lines = [
+        f"Время: {report['elapsed']:.1f} с, пользователей (пик): {report['peak_users']}",
+        f"Сценариев: {report['scenarios']} (упало {report['scenario_failures']}), "
+        f"{report['scenarios_per_sec']:.2f}/с, шагов {report['steps_per_sec']:.2f}/с",
+        "",
+        f"{'сценарий':<30} {'шаг':>5} {'n':>6} {'ошибок':>6} {'p50,мс':>8} {'p95,мс':>8} {'p99,мс':>8}",
+    ]
+    for row in report["by_step"]:
+        lines.append(
+            f"{str(row['scenario'])[:30]:<30} {str(row['step']):>5} {row['count']:>6} "
+            f"{row['failures']:>6} {_ms(row['p50'])} {_ms(row['p95'])} {_ms(row['p99'])}"
+        )
+    if "latency" in report:
+        lines += [
+            "",
+            f"Стартов по плану: {report['scheduled']}, отброшено: {report['dropped']}",
+            f"{'сценарий целиком':<30} {'':>5} {'n':>6} {'':>6} {'p50,мс':>8} {'p95,мс':>8} {'p99,мс':>8}",
+        ]
+        rows = (("от плана", "latency"), ("обслуживание", "service"), ("ожидание сессии", "start_delay"))
+        for title, key in rows:
+            row = report[key]
+            if row["count"]:
+                lines.append(
+                    f"{title:<30} {'':>5} {row['count']:>6} {'':>6} "
+                    f"{_ms(row['p50'])} {_ms(row['p95'])} {_ms(row['p99'])}"
+                )
+    return "\n".join(lines)
+
+
+async def _main(args) -> dict:
+    snapshot = scenario_repository.snapshot()
+    names = args.scenario or list(snapshot.programs)
+    missing = [name for name in names if name not in snapshot.programs]
+    if missing:
+        raise SystemExit(f"Сценарии не найдены или не скомпилированы: {', '.join(missing)}")
+    programs = [snapshot.programs[name] for name in names]
+
+    if args.simulator:
+        pool = simulator_pool(programs, args.users, args.latency, args.jitter, seed=1)
+    else:
+        pool = create_session_pool()
+    try:
+        if args.rate:
+            arrivals = ArrivalProfile(args.rate, args.duration, args.arrival, args.max_in_flight, seed=1)
+            return await run_open_loop(pool, programs, arrivals)
+        profile = LoadProfile(args.users, args.ramp_up, args.duration, args.pacing, args.iterations)
+        return await run_load(pool, programs, profile)
+    finally:
+        await pool.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument(
+        "--users", type=int, default=10, help="пользователей (для --rate: сессий симулятора)"
+    )
+    parser.add_argument("--ramp-up", type=float, default=0.0, help="разгон, с")
+    parser.add_argument("--duration", type=float, default=60.0, help="удержание после разгона, с")
+    parser.add_argument("--pacing", type=float, default=0.0, help="интервал итераций пользователя, с")
+    parser.add_argument("--iterations", type=int, default=None, help="лимит итераций на пользователя")
+    parser.add_argument("--rate", type=float, help="открытая нагрузка: стартов сценариев в секунду")
+    parser.add_argument("--arrival", choices=("constant", "poisson"), default="constant")
+    parser.add_argument("--max-in-flight", type=int, default=None, help="лимит одновременных сценариев")
+    parser.add_argument("--scenario", action="append", help="сценарий (можно несколько раз)")
+    parser.add_argument("--simulator", action="store_true", help="локальный симулятор вместо Telegram")
+    parser.add_argument("--latency", type=float, default=0.0, help="задержка симулятора, с")
+    parser.add_argument("--jitter", type=float, default=0.0, help="разброс задержки симулятора, с")
+    parser.add_argument("--json", help="сохранить отчет в JSON")
+    args = parser.parse_args()
+
+    logger.setLevel(logging.WARNING)
+    report = asyncio.run(_main(args))
+    print(format_report(report))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2, default=str)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+import re
+from collections import OrderedDict
+
+from src.config import MATCHER_CACHE_SIZE
+from src.scenarios import is_empty
+
+PLACEHOLDER_RE = re.compile(r"<.*?>")
+
+
+class TemplateMatcher:
+    """
+    Сравнение ответа бота с шаблоном: <...> работает как wildcard, регистр не важен.
+    Скомпилированные шаблоны хранятся в ограниченном LRU-кэше по тексту шаблона
+    (размер — MATCHER_CACHE_SIZE; если шаблонов в наборе больше, они вытесняются
+    до повторного использования и компилируются заново на каждом прогоне).
+    Шаблон без плейсхолдеров проверяется простым поиском подстроки, без regex.
+    """
+
+    def __init__(self, maxsize: int = MATCHER_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._cache: OrderedDict[str, str | re.Pattern] = OrderedDict()
+
+    def _compile(self, expected: str) -> str | re.Pattern:
+        compiled = self._cache.get(expected)
+        if compiled is not None:
+            self._cache.move_to_end(expected)
+            return compiled
+
+        expected_l = expected.strip().lower()
+        if PLACEHOLDER_RE.search(expected_l) is None:
+            compiled = expected_l
+        else:
+            # Делаем regex из expected, где <...> -> .*
+            pattern = re.escape(expected_l).replace(r"\<", "<").replace(r"\>", ">")
+            compiled = re.compile(PLACEHOLDER_RE.sub(r".*", pattern), re.DOTALL)
+
+        self._cache[expected] = compiled
+        if len(self._cache) > self.maxsize:
+            self._cache.popitem(last=False)
+        return compiled
+
+    def match(self, expected, actual) -> bool:
+        if is_empty(expected) or not expected:
+            return True
+
+        compiled = self._compile(str(expected))
+        actual_l = str(actual).lower()
+        if isinstance(compiled, str):
+            return compiled in actual_l
+        return compiled.search(actual_l) is not None
+
+    def cache_info(self) -> dict:
+        return {"size": len(self._cache), "maxsize": self.maxsize}
+
+
+# Общий кэш для всех BotTester: шаблоны одни и те же во всех сценариях
+default_matcher = TemplateMatcher()
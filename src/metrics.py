@@ -0,0 +1,71 @@
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Histogram, generate_latest
+
+# --- МЕТРИКИ ПРОГОНОВ ---
+# Задержки бота по шагам: от отправки действия до первого сообщения
+# и до «успокоения» пачки ответов. Метки: сценарий и номер шага.
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 0.75, 1, 1.5, 2, 3, 5, 7.5, 10, 15, 30)
+
+STEP_FIRST_RESPONSE = Histogram(
+    "bot_step_first_response_seconds",
+    "Время от действия пользователя до первого сообщения бота",
+    ["scenario", "step"],
+    buckets=LATENCY_BUCKETS,
+)
+STEP_SETTLED = Histogram(
+    "bot_step_settled_seconds",
+    "Время от действия пользователя до последнего сообщения пачки ответов",
+    ["scenario", "step"],
+    buckets=LATENCY_BUCKETS,
+)
+STEP_TIMEOUTS = Counter(
+    "bot_step_timeouts_total",
+    "Шаги, на которых бот не ответил вовремя",
+    ["scenario", "step"],
+)
+STEP_RETRIES = Counter(
+    "bot_step_retries_total",
+    "Повторные попытки действий на шаге",
+    ["scenario", "step"],
+)
+RPC_RETRIES = Counter(
+    "telegram_rpc_retries_total",
+    "Повторы запросов к Telegram после FloodWait или временного сбоя",
+    ["session", "reason"],
+)
+FLOOD_WAIT_SECONDS = Counter(
+    "telegram_flood_wait_seconds_total",
+    "Суммарная пауза сессии по требованию сервера (FloodWait)",
+    ["session"],
+)
+LOOP_ITERATIONS = Counter(
+    "bot_loop_iterations_total",
+    "Переходы назад по циклам REPEAT/UNTIL_REPLY",
+    ["scenario", "step", "kind"],
+)
+SCENARIO_RUNS = Counter(
+    "bot_scenario_runs_total",
+    "Завершенные прогоны сценариев",
+    ["scenario", "result"],
+)
+SCENARIO_DURATION = Histogram(
+    "bot_scenario_duration_seconds",
+    "Длительность прогона сценария",
+    ["scenario"],
+    buckets=(1, 2, 5, 10, 20, 30, 60, 120, 300, 600),
+)
+
+
+def observe_reply(scenario: str, step, first: float, settled: float) -> None:
+    STEP_FIRST_RESPONSE.labels(scenario, str(step)).observe(max(first, 0.0))
+    STEP_SETTLED.labels(scenario, str(step)).observe(max(settled, 0.0))
+
+
+def observe_scenario(scenario: str, success: bool, duration: float) -> None:
+    SCENARIO_RUNS.labels(scenario, "passed" if success else "failed").inc()
+    SCENARIO_DURATION.labels(scenario).observe(duration)
+
+
+def render() -> tuple[bytes, str]:
+    """Тело и content-type для эндпоинта /metrics."""
+    return generate_latest(), CONTENT_TYPE_LATEST
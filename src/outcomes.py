@@ -0,0 +1,74 @@
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+
+logger = logging.getLogger("TestEngine")
+
+# Режимы выбора сценариев для прогона
+MODE_ALL = "all"
+MODE_FAILED = "failed"  # упавшие в последнем прогоне
+MODE_CHANGED = "changed"  # строки CSV изменились с последнего прогона (или не гонялись)
+MODES = (MODE_ALL, MODE_FAILED, MODE_CHANGED)
+
+
+class OutcomeStore:
+    """
+    Последний результат каждого сценария в JSON-файле:
+    {"имя": {"success": true, "duration": 3.2, "hash": "<sha256 строк>", "ts": ...}}.
+    Пропущенные сценарии (fail_fast, упавшая зависимость) результат не затирают.
+    Варианты одного сценария сводятся в один результат: успех — если прошли все.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+
+    def load(self) -> dict[str, dict]:
+        if not self.path.exists():
+            return {}
+        try:
+            return json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError) as e:
+            logger.warning(f"⚠️ Не удалось прочитать {self.path.name}, история сброшена: {e}")
+            return {}
+
+    def update(self, results, hashes: dict[str, str]) -> None:
+        with self._lock:
+            outcomes = self.load()
+            now = time.time()
+            merged: dict[str, tuple[bool, float]] = {}
+            for result in results:
+                if result.skipped:
+                    continue
+                success, duration = merged.get(result.name, (True, 0.0))
+                merged[result.name] = (success and result.success, max(duration, result.duration))
+            for name, (success, duration) in merged.items():
+                outcomes[name] = {
+                    "success": success,
+                    "duration": round(duration, 3),
+                    "hash": hashes.get(name),
+                    "ts": now,
+                }
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(".tmp")
+            tmp.write_text(json.dumps(outcomes, ensure_ascii=False, indent=1), encoding="utf-8")
+            os.replace(tmp, self.path)
+
+    def select(self, snapshot, mode: str = MODE_ALL, names=None) -> list[str]:
+        """Сценарии из names (по умолчанию — все в снимке), отобранные режимом."""
+        if mode not in MODES:
+            raise ValueError(f"Unknown run mode: {mode}")
+        names = list(names or snapshot.names)
+        if mode == MODE_ALL:
+            return names
+        outcomes = self.load()
+        if mode == MODE_FAILED:
+            return [name for name in names if name in outcomes and not outcomes[name]["success"]]
+        return [
+            name
+            for name in names
+            if outcomes.get(name, {}).get("hash") != snapshot.hashes.get(name)
+        ]
@@ -0,0 +1,229 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+
+logger = logging.getLogger("TestEngine")
+
+# Состояния сессии в пуле
+CONNECTING = "connecting"
+CONNECTED = "connected"
+DISCONNECTED = "disconnected"
+UNAUTHORIZED = "unauthorized"
+
+
+class NoSessionError(ConnectionError):
+    """В пуле нет сессии, которую удалось бы подключить."""
+
+
+class SessionPool:
+    """
+    Пул адаптеров Telegram, каждый со своей сессией.
+    Сценарий арендует свободный адаптер на время прогона, поэтому
+    два сценария никогда не пишут боту от одного аккаунта одновременно.
+
+    Пул живет дольше одного прогона: keepalive() периодически проверяет
+    соединения и переподключает упавшие сессии с экспоненциальной паузой.
+    """
+
+    def __init__(
+        self,
+        adapters,
+        concurrency: int | None = None,
+        keepalive_interval: float = 60,
+        backoff_max: float = 60,
+        reconnect_attempts: int = 3,
+    ):
+        if not adapters:
+            raise ValueError("Session pool requires at least one adapter.")
+        self.adapters = list(adapters)
+        self.concurrency = concurrency or len(self.adapters)
+        self.keepalive_interval = keepalive_interval
+        self.backoff_max = backoff_max
+        self.reconnect_attempts = reconnect_attempts
+        self.states = {adapter: DISCONNECTED for adapter in self.adapters}
+        self.errors: dict = {}
+        self._locks = {adapter: asyncio.Lock() for adapter in self.adapters}
+        self._semaphore: asyncio.Semaphore | None = None
+        self._idle: list | None = None
+        self._leased: set = set()
+        self._returned = asyncio.Event()  # сессия вернулась в пул
+        self._start_lock = asyncio.Lock()
+
+    @property
+    def started(self) -> bool:
+        return self._idle is not None
+
+    async def _connect(self, adapter) -> bool:
+        self.states[adapter] = CONNECTING
+        try:
+            await adapter.connect()
+            if not await adapter.is_user_authorized():
+                logger.error("ОШИБКА: Клиент не авторизован! Запустите сначала generate_session.py")
+                self.states[adapter] = UNAUTHORIZED
+                await adapter.disconnect()
+                return False
+        except Exception as e:
+            logger.error(f"Не удалось подключить сессию: {e}")
+            self.states[adapter] = DISCONNECTED
+            self.errors[adapter] = str(e)
+            return False
+        self.states[adapter] = CONNECTED
+        self.errors.pop(adapter, None)
+        return True
+
+    async def _reconnect(self, adapter) -> bool:
+        """Переподключение с экспоненциальной паузой; параллельные вызовы ждут один и тот же."""
+        async with self._locks[adapter]:
+            if self.states[adapter] == CONNECTED:
+                return True
+            delay = 1.0
+            for attempt in range(1, self.reconnect_attempts + 1):
+                try:
+                    await adapter.disconnect()
+                except Exception:
+                    pass
+                if await self._connect(adapter):
+                    logger.info(f"🔌 Сессия {_name(adapter)} переподключена (попытка {attempt}).")
+                    return True
+                if self.states[adapter] == UNAUTHORIZED or attempt == self.reconnect_attempts:
+                    return False
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.backoff_max)
+            return False
+
+    async def start(self) -> None:
+        """Подключает все сессии пула параллельно; неавторизованные исключаются из пула."""
+        async with self._start_lock:
+            if self.started:
+                return
+            await asyncio.gather(*(self._connect(a) for a in self.adapters))
+            usable = [a for a in self.adapters if self.states[a] != UNAUTHORIZED]
+            if not any(self.states[a] == CONNECTED for a in usable):
+                raise Exception("No authorized sessions in pool")
+
+            self._semaphore = asyncio.Semaphore(min(self.concurrency, len(usable)))
+            self._idle = list(usable)
+            logger.info(
+                f"🔌 Пул сессий готов: {len(usable)} сессий, "
+                f"параллельность {min(self.concurrency, len(usable))}."
+            )
+
+    async def stop(self) -> None:
+        await asyncio.gather(
+            *(a.disconnect() for a in self.adapters),
+            return_exceptions=True,
+        )
+        for adapter in self.adapters:
+            if self.states[adapter] != UNAUTHORIZED:
+                self.states[adapter] = DISCONNECTED
+        self._semaphore = None
+        self._idle = None
+
+    async def probe(self, adapter) -> bool:
+        """Проверка живости соединения: ping, если адаптер его умеет."""
+        ping = getattr(adapter, "ping", None)
+        if ping is None:
+            return self.states[adapter] == CONNECTED
+        try:
+            await ping()
+        except Exception as e:
+            logger.warning(f"⚠️ Сессия {_name(adapter)} не отвечает: {e}")
+            self.states[adapter] = DISCONNECTED
+            self.errors[adapter] = str(e)
+            return False
+        return True
+
+    async def keepalive(self) -> None:
+        """Фоновая задача: поднимает пул и держит соединения живыми."""
+        delay = 1.0
+        while not self.started:
+            try:
+                await self.start()
+            except Exception as e:
+                logger.error(f"Пул сессий не запущен, повтор через {delay:.0f} с: {e}")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.backoff_max)
+
+        while True:
+            await asyncio.sleep(self.keepalive_interval)
+            for adapter in self.adapters:
+                if self.states[adapter] == UNAUTHORIZED:
+                    continue
+                # Арендованную сессию не трогаем: переподключение оборвало бы сценарий.
+                # Соединение проверит следующий цикл после возврата в пул (или lease()).
+                if adapter not in self._idle:
+                    continue
+                if not await self.probe(adapter):
+                    await self._reconnect(adapter)
+
+    def health(self) -> dict:
+        return {
+            _name(adapter): {
+                "state": self.states[adapter],
+                **({"error": self.errors[adapter]} if adapter in self.errors else {}),
+            }
+            for adapter in self.adapters
+        }
+
+    @asynccontextmanager
+    async def lease(self, prefer: str | None = None):
+        """
+        Выдает свободный подключенный адаптер и возвращает его в пул после использования.
+        Подключенные сессии идут первыми; из них берется та, что раньше сможет
+        отправлять (FloodWait, token bucket), при равенстве — дольше всех простаивавшая.
+        Отключенная сессия переподключается, а если не вышло — пробуется следующая;
+        если живые сессии заняты, lease() ждет, пока одна вернется.
+        NoSessionError — занятых нет, а ни одну свободную подключить не удалось.
+
+        prefer: имя сессии, которую нужно взять (resume с чекпоинта) — если она
+        занята, lease() ждет ее; другая берется, только если эта не подключается.
+        """
+        if self._semaphore is None or self._idle is None:
+            raise RuntimeError("Session pool is not started.")
+        async with self._semaphore:
+            adapter = await self._acquire(prefer)
+            try:
+                yield adapter
+            finally:
+                self._leased.discard(adapter)
+                self._idle.append(adapter)
+                self._returned.set()
+
+    async def _acquire(self, prefer: str | None = None):
+        tried: set = set()
+        while True:
+            preferred = [a for a in self._leased if _name(a) == prefer]
+            if preferred and preferred[0] not in tried:
+                # Нужная сессия занята: ждем ее, а не берем чужую
+                self._returned.clear()
+                await self._returned.wait()
+                continue
+            candidates = sorted(
+                (a for a in self._idle if a not in tried),
+                key=lambda a: (_name(a) != prefer, self.states[a] != CONNECTED, _cooldown(a)),
+            )
+            for adapter in candidates:
+                if adapter not in self._idle:
+                    continue  # пока переподключали другую, эту взял параллельный lease()
+                self._idle.remove(adapter)
+                if self.states[adapter] == CONNECTED or await self._reconnect(adapter):
+                    self._leased.add(adapter)
+                    return adapter
+                logger.warning(f"⚠️ Сессия {_name(adapter)} не подключилась, берем другую.")
+                tried.add(adapter)
+                if self.states[adapter] != UNAUTHORIZED:
+                    self._idle.append(adapter)
+            if not self._leased:
+                raise NoSessionError("No connected sessions in pool.")
+            # Живые сессии заняты: ждем, пока одна из них вернется
+            self._returned.clear()
+            await self._returned.wait()
+
+
+def _name(adapter) -> str:
+    return getattr(adapter, "name", type(adapter).__name__)
+
+
+def _cooldown(adapter) -> float:
+    cooldown = getattr(adapter, "cooldown", None)
+    return cooldown() if cooldown else 0.0
@@ -0,0 +1,238 @@
+"""
+Пакетное создание аккаунтов Test DC и сессий для пула без ручного ввода.
+
+Номера Test DC имеют вид 99966XYYYY (X — номер DC), код подтверждения
+вычисляется из номера (X пять раз), поэтому регистрация и вход проходят
+без вопросов. Аккаунты создаются параллельно (не больше concurrency), все
+запросы идут через общий SessionThrottle: частота запросов кода ограничена
+на весь пакет, а FloodWait ставит на паузу весь пакет, а не один аккаунт.
+
+Результат — сессии sessions/<префикс><N>.session и манифест пула
+(SESSION_MANIFEST, по умолчанию sessions/pool.json), из которого раннер
+берет сессии, если TELEGRAM_SESSIONS не задан. Повторный запуск досоздает
+только недостающие сессии.
+
+Из корня репозитория:
+    python -m src.provision --count 10
+    python -m src.provision --count 20 --dc 2 --prefix loadtester --concurrency 5
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import threading
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+from telethon.errors import PhoneNumberUnoccupiedError, SessionPasswordNeededError
+
+from src.config import (
+    API_HASH,
+    API_ID,
+    CONNECTION_RETRIES,
+    FLOOD_WAIT_MAX,
+    PROVISION_CONCURRENCY,
+    PROVISION_RATE,
+    REQUEST_TIMEOUT,
+    RETRY_DELAY,
+    RPC_RETRIES,
+    SESSION_DIR,
+    SESSION_MANIFEST,
+)
+from src.testdc import TEST_DC, dc_phone, get_confirmation_code
+from src.throttle import SessionThrottle, ThrottledTelegramClient
+
+logger = logging.getLogger("TestEngine")
+
+OK = "ok"
+ERROR = "error"
+
+
+@dataclass
+class ProvisionedSession:
+    name: str
+    phone: str
+    dc: int
+    status: str
+    user_id: int | None = None
+    error: str | None = None
+    ts: float = 0.0
+
+
+class PoolManifest:
+    """
+    Манифест пула: {"version": 1, "sessions": [...]}. Записи обновляются по
+    имени сессии, файл пишется атомарно после каждого аккаунта, так что
+    прерванный запуск не теряет уже созданные сессии.
+    """
+
+    def __init__(self, path: Path = SESSION_MANIFEST):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+
+    def load(self) -> dict[str, ProvisionedSession]:
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.warning(f"⚠️ Не удалось прочитать манифест пула {self.path}: {e}")
+            return {}
+        return {entry["name"]: ProvisionedSession(**entry) for entry in data.get("sessions", [])}
+
+    def update(self, session: ProvisionedSession) -> None:
+        with self._lock:
+            sessions = self.load()
+            sessions[session.name] = session
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(".tmp")
+            data = {"version": 1, "sessions": [asdict(s) for s in sessions.values()]}
+            tmp.write_text(json.dumps(data, ensure_ascii=False, indent=1), encoding="utf-8")
+            os.replace(tmp, self.path)
+
+
+def create_client(session_file: Path, dc: int, throttle: SessionThrottle) -> ThrottledTelegramClient:
+    client = ThrottledTelegramClient(
+        str(session_file),
+        API_ID,
+        API_HASH,
+        throttle=throttle,
+        timeout=REQUEST_TIMEOUT,
+        connection_retries=CONNECTION_RETRIES,
+        retry_delay=RETRY_DELAY,
+    )
+    client.session.set_dc(dc, *TEST_DC[dc])
+    client.session.save()
+    return client
+
+
+async def provision_session(
+    name: str,
+    phone: str,
+    dc: int,
+    throttle: SessionThrottle,
+    session_dir: Path = SESSION_DIR,
+    client_factory=create_client,
+) -> ProvisionedSession:
+    """Вход (или регистрация) одного аккаунта Test DC; ошибки не пробрасываются, а попадают в запись."""
+    code = get_confirmation_code(phone)
+    if code is None:
+        return ProvisionedSession(name, phone, dc, ERROR, error="not a Test DC number", ts=time.time())
+
+    client = client_factory(Path(session_dir) / f"{name}.session", dc, throttle)
+    try:
+        await client.connect()
+        if not await client.is_user_authorized():
+            sent = await client.send_code_request(phone)
+            try:
+                await client.sign_in(phone, code, phone_code_hash=sent.phone_code_hash)
+            except PhoneNumberUnoccupiedError:
+                await client.sign_up(code, "Tester", name, phone=phone, phone_code_hash=sent.phone_code_hash)
+                logger.info(f"🆕 {name}: зарегистрирован аккаунт {phone}.")
+        me = await client.get_me()
+    except SessionPasswordNeededError:
+        logger.warning(f"🔒 {name}: на аккаунте {phone} включен пароль, возьмите другой номер.")
+        return ProvisionedSession(name, phone, dc, ERROR, error="2FA password required", ts=time.time())
+    except Exception as e:
+        logger.error(f"❌ {name}: не удалось создать сессию для {phone}: {e}")
+        return ProvisionedSession(name, phone, dc, ERROR, error=str(e) or type(e).__name__, ts=time.time())
+    finally:
+        await client.disconnect()
+
+    logger.info(f"✅ {name}: сессия готова ({phone}, id {me.id}).")
+    return ProvisionedSession(name, phone, dc, OK, user_id=me.id, ts=time.time())
+
+
+async def provision_pool(
+    count: int,
+    dc: int = 2,
+    prefix: str = "tester",
+    start: int | None = None,
+    concurrency: int = PROVISION_CONCURRENCY,
+    rate: float = PROVISION_RATE,
+    session_dir: Path = SESSION_DIR,
+    manifest: PoolManifest | None = None,
+    client_factory=create_client,
+) -> list[ProvisionedSession]:
+    """
+    Сессии <prefix>1..<prefix>count. Готовые по манифесту пропускаются, упавшие
+    (например, номер с паролем) пробуются с новым номером. Номера идут подряд от start
+    (по умолчанию — случайного: номера Test DC общие для всех разработчиков).
+    """
+    if dc not in TEST_DC:
+        raise ValueError(f"Unknown test DC: {dc}")
+    manifest = manifest or PoolManifest()
+    existing = manifest.load()
+    start = random.randrange(10000) if start is None else start
+
+    todo = []
+    for n in range(1, count + 1):
+        name = f"{prefix}{n}"
+        entry = existing.get(name)
+        if entry and entry.status == OK and (Path(session_dir) / f"{name}.session").exists():
+            continue
+        # Потерянная сессия готового аккаунта входит в тот же аккаунт, упавший берет новый номер
+        reuse = entry and entry.status == OK and entry.dc == dc
+        phone = entry.phone if reuse else dc_phone(dc, start + n - 1)
+        todo.append((name, phone))
+    if not todo:
+        logger.info(f"📦 Все {count} сессий '{prefix}*' уже в манифесте {manifest.path}.")
+        return []
+
+    logger.info(f"📦 Создаем {len(todo)} сессий в Test DC {dc} (параллельно: {concurrency}).")
+    # Один троттлер на пакет: лимиты на запрос кода считаются на приложение и IP
+    throttle = SessionThrottle(
+        "provision", rate=rate, burst=1, retries=RPC_RETRIES, max_flood_wait=FLOOD_WAIT_MAX
+    )
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def one(name: str, phone: str) -> ProvisionedSession:
+        async with semaphore:
+            result = await provision_session(name, phone, dc, throttle, session_dir, client_factory)
+        manifest.update(result)
+        return result
+
+    results = await asyncio.gather(*(one(name, phone) for name, phone in todo))
+    ready = sum(r.status == OK for r in results)
+    logger.info(f"📦 Готово {ready}/{len(results)}, манифест: {manifest.path}.")
+    return list(results)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("--count", type=int, required=True, help="сколько сессий нужно в пуле")
+    parser.add_argument("--dc", type=int, default=2, choices=sorted(TEST_DC), help="тестовый DC")
+    parser.add_argument("--prefix", default="tester", help="префикс имен сессий")
+    parser.add_argument("--start", type=int, help="первые четыре цифры номера (по умолчанию — случайно)")
+    parser.add_argument("--concurrency", type=int, default=PROVISION_CONCURRENCY)
+    parser.add_argument("--rate", type=float, default=PROVISION_RATE, help="запросов в секунду на весь пакет")
+    parser.add_argument("--manifest", type=Path, default=SESSION_MANIFEST)
+    args = parser.parse_args()
+
+    if API_ID is None or not API_HASH:
+        raise SystemExit("ОШИБКА: TELEGRAM_API_ID/TELEGRAM_API_HASH не заданы.")
+    results = asyncio.run(
+        provision_pool(
+            args.count,
+            dc=args.dc,
+            prefix=args.prefix,
+            start=args.start,
+            concurrency=args.concurrency,
+            rate=args.rate,
+            manifest=PoolManifest(args.manifest),
+        )
+    )
+    for result in results:
+        status = "✅" if result.status == OK else "❌"
+        print(f"{status} {result.name}: {result.phone} {result.error or ''}".rstrip())
+    raise SystemExit(0 if all(r.status == OK for r in results) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,257 @@
+"""
+ConversationAdapter на Pyrogram (TELEGRAM_CLIENT=pyrogram).
+
+Тот же протокол, что у TelegramConversationAdapter на Telethon: conversation()
+с send_message/get_response, collector() для пачек ответов, нажатие кнопок
+через button.click() и last_message() для чекпоинтов. Сессии — в формате
+Pyrogram (их создает generate_session.py), с файлами Telethon они несовместимы.
+
+Сообщения Pyrogram оборачиваются в PyrogramMessage с полями, которые читает
+BotTester (id, text, out, buttons), поэтому остальной код от клиента не зависит.
+"""
+import asyncio
+import logging
+import random
+from contextlib import asynccontextmanager
+from pathlib import Path
+
+from pyrogram import Client, raw
+from pyrogram.errors import BotResponseTimeout
+from pyrogram.handlers import EditedMessageHandler, MessageHandler
+from pyrogram.types import InlineKeyboardMarkup, ReplyKeyboardMarkup
+
+from src.collector import ResponseCollector
+from src.config import (
+    API_HASH,
+    API_ID,
+    CONNECT_TIMEOUT,
+    FLOOD_WAIT_MAX,
+    REQUEST_TIMEOUT,
+    RPC_RETRIES,
+    SEND_BURST,
+    SEND_RATE,
+    SESSION_FILE,
+    TELEGRAM_DC,
+)
+from src.throttle import SessionThrottle, is_idempotent, is_throttled
+
+logger = logging.getLogger("TestEngine")
+
+
+class ThrottledPyrogramClient(Client):
+    """
+    Все RPC клиента проходят через SessionThrottle сессии, как в
+    ThrottledTelegramClient (src/throttle.py). Встроенное ожидание FloodWait отключено.
+    """
+
+    def __init__(self, *args, throttle: SessionThrottle, **kwargs):
+        super().__init__(*args, sleep_threshold=0, **kwargs)
+        self.throttle = throttle
+
+    async def invoke(self, query, *args, **kwargs):
+        call = super().invoke
+        return await self.throttle.call(
+            lambda: call(query, *args, **kwargs),
+            idempotent=is_idempotent(query),
+            throttled=is_throttled(query),
+            name=type(query).__name__,
+        )
+
+
+class PyrogramButton:
+    def __init__(self, client: Client, message, button):
+        self.text = button if isinstance(button, str) else button.text
+        self._client = client
+        self._message = message
+        self._button = button
+
+    async def click(self):
+        """Inline-кнопка — callback-запрос, кнопка клавиатуры — сообщение с ее текстом."""
+        data = getattr(self._button, "callback_data", None)
+        chat_id = self._message.chat.id
+        if data is not None:
+            try:
+                return await self._client.request_callback_answer(
+                    chat_id, self._message.id, data, timeout=REQUEST_TIMEOUT
+                )
+            except BotResponseTimeout as e:
+                # Бот не ответил на callback — для BotTester это таймаут, как в Telethon
+                raise asyncio.TimeoutError(str(e)) from e
+        if isinstance(self._message.reply_markup, ReplyKeyboardMarkup):
+            return await self._client.send_message(chat_id, self.text)
+        return None  # url, switch_inline и т.п. не отправляют боту ничего
+
+
+class PyrogramMessage:
+    """Сообщение Pyrogram в виде, который читает BotTester (как Message в Telethon)."""
+
+    def __init__(self, client: Client, message):
+        self.message = message
+        self.id = message.id
+        self.text = str(message.text or message.caption or "")
+        self.out = bool(message.outgoing)
+        markup = message.reply_markup
+        if isinstance(markup, InlineKeyboardMarkup):
+            rows = markup.inline_keyboard
+        elif isinstance(markup, ReplyKeyboardMarkup):
+            rows = markup.keyboard
+        else:
+            rows = None
+        self.buttons = [[PyrogramButton(client, message, b) for b in row] for row in rows] if rows else None
+
+
+class PyrogramConversation:
+    """Разговор с ботом: ответы — новые входящие сообщения чата с момента открытия."""
+
+    def __init__(self, adapter: "PyrogramConversationAdapter", bot_username: str, timeout: float):
+        self.adapter = adapter
+        self.bot_username = bot_username
+        self.timeout = timeout
+        self._responses: asyncio.Queue = asyncio.Queue()
+
+    async def send_message(self, message: str):
+        return await self.adapter.client.send_message(self.bot_username, message)
+
+    async def get_response(self):
+        return await asyncio.wait_for(self._responses.get(), timeout=self.timeout)
+
+
+def _from_bot(message, bot_username: str) -> bool:
+    chat = message.chat
+    username = getattr(chat, "username", None) if chat else None
+    return (
+        not message.outgoing
+        and username is not None
+        and username.casefold() == bot_username.lstrip("@").casefold()
+    )
+
+
+class PyrogramConversationAdapter:
+    def __init__(self, session_file=SESSION_FILE):
+        self.session_file = Path(session_file)
+        self.client: ThrottledPyrogramClient | None = None
+        self.throttle = SessionThrottle(
+            self.name,
+            rate=SEND_RATE,
+            burst=SEND_BURST,
+            retries=RPC_RETRIES,
+            max_flood_wait=FLOOD_WAIT_MAX,
+        )
+        self._authorized = False
+        self._conversations: list[PyrogramConversation] = []
+        self._collectors: list[tuple[str, ResponseCollector]] = []
+
+    @property
+    def name(self) -> str:
+        return self.session_file.stem
+
+    def cooldown(self) -> float:
+        return self.throttle.cooldown()
+
+    def _create_client(self) -> ThrottledPyrogramClient:
+        if TELEGRAM_DC:
+            # Pyrogram не задает адрес DC вручную: новая сессия создается в тестовых DC
+            logger.info("📡 Pyrogram: используем тестовые DC (test_mode).")
+        return ThrottledPyrogramClient(
+            self.name,
+            API_ID,
+            API_HASH,
+            throttle=self.throttle,
+            workdir=str(self.session_file.parent),
+            test_mode=bool(TELEGRAM_DC),
+            workers=1,  # один обработчик обновлений — ответы бота не переставляются
+        )
+
+    async def connect(self) -> None:
+        if API_ID is None or not API_HASH:
+            logger.error("ОШИБКА: TELEGRAM_API_ID/TELEGRAM_API_HASH не заданы.")
+            raise Exception("Missing Telegram API credentials")
+        # Клиент создается один раз, переподключение использует ту же сессию
+        if self.client is None:
+            self.client = self._create_client()
+        if self.client.is_connected:
+            return
+
+        try:
+            self._authorized = await asyncio.wait_for(self.client.connect(), timeout=CONNECT_TIMEOUT)
+        except asyncio.TimeoutError as exc:
+            logger.error(
+                "⏳ Таймаут подключения к Telegram. "
+                "Проверьте TELEGRAM_DC_* или сеть/прокси."
+            )
+            raise exc
+        if self._authorized:
+            # Как Client.start(): GetState включает доставку обновлений, диспетчер их разбирает.
+            # Обработчики добавляются заново: terminate() очищает их вместе с диспетчером.
+            await self.client.invoke(raw.functions.updates.GetState())
+            await self.client.initialize()
+            self.client.add_handler(MessageHandler(self._on_message))
+            self.client.add_handler(EditedMessageHandler(self._on_edited))
+
+    def is_connected(self) -> bool:
+        return bool(self.client and self.client.is_connected)
+
+    async def ping(self) -> None:
+        """Легкий RPC-запрос для проверки живости соединения."""
+        if not self.is_connected():
+            raise ConnectionError("Telegram client is not connected.")
+        await asyncio.wait_for(
+            self.client.invoke(raw.functions.Ping(ping_id=random.getrandbits(63))),
+            timeout=REQUEST_TIMEOUT,
+        )
+
+    async def disconnect(self) -> None:
+        if not self.is_connected():
+            return
+        if self.client.is_initialized:
+            await self.client.terminate()
+        await self.client.disconnect()
+
+    async def is_user_authorized(self) -> bool:
+        return bool(self.client and self._authorized)
+
+    async def _on_message(self, client: Client, message) -> None:
+        wrapped = None
+        for conversation in self._conversations:
+            if _from_bot(message, conversation.bot_username):
+                wrapped = wrapped or PyrogramMessage(client, message)
+                conversation._responses.put_nowait(wrapped)
+        await self._on_edited(client, message, wrapped)
+
+    async def _on_edited(self, client: Client, message, wrapped=None) -> None:
+        for bot_username, collector in self._collectors:
+            if _from_bot(message, bot_username):
+                wrapped = wrapped or PyrogramMessage(client, message)
+                collector.feed(wrapped)
+
+    @asynccontextmanager
+    async def conversation(self, bot_username: str, timeout: float = 15):
+        if not self.client:
+            raise RuntimeError("Telegram client is not initialized.")
+        conversation = PyrogramConversation(self, bot_username, timeout)
+        self._conversations.append(conversation)
+        try:
+            yield conversation
+        finally:
+            self._conversations.remove(conversation)
+
+    async def last_message(self, bot_username: str):
+        """Последнее сообщение бота в чате (для продолжения сценария с чекпоинта)."""
+        if not self.client:
+            raise RuntimeError("Telegram client is not initialized.")
+        async for message in self.client.get_chat_history(bot_username, limit=10):
+            if not message.outgoing:
+                return PyrogramMessage(self.client, message)
+        return None
+
+    @asynccontextmanager
+    async def collector(self, bot_username: str):
+        """Подписка на новые и отредактированные сообщения бота на время сценария."""
+        if not self.client:
+            raise RuntimeError("Telegram client is not initialized.")
+        entry = (bot_username, ResponseCollector())
+        self._collectors.append(entry)
+        try:
+            yield entry[1]
+        finally:
+            self._collectors.remove(entry)
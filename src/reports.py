@@ -0,0 +1,188 @@
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from pathlib import Path
+
+logger = logging.getLogger("TestEngine")
+
+INDEX_FILE = "index.jsonl"
+# Индекс общий для всех прогонов процесса: дозапись и чистка под одной блокировкой
+_index_lock = threading.Lock()
+
+
+def new_run_id() -> str:
+    return time.strftime("%Y%m%d-%H%M%S-") + uuid.uuid4().hex[:6]
+
+
+class RunReport:
+    """
+    Отчет прогона в JSONL: одна запись на каждое событие BotTester
+    (шаг, ответ, цикл, итог сценария). Подключается как listener.
+
+    Записи копятся в буфере и пишутся в файл из отдельного потока, чтобы не
+    блокировать event loop. Файл ротируется по размеру (<run_id>.jsonl,
+    <run_id>.1.jsonl, ...). По завершении в index.jsonl добавляется сводка,
+    старые прогоны сверх keep_runs удаляются.
+    """
+
+    def __init__(
+        self,
+        directory,
+        run_id: str | None = None,
+        max_bytes: int = 10 * 1024 * 1024,
+        keep_runs: int = 200,
+        flush_interval: float = 1.0,
+        buffer_size: int = 200,
+    ):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.run_id = run_id or new_run_id()
+        self.max_bytes = max_bytes
+        self.keep_runs = keep_runs
+        self.flush_interval = flush_interval
+        self.buffer_size = buffer_size
+        self.started_at = time.time()
+        self.files: list[str] = []
+        self._buffer: list[dict] = []
+        self._part = 0
+        self._part_size = 0
+        self._wake = asyncio.Event()
+        self._lock = asyncio.Lock()
+        self._flusher: asyncio.Task | None = None
+
+    def __call__(self, record: dict) -> None:
+        self._buffer.append(record)
+        if len(self._buffer) >= self.buffer_size:
+            self._wake.set()
+
+    async def start(self) -> "RunReport":
+        self._flusher = asyncio.create_task(self._flush_loop())
+        return self
+
+    async def _flush_loop(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            await self.flush()
+
+    async def flush(self) -> None:
+        async with self._lock:
+            if not self._buffer:
+                return
+            batch, self._buffer = self._buffer, []
+            await asyncio.to_thread(self._write, batch)
+
+    def _path(self, part: int) -> Path:
+        suffix = ".jsonl" if part == 0 else f".{part}.jsonl"
+        return self.directory / f"{self.run_id}{suffix}"
+
+    def _write(self, batch: list[dict]) -> None:
+        lines = [
+            (json.dumps(record, ensure_ascii=False, default=str) + "\n").encode("utf-8")
+            for record in batch
+        ]
+        f = None
+        try:
+            for line in lines:
+                if f is None or (self._part_size and self._part_size + len(line) > self.max_bytes):
+                    if f is not None:
+                        f.close()
+                        self._part += 1
+                        self._part_size = 0
+                    path = self._path(self._part)
+                    if path.name not in self.files:
+                        self.files.append(path.name)
+                    f = open(path, "ab")
+                f.write(line)
+                self._part_size += len(line)
+        finally:
+            if f is not None:
+                f.close()
+
+    async def close(self, results=None, status: str | None = None) -> dict:
+        """Дописывает буфер, добавляет сводку в индекс и чистит старые прогоны."""
+        if self._flusher is not None:
+            self._flusher.cancel()
+            await asyncio.gather(self._flusher, return_exceptions=True)
+        await self.flush()
+
+        results = list(results or [])
+        passed = sum(1 for r in results if r.success)
+        skipped = sum(1 for r in results if getattr(r, "skipped", False))
+        summary = {
+            "run_id": self.run_id,
+            "started_at": self.started_at,
+            "finished_at": time.time(),
+            "duration": time.time() - self.started_at,
+            "status": status or ("passed" if results and passed == len(results) else "failed"),
+            "passed": passed,
+            "failed": len(results) - passed - skipped,
+            "skipped": skipped,
+            "scenarios": [
+                {
+                    "name": r.name,
+                    "success": r.success,
+                    "duration": round(r.duration, 3),
+                    **({"variant": r.variant} if getattr(r, "variant", None) else {}),
+                }
+                for r in results
+            ],
+            "files": self.files,
+        }
+        await asyncio.to_thread(self._append_index, summary)
+        return summary
+
+    def _append_index(self, summary: dict) -> None:
+        with _index_lock:
+            self._update_index(summary)
+
+    def _update_index(self, summary: dict) -> None:
+        index = self.directory / INDEX_FILE
+        with open(index, "a", encoding="utf-8") as f:
+            f.write(json.dumps(summary, ensure_ascii=False) + "\n")
+
+        entries = read_index(self.directory)
+        if len(entries) <= self.keep_runs:
+            return
+        stale, keep = entries[self.keep_runs :], entries[: self.keep_runs]
+        for entry in stale:
+            for name in entry.get("files", []):
+                (self.directory / name).unlink(missing_ok=True)
+        tmp = index.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            for entry in reversed(keep):
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        os.replace(tmp, index)
+        logger.info(f"🧹 Удалено старых отчетов: {len(stale)}")
+
+
+def read_index(directory, limit: int | None = None) -> list[dict]:
+    """Сводки прогонов из индекса, новые первыми."""
+    index = Path(directory) / INDEX_FILE
+    if not index.exists():
+        return []
+    with open(index, encoding="utf-8") as f:
+        entries = [json.loads(line) for line in f if line.strip()]
+    entries.reverse()
+    return entries[:limit] if limit else entries
+
+
+def read_run(directory, run_id: str, event: str | None = None) -> list[dict] | None:
+    """Записи одного прогона (все части файла); None, если прогона нет в индексе."""
+    entry = next((e for e in read_index(directory) if e["run_id"] == run_id), None)
+    if entry is None:
+        return None
+    records = []
+    for name in entry["files"]:
+        with open(Path(directory) / name, encoding="utf-8") as f:
+            records.extend(json.loads(line) for line in f if line.strip())
+    if event:
+        records = [r for r in records if r.get("event") == event]
+    return records
@@ -0,0 +1,419 @@
+import csv
+import hashlib
+import io
+import json
+import logging
+import os
+import random
+import re
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+
+logger = logging.getLogger("TestEngine")
+
+# --- КОМПИЛЯЦИЯ СЦЕНАРИЕВ ---
+# Строки CSV один раз превращаются в список типизированных инструкций:
+# циклы получают индексы переходов, варианты сообщений — готовый список.
+
+UNTIL_REPLY_RE = re.compile(r'UNTIL_REPLY\s+(\d+)\s+["\'](.*?)["\']')
+REPEAT_RE = re.compile(r"REPEAT\s+(\d+)-(\d+)\s+(\d+)")
+QUOTED_RE = re.compile(r'["\'](.*?)["\']')
+NUMBERING_RE = re.compile(r"^\d+\.\s*")
+
+# Безопасная строка вместо варианта с плейсхолдером <...> (как в v0);
+# такие варианты помечаются в SendOneOf.placeholders, а не узнаются по тексту
+PLACEHOLDER_OPTION = "Тестировщик"
+
+
+class ScenarioCompileError(Exception):
+    """Строка сценария не может быть выполнена (неверный формат, нет шага перехода)."""
+
+
+@dataclass(frozen=True, slots=True)
+class Instruction:
+    step_num: int | str
+    action: str
+    expected_reply: str | None
+    error_msg: str
+
+
+@dataclass(frozen=True, slots=True)
+class SendText(Instruction):
+    """Обычный текст или команда (/start)."""
+
+
+@dataclass(frozen=True, slots=True)
+class SendOneOf(Instruction):
+    """Отправляет одно из сообщений: варианты уже очищены от нумерации."""
+
+    options: tuple[str, ...] = ()
+    placeholders: tuple[int, ...] = ()  # индексы вариантов, которые были плейсхолдерами <...>
+
+    def choose(self) -> str:
+        return random.choice(self.options) if self.options else "Test message"
+
+
+@dataclass(frozen=True, slots=True)
+class PressButton(Instruction):
+    label: str = ""
+
+
+@dataclass(frozen=True, slots=True)
+class UntilReply(Instruction):
+    """UNTIL_REPLY 6 "Твой маршрут сформирован" — прыжок на target, пока нет триггера."""
+
+    target: int = 0
+    target_step: int = 0
+    trigger: str = ""
+
+
+@dataclass(frozen=True, slots=True)
+class Repeat(Instruction):
+    """REPEAT 6-9 3 — повтор с шага target count раз."""
+
+    target: int = 0
+    start_step: int = 0
+    count: int = 0
+
+
+@dataclass(frozen=True, slots=True)
+class ScenarioProgram:
+    name: str
+    instructions: tuple[Instruction, ...]
+    variant: str | None = None  # выбор в шагах-вариантах, если сценарий развернут (src.variants)
+
+    def __len__(self) -> int:
+        return len(self.instructions)
+
+
+def is_empty(value) -> bool:
+    """Пустая ячейка CSV: None, NaN или пустая строка."""
+    return value is None or value != value or value == ""
+
+
+# Строки, которые pandas.read_csv по умолчанию считает NaN
+NA_VALUES = frozenset(
+    {
+        "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan",
+        "1.#IND", "1.#QNAN", "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a",
+        "nan", "null",
+    }
+)
+
+
+class StepRecord:
+    """Компактная строка сценария. get() принимает имена колонок CSV, как dict-строка."""
+
+    __slots__ = ("scenario", "step", "action", "expected", "checks", "error")
+
+    COLUMNS = {
+        "Сценарий": "scenario",
+        "Шаги": "step",
+        "Действие юзера": "action",
+        "Ответ бота": "expected",
+        "Что проверяем": "checks",
+        "Как запишем ошибку": "error",
+    }
+
+    def __init__(self, scenario, step=None, action=None, expected=None, checks=None, error=None):
+        self.scenario = scenario
+        self.step = step
+        self.action = action
+        self.expected = expected
+        self.checks = checks
+        self.error = error
+
+    def get(self, column: str, default=None):
+        attr = self.COLUMNS.get(column)
+        if attr is None:
+            return default
+        value = getattr(self, attr)
+        return default if value is None else value
+
+    def __getitem__(self, column: str):
+        return self.get(column)
+
+    def __repr__(self) -> str:
+        return f"StepRecord({self.scenario!r}, {self.step!r}, {self.action!r})"
+
+
+def _cell(value: str | None) -> str | None:
+    return None if value is None or value in NA_VALUES else value
+
+
+def load_steps(source) -> dict[str, list[StepRecord]]:
+    """
+    Читает CSV сценариев без pandas: многострочные ячейки в кавычках, пустые и
+    NA-значения -> None, строки без 'Сценарий' отбрасываются, сценарии сортируются
+    по имени (как groupby в pandas). source — Path к файлу или уже прочитанный текст.
+    """
+    text = source.read_text(encoding="utf-8-sig") if isinstance(source, Path) else source
+
+    grouped: dict[str, list[StepRecord]] = {}
+    for row in csv.DictReader(io.StringIO(text, newline="")):
+        scenario = _cell(row.get("Сценарий"))
+        if scenario is None:
+            continue
+        step = _cell(row.get("Шаги"))
+        grouped.setdefault(scenario, []).append(
+            StepRecord(
+                scenario,
+                _step_number(step, None),
+                _cell(row.get("Действие юзера")),
+                _cell(row.get("Ответ бота")),
+                _cell(row.get("Что проверяем")),
+                _cell(row.get("Как запишем ошибку")),
+            )
+        )
+    return {name: grouped[name] for name in sorted(grouped)}
+
+
+def _step_number(value, default: int) -> int | str:
+    if is_empty(value):
+        return default
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return str(value).strip()
+    return int(number) if number.is_integer() else number
+
+
+def _parse_options(action: str) -> tuple[tuple[str, ...], tuple[int, ...]]:
+    """Варианты сообщения и индексы тех, что были плейсхолдерами."""
+    options, placeholders = [], []
+    for line in action.split("\n"):
+        line = line.strip()
+        if not line or line.startswith("Отправляет"):
+            continue
+        option = NUMBERING_RE.sub("", line)  # убрать нумерацию "1. "
+        if "<" in option and ">" in option:
+            placeholders.append(len(options))
+            option = PLACEHOLDER_OPTION
+        options.append(option)
+    return tuple(options), tuple(placeholders)
+
+
+def compile_scenario(name: str, rows) -> ScenarioProgram:
+    """
+    Компилирует строки сценария (StepRecord или dict'ы с колонками CSV) в ScenarioProgram.
+    Бросает ScenarioCompileError на первой некорректной строке.
+    """
+    rows = list(rows)
+    step_nums = [_step_number(row.get("Шаги"), idx + 1) for idx, row in enumerate(rows)]
+
+    def resolve(step_num: int, target_step: int) -> int:
+        try:
+            return step_nums.index(target_step)
+        except ValueError:
+            raise ScenarioCompileError(
+                f"Шаг {step_num}: не найден шаг перехода {target_step}"
+            ) from None
+
+    instructions: list[Instruction] = []
+    for row, step_num in zip(rows, step_nums):
+        action = "" if is_empty(row.get("Действие юзера")) else str(row["Действие юзера"]).strip()
+        expected = row.get("Ответ бота")
+        error_msg = row.get("Как запишем ошибку")
+        common = dict(
+            step_num=step_num,
+            action=action,
+            expected_reply=None if is_empty(expected) else str(expected),
+            error_msg=f"Ошибка на шаге {step_num}" if is_empty(error_msg) else str(error_msg),
+        )
+
+        if not action:
+            raise ScenarioCompileError(f"Шаг {step_num}: пустое действие юзера")
+
+        if action.startswith("UNTIL_REPLY"):
+            match = UNTIL_REPLY_RE.search(action)
+            if not match:
+                raise ScenarioCompileError(f"Шаг {step_num}: неверный формат UNTIL_REPLY")
+            target_step = int(match.group(1))
+            instructions.append(
+                UntilReply(
+                    **common,
+                    target=resolve(step_num, target_step),
+                    target_step=target_step,
+                    trigger=match.group(2),
+                )
+            )
+        elif action.startswith("REPEAT"):
+            match = REPEAT_RE.search(action)
+            if not match:
+                raise ScenarioCompileError(f"Шаг {step_num}: непонятный формат REPEAT")
+            start_step = int(match.group(1))
+            instructions.append(
+                Repeat(
+                    **common,
+                    target=resolve(step_num, start_step),
+                    start_step=start_step,
+                    count=int(match.group(3)),
+                )
+            )
+        elif "Отправляет одно из" in action:
+            options, placeholders = _parse_options(action)
+            instructions.append(SendOneOf(**common, options=options, placeholders=placeholders))
+        elif action.startswith("/"):
+            instructions.append(SendText(**common))
+        elif "Нажимает" in action or "кнопку" in action:
+            match = QUOTED_RE.search(action)
+            label = (match.group(1) if match else "").strip()
+            if not label:
+                raise ScenarioCompileError(f"Шаг {step_num}: не найден текст кнопки в кавычках")
+            instructions.append(PressButton(**common, label=label))
+        else:
+            instructions.append(SendText(**common))
+
+    return ScenarioProgram(name=name, instructions=tuple(instructions))
+
+
+def scenario_hash(steps: list[StepRecord]) -> str:
+    """Хеш содержимого строк сценария: меняется при правке любой его ячейки."""
+    rows = [[step.step, step.action, step.expected, step.checks, step.error] for step in steps]
+    return hashlib.sha256(json.dumps(rows, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+@dataclass(frozen=True)
+class ScenarioSnapshot:
+    """Неизменяемый результат разбора файла сценариев: прогон держит свой снимок."""
+
+    digest: str
+    names: tuple[str, ...]
+    programs: dict[str, ScenarioProgram] = field(default_factory=dict)
+    errors: dict[str, str] = field(default_factory=dict)
+    hashes: dict[str, str] = field(default_factory=dict)  # sha256 строк каждого сценария
+
+
+class ScenarioRepository:
+    """
+    Держит разобранные и скомпилированные сценарии в памяти.
+    Файл перечитывается, только если изменились mtime/размер, а программы
+    пересобираются, только если изменилось содержимое (sha256).
+    Новый снимок подменяет старый целиком, поэтому идущий прогон его не видит.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._snapshot: ScenarioSnapshot | None = None
+        self._stat_key: tuple[int, int] | None = None
+        self._lock = threading.Lock()
+
+    def _is_fresh(self, stat_key) -> bool:
+        return self._snapshot is not None and self._stat_key == stat_key
+
+    def snapshot(self) -> ScenarioSnapshot:
+        stat = os.stat(self.path)
+        stat_key = (stat.st_mtime_ns, stat.st_size)
+        if self._is_fresh(stat_key):
+            return self._snapshot
+
+        with self._lock:
+            if self._is_fresh(stat_key):
+                return self._snapshot
+
+            data = self.path.read_bytes()
+            digest = hashlib.sha256(data).hexdigest()
+            if self._snapshot is None or self._snapshot.digest != digest:
+                self._snapshot = self._build(data, digest)
+                logger.info(f"📄 Сценарии загружены: {len(self._snapshot.names)} шт.")
+            self._stat_key = stat_key
+            return self._snapshot
+
+    @staticmethod
+    def _build(data: bytes, digest: str) -> ScenarioSnapshot:
+        grouped = load_steps(data.decode("utf-8-sig"))
+
+        names: list[str] = []
+        programs: dict[str, ScenarioProgram] = {}
+        errors: dict[str, str] = {}
+        hashes: dict[str, str] = {}
+        for name, steps in grouped.items():
+            names.append(name)
+            hashes[name] = scenario_hash(steps)
+            try:
+                programs[name] = compile_scenario(name, steps)
+            except ScenarioCompileError as e:
+                logger.error(f"❌ Сценарий '{name}' не скомпилирован: {e}")
+                errors[name] = str(e)
+        return ScenarioSnapshot(
+            digest=digest,
+            names=tuple(names),
+            programs=programs,
+            errors=errors,
+            hashes=hashes,
+        )
+
+
+def load_dependencies(path) -> dict[str, tuple[str, ...]]:
+    """
+    Зависимости сценариев из JSON: {"Сценарий B": ["Сценарий A"]} — B идет
+    после A тем же аккаунтом (состояние пользователя в боте общее).
+    Нет файла — нет зависимостей.
+    """
+    path = Path(path)
+    if not path.exists():
+        return {}
+    data = json.loads(path.read_text(encoding="utf-8"))
+    return {name: tuple(deps) for name, deps in data.items()}
+
+
+def suite_digest(digest: str, dependencies_path) -> str:
+    """
+    Версия набора для распределенного прогона: sha256 CSV плюс файл зависимостей —
+    от него зависят группы и порядок сценариев на воркере.
+    """
+    path = Path(dependencies_path)
+    dependencies = path.read_bytes() if path.exists() else b""
+    return hashlib.sha256(digest.encode() + b"\0" + dependencies).hexdigest()
+
+
+def dependency_groups(names, dependencies=None) -> list[list[int]]:
+    """
+    Делит сценарии на группы, которые можно выполнять независимо: связанные
+    зависимостями сценарии попадают в одну группу в топологическом порядке
+    (при равенстве — в исходном). Возвращает индексы в names.
+    Зависимости на сценарии вне names игнорируются.
+    """
+    dependencies = dependencies or {}
+    positions: dict[str, list[int]] = {}
+    for idx, name in enumerate(names):
+        positions.setdefault(name, []).append(idx)
+
+    parent = list(range(len(names)))
+
+    def find(idx: int) -> int:
+        while parent[idx] != idx:
+            parent[idx] = parent[parent[idx]]
+            idx = parent[idx]
+        return idx
+
+    for name, deps in dependencies.items():
+        for dep in deps:
+            for a in positions.get(name, ()):
+                for b in positions.get(dep, ()):
+                    parent[find(a)] = find(b)
+
+    components: dict[int, list[int]] = {}
+    for idx in range(len(names)):
+        components.setdefault(find(idx), []).append(idx)
+
+    groups = []
+    for members in components.values():
+        ordered, done = [], set()
+
+        def visit(idx: int, path: tuple = ()) -> None:
+            if idx in done:
+                return
+            if idx in path:
+                raise ScenarioCompileError(f"Циклическая зависимость сценария '{names[idx]}'")
+            for dep in dependencies.get(names[idx], ()):
+                for dep_idx in positions.get(dep, ()):
+                    visit(dep_idx, path + (idx,))
+            done.add(idx)
+            ordered.append(idx)
+
+        for idx in members:
+            visit(idx)
+        groups.append(ordered)
+    return sorted(groups, key=lambda group: min(group))
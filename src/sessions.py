@@ -0,0 +1,105 @@
+import logging
+import os
+import sqlite3
+import threading
+from pathlib import Path
+
+from telethon.crypto import AuthKey
+from telethon.sessions import StringSession
+
+logger = logging.getLogger("TestEngine")
+
+# --- ХРАНЕНИЕ СЕССИЙ В ПАМЯТИ ---
+# Ключ авторизации и адрес DC читаются с диска один раз на процесс, клиенты
+# получают StringSession в памяти: подключение не трогает SQLite, а несколько
+# процессов на общем каталоге sessions/ не упираются в его блокировки.
+#   <имя>.string  — строка StringSession, пишется атомарно (tmp + os.replace),
+#                   с правами 0600 и только когда ключ или DC действительно изменились;
+#   <имя>.session — SQLite-сессия Telethon, открывается только на чтение.
+# Берется более свежий из двух файлов: сессия, пересозданная provision или
+# вручную, заменяет старую строку.
+
+
+def read_sqlite_session(path: Path) -> str:
+    """Строка StringSession из SQLite-сессии Telethon; '' — если ключа нет или формат чужой."""
+    try:
+        with sqlite3.connect(f"file:{path}?mode=ro", uri=True) as db:
+            row = db.execute("select dc_id, server_address, port, auth_key from sessions").fetchone()
+    except sqlite3.Error as e:
+        logger.warning(f"⚠️ Не удалось прочитать сессию {path} (формат Pyrogram?): {e}")
+        return ""
+    if not row or not row[3]:
+        return ""
+    session = StringSession()
+    session.set_dc(row[0], row[1], row[2])
+    session.auth_key = AuthKey(row[3])
+    return session.save()
+
+
+class SharedSession(StringSession):
+    """
+    Сессия клиента в памяти. Telethon вызывает save() на каждое подключение;
+    на диск уходит только изменившаяся строка (новый ключ, смена DC).
+    """
+
+    def __init__(self, store: "SessionStore", path: Path, string: str):
+        super().__init__(string or None)
+        self._store = store
+        self._path = path
+        self._persisted = string
+
+    def save(self) -> str:
+        string = super().save()
+        # Без ключа (сброс при переезде на другой DC) сохранять нечего
+        if string and string != self._persisted:
+            self._store.persist(self._path, string)
+            self._persisted = string
+        return string
+
+
+class SessionStore:
+    """Кэш материала сессий процесса, ключ — путь к файлу сессии."""
+
+    def __init__(self):
+        self._strings: dict[Path, str] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def string_file(path: Path) -> Path:
+        return Path(path).with_suffix(".string")
+
+    def _read(self, path: Path) -> str:
+        string_file = self.string_file(path)
+        if string_file.exists() and (
+            not path.exists() or string_file.stat().st_mtime >= path.stat().st_mtime
+        ):
+            return string_file.read_text(encoding="utf-8").strip()
+        if path.exists():
+            return read_sqlite_session(path)
+        return ""
+
+    def load(self, path) -> str:
+        path = Path(path)
+        with self._lock:
+            if path not in self._strings:
+                self._strings[path] = self._read(path)
+            return self._strings[path]
+
+    def session(self, path) -> SharedSession:
+        path = Path(path)
+        return SharedSession(self, path, self.load(path))
+
+    def persist(self, path, string: str) -> None:
+        path = Path(path)
+        string_file = self.string_file(path)
+        with self._lock:
+            self._strings[path] = string
+            string_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp = string_file.with_suffix(f".tmp{os.getpid()}")
+            # В строке — ключ авторизации аккаунта: файл читает только владелец
+            fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(string)
+            os.chmod(tmp, 0o600)  # O_CREAT не меняет права уже существующего файла
+            os.replace(tmp, string_file)
+        logger.info(f"💾 Сессия {path.stem} изменилась, сохранена в {string_file.name}.")
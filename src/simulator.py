@@ -0,0 +1,347 @@
+import asyncio
+import itertools
+import random
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+
+from src.collector import ResponseCollector
+from src.matcher import PLACEHOLDER_RE
+from src.scenarios import PressButton, Repeat, ScenarioProgram, SendOneOf, UntilReply
+
+# --- СИМУЛЯТОР БОТА ---
+# Бот описывается конечным автоматом: состояние -> переходы по тексту и
+# по кнопкам, каждый переход отвечает пачкой сообщений. Адаптер реализует
+# тот же протокол ConversationAdapter, что и Telegram, но без сети.
+
+ANY = "*"  # переход по любому тексту / состояние с глобальными переходами
+
+
+def _key(text: str) -> str:
+    return text.strip().lower()
+
+
+@dataclass
+class Latency:
+    """Задержка ответа: base секунд + jitter по выбранному распределению."""
+
+    base: float = 0.0
+    jitter: float = 0.0
+    distribution: str = "uniform"  # constant | uniform | normal | lognormal
+
+    def sample(self, rng: random.Random) -> float:
+        if self.distribution == "constant" or not self.jitter:
+            return self.base
+        if self.distribution == "uniform":
+            return self.base + rng.uniform(0, self.jitter)
+        if self.distribution == "normal":
+            return max(0.0, rng.gauss(self.base, self.jitter))
+        if self.distribution == "lognormal":
+            return self.base * rng.lognormvariate(0, self.jitter)
+        raise ValueError(f"Unknown latency distribution: {self.distribution}")
+
+
+@dataclass
+class Reply:
+    text: str
+    buttons: list[list[str]] | None = None
+    gap: float = 0.0  # пауза перед сообщением внутри пачки
+    edit: bool = False  # отредактировать последнее сообщение с кнопками вместо нового
+
+
+@dataclass
+class Transition:
+    replies: list[Reply] = field(default_factory=list)
+    next_state: str | None = None  # None — остаться в текущем состоянии
+
+
+@dataclass
+class State:
+    on_text: dict[str, Transition] = field(default_factory=dict)
+    on_button: dict[str, Transition] = field(default_factory=dict)
+
+
+@dataclass
+class BotSpec:
+    states: dict[str, State]
+    initial: str = "start"
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "BotSpec":
+        """
+        Декларативное описание:
+        {"initial": "start", "states": {"start": {"text": {"/start": {
+            "replies": [{"text": "Привет", "buttons": [["Да", "Нет"]]}], "next": "ask"}}},
+          "ask": {"buttons": {"Да": {...}}}}}
+        """
+
+        def transition(raw: dict) -> Transition:
+            replies = [Reply(**reply) for reply in raw.get("replies", [])]
+            return Transition(replies=replies, next_state=raw.get("next"))
+
+        states = {
+            name: State(
+                on_text={_key(k): transition(v) for k, v in raw.get("text", {}).items()},
+                on_button={_key(k): transition(v) for k, v in raw.get("buttons", {}).items()},
+            )
+            for name, raw in data["states"].items()
+        }
+        return cls(states=states, initial=data.get("initial", "start"))
+
+    @classmethod
+    def from_programs(cls, programs, filler: str = "Тест") -> "BotSpec":
+        """
+        Автомат, который проходит скомпилированные сценарии: отвечает ожидаемыми
+        текстами (плейсхолдеры заполнены), показывает нужные кнопки и сразу
+        присылает триггер UNTIL_REPLY. Общие префиксы сценариев (/start) сливаются
+        построением подмножеств, как при детерминизации НКА.
+        """
+        init = ("init",)
+        edges: dict = {}  # (узел, ключ действия) -> множество узлов
+        replies: dict = {}  # узел -> текст ответа
+        buttons: dict = {}  # узел -> кнопки, которые могут понадобиться дальше
+        triggers: dict = {}  # узел -> триггеры UNTIL_REPLY, проверяемые после него
+
+        for p, program in enumerate(programs):
+            instructions = program.instructions
+            preds: list[set] = [set() for _ in range(len(instructions) + 1)]
+            preds[0].add(init)
+            changed = True
+            while changed:  # поток управления с циклами: до неподвижной точки
+                changed = False
+                for i, step in enumerate(instructions):
+                    if isinstance(step, (Repeat, UntilReply)):
+                        outs, carried = (step.target, i + 1), preds[i]
+                    else:
+                        outs, carried = (i + 1,), {(p, i)}
+                    for out in outs:
+                        if not carried <= preds[out]:
+                            preds[out] |= carried
+                            changed = True
+
+            for i, step in enumerate(instructions):
+                if isinstance(step, UntilReply):
+                    for node in preds[i]:
+                        triggers.setdefault(node, []).append(step.trigger)
+                    continue
+                if isinstance(step, Repeat):
+                    continue
+                node = (p, i)
+                replies[node] = PLACEHOLDER_RE.sub(filler, step.expected_reply or "ОК")
+                if isinstance(step, PressButton):
+                    keys = [f"button:{_key(step.label)}"]
+                    for pred in preds[i]:
+                        buttons.setdefault(pred, []).append(step.label)
+                elif isinstance(step, SendOneOf):
+                    keys = [_key(option) for option in step.options] or [_key("Test message")]
+                else:
+                    keys = [_key(step.action)]
+                for pred in preds[i]:
+                    for key in keys:
+                        edges.setdefault((pred, key), set()).add(node)
+
+        def reply_for(nodes: frozenset) -> Reply:
+            texts = sorted({replies[n] for n in nodes}, key=len, reverse=True)
+            extra = [t for n in nodes for t in triggers.get(n, [])]
+            labels = list(dict.fromkeys(label for n in nodes for label in buttons.get(n, [])))
+            return Reply(
+                text="\n".join(dict.fromkeys(texts[:1] + extra)),
+                buttons=[[label] for label in labels] or None,
+            )
+
+        names: dict[frozenset, str] = {frozenset({init}): "start"}
+        states: dict[str, State] = {}
+        queue = [frozenset({init})]
+        while queue:
+            current = queue.pop()
+            state = states.setdefault(names[current], State())
+            by_key: dict[str, set] = {}
+            for (node, key), targets in edges.items():
+                if node in current:
+                    by_key.setdefault(key, set()).update(targets)
+            for key, targets in by_key.items():
+                target = frozenset(targets)
+                if target not in names:
+                    names[target] = f"s{len(names)}"
+                    queue.append(target)
+                transition = Transition(replies=[reply_for(target)], next_state=names[target])
+                if key.startswith("button:"):
+                    state.on_button[key.removeprefix("button:")] = transition
+                else:
+                    state.on_text[key] = transition
+        return cls(states=states, initial="start")
+
+
+class SimulatedButton:
+    def __init__(self, text: str, session: "SimulatedSession"):
+        self.text = text
+        self._session = session
+
+    async def click(self) -> None:
+        self._session.on_button(self.text)
+
+
+class SimulatedMessage:
+    def __init__(self, message_id: int, text: str, buttons=None):
+        self.id = message_id
+        self.text = text
+        self.buttons = buttons
+
+
+class SimulatedSession:
+    """Состояние одного пользователя в разговоре с симулятором."""
+
+    def __init__(self, adapter: "SimulatedBotAdapter"):
+        self.adapter = adapter
+        self.state = adapter.bot.spec.initial
+        self.last_with_buttons: SimulatedMessage | None = None
+        self._tasks: set[asyncio.Task] = set()
+
+    def _lookup(self, table: str, key: str) -> Transition | None:
+        states = self.adapter.bot.spec.states
+        for name in (self.state, ANY):
+            transitions = getattr(states.get(name, State()), table)
+            if key in transitions:
+                return transitions[key]
+            if table == "on_text" and ANY in transitions:
+                return transitions[ANY]
+        return None
+
+    def _schedule(self, transition: Transition | None) -> None:
+        if transition is None:
+            return  # бот молчит на неизвестный ввод
+        if transition.next_state is not None:
+            self.state = transition.next_state
+        task = asyncio.create_task(self._deliver(transition.replies))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def on_text(self, text: str) -> None:
+        self._schedule(self._lookup("on_text", _key(text)))
+
+    def on_button(self, label: str) -> None:
+        self._schedule(self._lookup("on_button", _key(label)))
+
+    async def _deliver(self, replies: list[Reply]) -> None:
+        bot = self.adapter.bot
+        await asyncio.sleep(bot.latency.sample(bot.rng))
+        for idx, reply in enumerate(replies):
+            gap = reply.gap or (bot.burst_gap if idx else 0.0)
+            if gap:
+                await asyncio.sleep(gap)
+            buttons = (
+                [[SimulatedButton(label, self) for label in row] for row in reply.buttons]
+                if reply.buttons
+                else None
+            )
+            if reply.edit and self.last_with_buttons is not None:
+                message = self.last_with_buttons
+                message.text, message.buttons = reply.text, buttons
+                self.adapter.emit(message, edited=True)
+                continue
+            message = SimulatedMessage(next(bot.message_ids), reply.text, buttons)
+            if buttons:
+                self.last_with_buttons = message
+            self.adapter.emit(message)
+
+    def close(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+
+
+class SimulatedConversation:
+    def __init__(self, adapter: "SimulatedBotAdapter", timeout: float):
+        self.session = SimulatedSession(adapter)
+        self.timeout = timeout
+        self._responses: asyncio.Queue = asyncio.Queue()
+        self.sent_messages: list[str] = []
+
+    async def send_message(self, message: str) -> None:
+        self.sent_messages.append(message)
+        self.session.adapter.bot.messages_received += 1
+        self.session.on_text(message)
+
+    async def get_response(self):
+        return await asyncio.wait_for(self._responses.get(), timeout=self.timeout)
+
+
+class SimulatedBot:
+    """
+    Бот-симулятор: автомат, распределение задержек и пачки сообщений.
+    Каждый adapter() — отдельный «пользователь» со своими разговорами.
+    """
+
+    def __init__(
+        self,
+        spec: BotSpec,
+        latency: Latency | None = None,
+        burst_gap: float = 0.0,
+        seed: int | None = None,
+    ):
+        self.spec = spec
+        self.latency = latency or Latency()
+        self.burst_gap = burst_gap
+        self.rng = random.Random(seed)
+        self.message_ids = itertools.count(1)
+        self.messages_received = 0
+
+    def adapter(self, name: str = "simulator", events: bool = True) -> "SimulatedBotAdapter":
+        return SimulatedBotAdapter(self, name=name, events=events)
+
+
+class SimulatedBotAdapter:
+    """
+    ConversationAdapter поверх SimulatedBot. events=False отключает подписку
+    на события (collector): BotTester будет читать ответы через get_response.
+    """
+
+    def __init__(self, bot: SimulatedBot, name: str = "simulator", events: bool = True):
+        self.bot = bot
+        self.name = name
+        self.connected = False
+        self._conversations: list[SimulatedConversation] = []
+        self._collectors: list[ResponseCollector] = []
+        self.supports_collector = events
+
+    async def connect(self) -> None:
+        self.connected = True
+
+    async def disconnect(self) -> None:
+        self.connected = False
+
+    async def is_user_authorized(self) -> bool:
+        return True
+
+    async def ping(self) -> None:
+        if not self.connected:
+            raise ConnectionError("Simulator is not connected.")
+
+    def emit(self, message: SimulatedMessage, edited: bool = False) -> None:
+        if not edited:
+            for conversation in self._conversations:
+                conversation._responses.put_nowait(message)
+        for collector in self._collectors:
+            collector.feed(message)
+
+    @asynccontextmanager
+    async def conversation(self, bot_username: str, timeout: float = 15):
+        conversation = SimulatedConversation(self, timeout)
+        self._conversations.append(conversation)
+        try:
+            yield conversation
+        finally:
+            self._conversations.remove(conversation)
+            conversation.session.close()
+
+    @asynccontextmanager
+    async def collector(self, bot_username: str):
+        collector = ResponseCollector()
+        self._collectors.append(collector)
+        try:
+            yield collector
+        finally:
+            self._collectors.remove(collector)
+
+
+def simulator_for(programs: list[ScenarioProgram], **kwargs) -> SimulatedBot:
+    """Симулятор, который проходит переданные сценарии (для бенчмарков и нагрузки)."""
+    return SimulatedBot(BotSpec.from_programs(programs), **kwargs)
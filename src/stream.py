@@ -0,0 +1,79 @@
+import asyncio
+import json
+from collections import deque
+
+# Маркер конца потока в очередях подписчиков
+_CLOSED = object()
+
+
+class EventStream:
+    """
+    Живой поток событий одного прогона для UI (SSE).
+    Подключается к BotTester как listener. Последние события хранятся в
+    history, поэтому подписчик, пришедший посреди прогона, сначала получает
+    уже случившееся, а затем новые события по мере их появления.
+    Медленный подписчик не тормозит прогон: при переполнении его очереди
+    самое старое событие выбрасывается.
+    """
+
+    def __init__(self, backlog: int = 1000, queue_size: int = 1000):
+        self.history: deque[dict] = deque(maxlen=backlog)
+        self.queue_size = queue_size
+        self.closed = False
+        self._subscribers: set[asyncio.Queue] = set()
+
+    def __call__(self, record: dict) -> None:
+        if self.closed:
+            return
+        self.history.append(record)
+        for queue in self._subscribers:
+            _put_latest(queue, record)
+
+    def close(self, record: dict | None = None) -> None:
+        """Завершает поток; record (например, итог задачи) уходит последним событием."""
+        if self.closed:
+            return
+        if record is not None:
+            self(record)
+        self.closed = True
+        for queue in self._subscribers:
+            _put_latest(queue, _CLOSED)
+
+    async def subscribe(self, heartbeat: float | None = None):
+        """
+        Асинхронный генератор событий до закрытия потока.
+        Если за heartbeat секунд событий нет, отдает None — повод послать
+        keep-alive, чтобы прокси не рвали соединение на долгом шаге.
+        """
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        for record in list(self.history):
+            _put_latest(queue, record)
+        if self.closed:
+            _put_latest(queue, _CLOSED)
+        self._subscribers.add(queue)
+        try:
+            while True:
+                try:
+                    item = await asyncio.wait_for(queue.get(), timeout=heartbeat)
+                except asyncio.TimeoutError:
+                    yield None
+                    continue
+                if item is _CLOSED:
+                    return
+                yield item
+        finally:
+            self._subscribers.discard(queue)
+
+
+def _put_latest(queue: asyncio.Queue, item) -> None:
+    if queue.full():
+        queue.get_nowait()
+    queue.put_nowait(item)
+
+
+def format_sse(record: dict | None) -> str:
+    """Кадр Server-Sent Events: имя события + JSON; None — комментарий keep-alive."""
+    if record is None:
+        return ": keep-alive\n\n"
+    data = json.dumps(record, ensure_ascii=False, default=str)
+    return f"event: {record.get('event', 'message')}\ndata: {data}\n\n"
@@ -0,0 +1,26 @@
+import re
+
+# --- ТЕСТОВЫЕ DC TELEGRAM ---
+# Номера вида 99966XYYYY, X — номер DC; код подтверждения — цифра DC пять раз.
+# Общие правила для generate_session.py и src.provision.
+
+# Адреса тестовых DC (https://core.telegram.org/api/auth#test-accounts)
+TEST_DC = {
+    1: ("149.154.175.10", 443),
+    2: ("149.154.167.40", 443),
+    3: ("149.154.175.117", 443),
+}
+
+_TEST_PHONE_RE = re.compile(r"99966(?P<dc>[1-3])(?P<rand_part>\d{4})")
+
+
+def dc_phone(dc: int, number: int) -> str:
+    return f"99966{dc}{number % 10000:04d}"
+
+
+def get_confirmation_code(phone: str) -> str | None:
+    """Код Test DC: цифра DC пять раз (9996621234 -> 22222); None — номер не из Test DC."""
+    match = _TEST_PHONE_RE.fullmatch(phone.strip().lstrip("+"))
+    if not match:
+        return None
+    return match.group("dc") * 5
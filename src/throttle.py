@@ -0,0 +1,202 @@
+import asyncio
+import logging
+import random
+import time
+
+from telethon import TelegramClient
+from telethon.errors import FloodError, RpcCallFailError, ServerError, TimedOutError
+
+from src import metrics
+
+logger = logging.getLogger("TestEngine")
+
+# --- ТРОТТЛИНГ ЗАПРОСОВ СЕССИИ ---
+# Каждая сессия Telegram отправляет сообщения через свой token bucket.
+# FloodWait от сервера ставит на паузу всю сессию (а не только упавший
+# запрос) и временно снижает частоту; успешные запросы постепенно
+# возвращают ее к настроенной.
+
+# Запросы на чтение можно безопасно повторить после сбоя сети/сервера.
+# Нажатие inline-кнопки — тоже Get*, но повтор нажмет кнопку второй раз.
+IDEMPOTENT_PREFIXES = ("Get", "Ping", "Check", "Resolve", "Search")
+# Имена запросов Telethon заканчиваются на Request, Pyrogram — нет.
+NON_IDEMPOTENT = frozenset({"GetBotCallbackAnswerRequest", "GetBotCallbackAnswer"})
+
+# Token bucket — только для отправки сообщений (и запроса кода при provision):
+# на них Telegram дает FloodWait. Отметки о прочтении, нажатия кнопок и
+# служебные запросы идут без очереди, иначе шаг «отправить, прочитать,
+# нажать» упирается в SEND_BURST уже на первом шаге.
+THROTTLED_PREFIXES = (
+    "SendMessage",
+    "SendMedia",
+    "SendMultiMedia",
+    "ForwardMessages",
+    "SendInlineBotResult",
+    "SendCode",
+)
+
+# Сбои, после которых запрос, возможно, не дошел до сервера
+TRANSIENT_ERRORS = (
+    ServerError,
+    RpcCallFailError,
+    TimedOutError,
+    ConnectionError,
+    asyncio.TimeoutError,
+)
+
+
+def is_idempotent(request) -> bool:
+    requests = request if isinstance(request, (list, tuple)) else [request]
+    for item in requests:
+        name = type(item).__name__
+        if name in NON_IDEMPOTENT or not name.startswith(IDEMPOTENT_PREFIXES):
+            return False
+    return True
+
+
+def is_throttled(request) -> bool:
+    requests = request if isinstance(request, (list, tuple)) else [request]
+    return any(type(item).__name__.startswith(THROTTLED_PREFIXES) for item in requests)
+
+
+def is_transient(error: Exception) -> bool:
+    # Ошибки Pyrogram не наследуют ошибки Telethon: 5xx узнаем по коду
+    return isinstance(error, TRANSIENT_ERRORS) or (getattr(type(error), "CODE", 0) or 0) >= 500
+
+
+def flood_wait_seconds(error: Exception) -> float | None:
+    """Пауза, которую требует сервер (FloodWait, SlowModeWait, ...), или None."""
+    if isinstance(error, FloodError):
+        return float(getattr(error, "seconds", 0) or 0)
+    if getattr(type(error), "CODE", None) == 420:  # Pyrogram: пауза в value
+        return float(getattr(error, "value", 0) or 0)
+    return None
+
+
+class TokenBucket:
+    """Не больше rate запросов в секунду в среднем и burst подряд; rate <= 0 — без ограничения."""
+
+    def __init__(self, rate: float, burst: float = 1):
+        self.rate = rate
+        self.capacity = max(1.0, burst)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self) -> float:
+        if self.rate <= 0:
+            return 0.0
+        self._refill()
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    async def acquire(self) -> None:
+        if self.rate <= 0:
+            return
+        async with self._lock:  # ожидающие получают токены по очереди
+            while (delay := self.wait_time()) > 0:
+                await asyncio.sleep(delay)
+            self.tokens -= 1
+
+
+class SessionThrottle:
+    """
+    Троттлинг и повторы для одной сессии.
+    call() ждет паузу FloodWait и токен (для отправки сообщений, throttled), а при
+    ошибке повторяет запрос: после FloodWait — любой (сервер его не выполнил),
+    после временного сбоя — только идемпотентный.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        rate: float = 1.0,
+        burst: float = 3,
+        retries: int = 3,
+        base_delay: float = 0.5,
+        max_delay: float = 10.0,
+        max_flood_wait: float = 60.0,
+    ):
+        self.name = name
+        self.base_rate = rate
+        self.bucket = TokenBucket(rate, burst)
+        self.retries = retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_flood_wait = max_flood_wait
+        self.paused_until = 0.0
+
+    def cooldown(self) -> float:
+        """Через сколько секунд сессия сможет отправить запрос (для выбора сессии в пуле)."""
+        return max(self.paused_until - time.monotonic(), self.bucket.wait_time(), 0.0)
+
+    def pause(self, seconds: float) -> None:
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+        if self.base_rate > 0:
+            self.bucket.rate = max(self.base_rate / 8, self.bucket.rate / 2)
+
+    def _recover(self) -> None:
+        if 0 < self.bucket.rate < self.base_rate:
+            self.bucket.rate = min(self.base_rate, self.bucket.rate + self.base_rate / 10)
+
+    async def call(
+        self, func, idempotent: bool = False, name: str = "request", throttled: bool | None = None
+    ):
+        """throttled по умолчанию — все неидемпотентные запросы."""
+        if throttled is None:
+            throttled = not idempotent
+        attempt = 0
+        while True:
+            if (paused := self.paused_until - time.monotonic()) > 0:
+                await asyncio.sleep(paused)
+            if throttled:
+                await self.bucket.acquire()
+            try:
+                result = await func()
+            except Exception as e:
+                wait = flood_wait_seconds(e)
+                if wait is not None:
+                    if wait > self.max_flood_wait or attempt >= self.retries:
+                        raise
+                    reason = "flood_wait"
+                    self.pause(wait)
+                    metrics.FLOOD_WAIT_SECONDS.labels(self.name).inc(wait)
+                    logger.warning(f"🐢 {self.name}: FloodWait {wait:.0f} с на {name}, сессия на паузе.")
+                elif idempotent and is_transient(e) and attempt < self.retries:
+                    reason = "transient"
+                    delay = min(self.base_delay * 2**attempt, self.max_delay)
+                    logger.warning(f"🔁 {self.name}: {name} упал ({e}), повтор через {delay:.1f} с.")
+                    await asyncio.sleep(delay * random.uniform(0.5, 1.0))
+                else:
+                    raise
+                attempt += 1
+                metrics.RPC_RETRIES.labels(self.name, reason).inc()
+                continue
+            self._recover()
+            return result
+
+
+class ThrottledTelegramClient(TelegramClient):
+    """
+    Все RPC клиента проходят через SessionThrottle сессии: паузы FloodWait и
+    повторы — для всех, token bucket — только для отправки сообщений.
+    Встроенное ожидание FloodWait в Telethon отключено: паузу держит
+    троттлер, и она касается всей сессии.
+    """
+
+    def __init__(self, *args, throttle: SessionThrottle, **kwargs):
+        super().__init__(*args, flood_sleep_threshold=0, **kwargs)
+        self.throttle = throttle
+
+    async def __call__(self, request, ordered=False, flood_sleep_threshold=None):
+        call = super().__call__
+        return await self.throttle.call(
+            lambda: call(request, ordered=ordered, flood_sleep_threshold=flood_sleep_threshold),
+            idempotent=is_idempotent(request),
+            throttled=is_throttled(request),
+            name=type(request).__name__,
+        )
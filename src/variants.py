@@ -0,0 +1,167 @@
+import itertools
+import logging
+import random
+from dataclasses import replace
+
+from src.scenarios import ScenarioProgram, SendOneOf
+
+logger = logging.getLogger("TestEngine")
+
+# --- ВАРИАНТЫ СЦЕНАРИЯ ---
+# Шаги «Отправляет одно из сообщений» — оси матрицы, их варианты — значения.
+# Вместо случайного выбора на каждом прогоне сценарий разворачивается в
+# варианты с фиксированным выбором, которые идут параллельно:
+#   cartesian — все сочетания (не больше limit);
+#   pairwise  — каждая пара значений двух любых осей встречается хотя бы раз;
+#   sample    — seeded-выборка различных сочетаний.
+
+CARTESIAN = "cartesian"
+PAIRWISE = "pairwise"
+SAMPLE = "sample"
+STRATEGIES = (CARTESIAN, PAIRWISE, SAMPLE)
+
+
+def option_axes(program: ScenarioProgram, placeholder_values=()) -> list[tuple[int, tuple[str, ...]]]:
+    """
+    Оси матрицы: (индекс инструкции, варианты). Варианты-плейсхолдеры
+    (<название случайной профессии>, см. SendOneOf.placeholders) раскрываются
+    в placeholder_values, если они заданы.
+    """
+    axes = []
+    for idx, step in enumerate(program.instructions):
+        if not isinstance(step, SendOneOf) or not step.options:
+            continue
+        values: list[str] = []
+        for n, option in enumerate(step.options):
+            values.extend(placeholder_values if n in step.placeholders and placeholder_values else [option])
+        values = list(dict.fromkeys(values))
+        if len(values) > 1:
+            axes.append((idx, tuple(values)))
+    return axes
+
+
+def check_cartesian(sizes: list[int], limit: int) -> None:
+    total = 1
+    for size in sizes:
+        total *= size
+    if total > limit:
+        raise _too_many(CARTESIAN, total, limit)
+
+
+def cartesian(sizes: list[int], limit: int) -> list[tuple[int, ...]]:
+    check_cartesian(sizes, limit)
+    return list(itertools.product(*(range(size) for size in sizes)))
+
+
+def _too_many(strategy: str, total: int, limit: int) -> ValueError:
+    hint = "используйте sample" if strategy == PAIRWISE else "используйте pairwise или sample"
+    return ValueError(f"{strategy} дает {total} вариантов (лимит {limit}): {hint}.")
+
+
+def pairwise(sizes: list[int], limit: int | None = None) -> list[tuple[int, ...]]:
+    """
+    Жадное покрытие всех пар: каждая строка берет первую непокрытую пару и добирает остальное.
+    Вариантов не меньше произведения двух самых длинных осей; больше limit — ValueError.
+    """
+    if limit is not None and len(sizes) >= 2:
+        largest = sorted(sizes)[-2:]
+        if largest[0] * largest[1] > limit:
+            raise _too_many(PAIRWISE, largest[0] * largest[1], limit)
+    if len(sizes) < 2:
+        rows = [(value,) for value in range(sizes[0])] if sizes else [()]
+        if limit is not None and len(rows) > limit:
+            raise _too_many(PAIRWISE, len(rows), limit)
+        return rows
+    uncovered = {
+        (i, a, j, b)
+        for i, j in itertools.combinations(range(len(sizes)), 2)
+        for a in range(sizes[i])
+        for b in range(sizes[j])
+    }
+    rows = []
+    while uncovered:
+        i, a, j, b = min(uncovered)
+        row: list[int | None] = [None] * len(sizes)
+        row[i], row[j] = a, b
+        for k, size in enumerate(sizes):
+            if row[k] is not None:
+                continue
+
+            def gain(value: int) -> int:
+                return sum(
+                    ((m, row[m], k, value) if m < k else (k, value, m, row[m])) in uncovered
+                    for m in range(len(sizes))
+                    if row[m] is not None
+                )
+
+            row[k] = max(range(size), key=gain)
+        uncovered -= {
+            (m, row[m], n, row[n]) for m, n in itertools.combinations(range(len(sizes)), 2)
+        }
+        rows.append(tuple(row))
+        if limit is not None and len(rows) > limit:
+            raise _too_many(PAIRWISE, len(rows), limit)
+    return rows
+
+
+def sample(sizes: list[int], count: int, rng: random.Random) -> list[tuple[int, ...]]:
+    """Различные сочетания в случайном (seeded) порядке, без перебора всего произведения."""
+    total = 1
+    for size in sizes:
+        total *= size
+    chosen: dict[tuple[int, ...], None] = {}
+    while len(chosen) < min(count, total):
+        chosen[tuple(rng.randrange(size) for size in sizes)] = None
+    return list(chosen)
+
+
+def check_expansion(
+    program: ScenarioProgram,
+    strategy: str = PAIRWISE,
+    limit: int = 256,
+    placeholder_values=(),
+) -> None:
+    """То же ValueError, что даст expand_program, но без построения вариантов (для проверки запроса)."""
+    if strategy not in STRATEGIES:
+        raise ValueError(f"Unknown expansion strategy: {strategy}")
+    sizes = [len(values) for _, values in option_axes(program, placeholder_values)]
+    if strategy == CARTESIAN:
+        check_cartesian(sizes, limit)
+    elif strategy == PAIRWISE:
+        pairwise(sizes, limit)  # жадное покрытие дешевое, число строк заранее не известно
+
+
+def expand_program(
+    program: ScenarioProgram,
+    strategy: str = PAIRWISE,
+    samples: int = 20,
+    seed: int | None = None,
+    limit: int = 256,
+    placeholder_values=(),
+) -> list[ScenarioProgram]:
+    """Варианты сценария с фиксированным выбором; без осей — сам сценарий."""
+    if strategy not in STRATEGIES:
+        raise ValueError(f"Unknown expansion strategy: {strategy}")
+    axes = option_axes(program, placeholder_values)
+    if not axes:
+        return [program]
+
+    sizes = [len(values) for _, values in axes]
+    if strategy == CARTESIAN:
+        combos = cartesian(sizes, limit)
+    elif strategy == PAIRWISE:
+        combos = pairwise(sizes, limit)
+    else:
+        combos = sample(sizes, min(samples, limit), random.Random(seed))
+
+    variants = []
+    for combo in combos:
+        instructions = list(program.instructions)
+        labels = []
+        for (idx, values), value in zip(axes, combo):
+            step = instructions[idx]
+            instructions[idx] = replace(step, options=(values[value],), placeholders=())
+            labels.append(f"шаг {step.step_num}: {values[value]}")
+        variants.append(replace(program, instructions=tuple(instructions), variant="; ".join(labels)))
+    logger.info(f"🧩 '{program.name}': {len(variants)} вариантов ({strategy}, осей: {len(axes)}).")
+    return variants
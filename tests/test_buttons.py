@@ -0,0 +1,58 @@
+from dataclasses import dataclass
+
+from src.buttons import CONTAINS, EXACT, FUZZY, PREFIX, ButtonResolver, normalize
+
+
+@dataclass
+class Button:
+    text: str
+
+
+@dataclass
+class Message:
+    id: int
+    buttons: list[list[Button]] | None
+
+
+def test_normalize_drops_emoji_and_case() -> None:
+    assert normalize("  ✅ Да,  КОНЕЧНО! ") == "да конечно"
+
+
+def test_resolver_tiers_prefer_newest_message() -> None:
+    resolver = ButtonResolver()
+    old_yes = Button("Да")
+    resolver.add(Message(1, [[old_yes, Button("Мужской")], [Button("Женский 👩")]]))
+    new_yes = Button("✅ Да")
+    resolver.add(Message(2, [[new_yes, Button("Пропустить этот доклад")]]))
+
+    assert resolver.resolve("да") == (new_yes, EXACT)
+    assert resolver.resolve("Пропустить")[1] == PREFIX
+    assert resolver.resolve("доклад")[1] == CONTAINS
+    assert resolver.resolve("Пропустит этот доклад")[1] == FUZZY
+    assert resolver.resolve("Нет") is None
+
+    # Кнопки старого сообщения — только по точному тексту
+    assert resolver.resolve("Женский")[1] == EXACT
+    assert resolver.resolve("Женски") is None
+    assert resolver.resolve("Мужкой") is None
+
+
+def test_latest_message_wins_over_older_exact_match() -> None:
+    resolver = ButtonResolver()
+    resolver.add(Message(1, [[Button("Да")]]))
+    confirm = Button("Да, записаться")
+    resolver.add(Message(2, [[confirm]]))
+
+    assert resolver.resolve("да") == (confirm, PREFIX)
+
+
+def test_edit_replaces_buttons_and_depth_is_bounded() -> None:
+    resolver = ButtonResolver(depth=2)
+    resolver.add(Message(1, [[Button("Старт")]]))
+    resolver.add(Message(1, None))  # кнопки убраны редактированием
+    assert resolver.resolve("Старт") is None
+
+    for message_id in range(2, 5):
+        resolver.add(Message(message_id, [[Button(f"Кнопка {message_id}")]]))
+    assert resolver.resolve("Кнопка 2") is None  # вытеснена; похожая "Кнопка 3" не подходит
+    assert resolver.resolve("Кнопка 4")[1] == EXACT
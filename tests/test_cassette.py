@@ -0,0 +1,98 @@
+import pytest
+
+import src.app
+
+from src.app import BotTester, run_scenarios_concurrently, scenario_repository
+from src.cassette import CLICK, SEND, Cassette, RecordingAdapter, ReplayAdapter
+from src.pool import SessionPool
+from src.simulator import BotSpec, Latency, SimulatedBot, simulator_for
+
+SPEC = {
+    "initial": "start",
+    "states": {
+        "start": {
+            "text": {
+                "/start": {
+                    "replies": [{"text": "Привет! Пойдем дальше?", "buttons": [["Да", "Нет"]]}],
+                    "next": "ask",
+                }
+            }
+        },
+        "ask": {
+            "buttons": {"Да": {"replies": [{"text": "Отлично!"}], "next": "done"}},
+            "text": {"*": {"replies": [{"text": "Жми кнопку", "buttons": [["Да", "Нет"]]}]}},
+        },
+    },
+}
+
+STEPS = [
+    {"Шаги": 1, "Действие юзера": "/start", "Ответ бота": "Привет"},
+    {"Шаги": 2, "Действие юзера": "Отправляет одно из:\n1. Ого\n2. Ага", "Ответ бота": "Жми кнопку"},
+    {"Шаги": 3, "Действие юзера": "Нажимает кнопку 'Да'", "Ответ бота": "Отлично"},
+]
+
+
+@pytest.fixture(autouse=True)
+def fast_replies(monkeypatch) -> None:
+    monkeypatch.setattr(src.app, "RESPONSE_SETTLE_MS", 20)
+    monkeypatch.setattr(src.app, "RESPONSE_TIMEOUT", 0.5)
+
+
+async def record(tmp_path, events: bool) -> Cassette:
+    bot = SimulatedBot(BotSpec.from_dict(SPEC), latency=Latency(0.02), burst_gap=0.01)
+    path = tmp_path / "cassette.json"
+    adapter = RecordingAdapter(bot.adapter(events=events), Cassette(), path)
+    assert await BotTester(adapter).run_scenario("spec", STEPS) is True
+    return Cassette.load(path)
+
+
+@pytest.mark.parametrize("events", [True, False])
+@pytest.mark.asyncio
+async def test_recorded_conversation_replays_without_bot(tmp_path, events: bool) -> None:
+    cassette = await record(tmp_path, events)
+
+    [tape] = cassette.conversations
+    assert [(e.action, e.text) for e in tape][0] == (SEND, "/start")
+    assert tape[-1].action == CLICK and tape[-1].text == "Да"
+    assert tape[0].delay >= 0.02
+    assert any(r.buttons == [["Да", "Нет"]] for e in tape for r in e.replies)
+
+    assert await BotTester(ReplayAdapter(cassette, events=events)).run_scenario("spec", STEPS) is True
+
+    # Измененное ожидание проверяется по записанному ответу бота
+    edited = [*STEPS[:2], {**STEPS[2], "Ответ бота": "Отлично, идем"}]
+    assert await BotTester(ReplayAdapter(cassette, events=events)).run_scenario("spec", edited) is False
+
+
+@pytest.mark.asyncio
+async def test_strict_replay_is_silent_on_unrecorded_action(tmp_path) -> None:
+    cassette = await record(tmp_path, events=True)
+    steps = [STEPS[0], {**STEPS[1], "Действие юзера": "Что-то новое"}]
+
+    assert await BotTester(ReplayAdapter(cassette)).run_scenario("spec", steps) is True
+    tester = BotTester(ReplayAdapter(cassette, strict=True))
+    assert await tester.run_scenario("spec", steps) is False
+
+
+@pytest.mark.asyncio
+async def test_replay_picks_matching_conversation(tmp_path) -> None:
+    snapshot = scenario_repository.snapshot()
+    programs = list(snapshot.programs.values())
+    path = tmp_path / "cassette.json"
+    cassette = Cassette()
+    bot = simulator_for(programs)
+    pool = SessionPool([RecordingAdapter(bot.adapter(f"user{i}"), cassette, path) for i in range(2)])
+    await pool.start()
+    try:
+        results = await run_scenarios_concurrently(pool, [(p.name, p) for p in programs])
+    finally:
+        await pool.stop()
+    assert all(r.success for r in results)
+
+    pool = SessionPool([ReplayAdapter(Cassette.load(path), f"replay{i}") for i in range(2)])
+    await pool.start()
+    try:
+        replayed = await run_scenarios_concurrently(pool, [(p.name, p) for p in programs])
+    finally:
+        await pool.stop()
+    assert [r.success for r in replayed] == [True] * len(programs)
@@ -0,0 +1,74 @@
+import pytest
+
+from src.checkpoints import Checkpoint, CheckpointStore, program_digest
+from src.scenarios import compile_scenario
+
+ROWS = [
+    {"Шаги": 1, "Действие юзера": "/start", "Ответ бота": "Привет"},
+    {"Шаги": 2, "Действие юзера": "REPEAT 1-1 2", "Ответ бота": ""},
+]
+
+
+@pytest.mark.asyncio
+async def test_checkpoint_roundtrip_and_mismatch(tmp_path) -> None:
+    store = CheckpointStore(tmp_path / "checkpoints.json")
+    digest = program_digest(compile_scenario("cp", ROWS))
+    await store.save(Checkpoint("cp", digest, 1, 2, {1: 2}, "Привет", session="tester"))
+
+    checkpoint = CheckpointStore(store.path).load("cp", digest, "tester")
+    assert checkpoint.index == 1
+    assert checkpoint.repeat_counters == {1: 2}
+    assert checkpoint.last_bot_response == "Привет"
+
+    # Другая версия сценария или другой аккаунт — чекпоинт не подходит
+    changed = program_digest(compile_scenario("cp", ROWS[:1]))
+    assert store.load("cp", changed, "tester") is None
+    assert store.load("cp", digest, "other") is None
+
+    await store.clear("cp", "tester")
+    assert store.load("cp", digest, "tester") is None
+    assert store.load("missing", digest) is None
+
+
+@pytest.mark.asyncio
+async def test_checkpoints_are_kept_per_run(tmp_path) -> None:
+    store = CheckpointStore(tmp_path / "checkpoints.json")
+    await store.save(Checkpoint("cp", "d", 1, 1, session="a", run_id="run1", ts=1.0))
+    await store.save(Checkpoint("cp", "d", 3, 3, session="b", run_id="run2", ts=2.0))
+    await store.save(Checkpoint("cp", "d", 2, 2, session="a", run_id="run3", ts=3.0))
+
+    # Параллельный прогон на другой сессии не затер чекпоинт, resume берет последний своей сессии
+    assert store.load("cp", "d", "a").run_id == "run3"
+    assert store.load("cp", "d", "b").index == 3
+
+    # Успех на сессии a убирает ее чекпоинты, чекпоинт сессии b остается
+    await store.clear("cp", "a")
+    reloaded = CheckpointStore(store.path)
+    assert reloaded.load("cp", "d", "a") is None
+    assert reloaded.load("cp", "d", "b").run_id == "run2"
+
+
+@pytest.mark.asyncio
+async def test_unchanged_checkpoint_is_not_rewritten(tmp_path) -> None:
+    store = CheckpointStore(tmp_path / "checkpoints.json")
+    await store.save(Checkpoint("cp", "d", 1, 1, session="a", ts=1.0))
+    store.path.unlink()
+
+    await store.save(Checkpoint("cp", "d", 1, 1, session="a", ts=2.0))
+    assert not store.path.exists()
+
+
+@pytest.mark.asyncio
+async def test_stale_checkpoints_are_pruned(tmp_path, monkeypatch) -> None:
+    monkeypatch.setattr("src.checkpoints.time.time", lambda: 100.0)
+    store = CheckpointStore(tmp_path / "checkpoints.json", keep=2, max_age=50)
+    await store.save(Checkpoint("cp", "d", 1, 1, session="a", run_id="old", ts=10.0))
+    for n in range(3):
+        await store.save(Checkpoint("cp", "d", n, n, session="b", run_id=f"run{n}", ts=60.0 + n))
+    await store.save(Checkpoint("other", "d", 1, 1, session="a", run_id="run0", ts=60.0))
+
+    # Брошенный старый прогон и лишние сверх keep ушли, другой сценарий не тронут
+    reloaded = CheckpointStore(store.path)
+    assert sorted(reloaded._entries()) == ["run0/other", "run1/cp", "run2/cp"]
+    assert reloaded.latest_session("cp") == "b"
+    assert reloaded.latest_session("missing") is None
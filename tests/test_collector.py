@@ -0,0 +1,73 @@
+import asyncio
+from dataclasses import dataclass
+
+import pytest
+
+from src.collector import ResponseCollector
+
+
+@dataclass
+class Msg:
+    id: int
+    text: str
+
+
+async def feed_later(collector: ResponseCollector, messages, delay: float) -> None:
+    for message in messages:
+        await asyncio.sleep(delay)
+        collector.feed(message)
+
+
+@pytest.mark.asyncio
+async def test_burst_is_collected_as_one_batch() -> None:
+    collector = ResponseCollector()
+    asyncio.create_task(feed_later(collector, [Msg(1, "a"), Msg(2, "b"), Msg(3, "c")], 0.01))
+
+    batch = await collector.collect(first_timeout=1, settle=0.05, hard_cap=1)
+
+    assert [m.text for m in batch] == ["a", "b", "c"]
+
+
+@pytest.mark.asyncio
+async def test_edit_replaces_pending_message() -> None:
+    collector = ResponseCollector()
+    collector.feed(Msg(1, "Загрузка..."))
+    collector.feed(Msg(1, "Готово"))
+
+    batch = await collector.collect(first_timeout=1, settle=0.01, hard_cap=1)
+
+    assert [m.text for m in batch] == ["Готово"]
+
+
+@pytest.mark.asyncio
+async def test_hard_cap_limits_endless_stream() -> None:
+    collector = ResponseCollector()
+    stream = asyncio.create_task(feed_later(collector, [Msg(i, str(i)) for i in range(100)], 0.01))
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+
+    batch = await collector.collect(first_timeout=1, settle=0.05, hard_cap=0.1)
+    stream.cancel()
+
+    assert loop.time() - started < 0.3
+    assert 0 < len(batch) < 100
+
+
+@pytest.mark.asyncio
+async def test_silence_raises_timeout() -> None:
+    with pytest.raises(asyncio.TimeoutError):
+        await ResponseCollector().collect(first_timeout=0.01, settle=0.01, hard_cap=1)
+
+
+@pytest.mark.asyncio
+async def test_batch_arrivals_exclude_quiet_window() -> None:
+    collector = ResponseCollector()
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    asyncio.create_task(feed_later(collector, [Msg(1, "a"), Msg(2, "b")], 0.02))
+
+    await collector.collect(first_timeout=1, settle=0.2, hard_cap=1)
+
+    assert loop.time() - started >= 0.2
+    assert collector.batch_first_arrival - started == pytest.approx(0.02, abs=0.015)
+    assert collector.batch_last_arrival - started == pytest.approx(0.04, abs=0.015)
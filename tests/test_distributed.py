@@ -0,0 +1,88 @@
+import asyncio
+
+import pytest
+import uvicorn
+
+import src.app
+import src.distributed
+from src.app import create_app, scenario_repository
+from src.distributed import historical_durations, plan_shards, run_distributed
+from src.outcomes import OutcomeStore
+from src.pool import SessionPool
+from src.reports import RunReport
+from src.scenarios import suite_digest
+from src.simulator import simulator_for
+
+
+def test_plan_shards_balances_by_duration_and_keeps_groups() -> None:
+    durations = {"a": 10, "b": 6, "c": 5, "d": 4, "e": 1}
+    groups = [["a"], ["b"], ["c", "e"], ["d"]]
+
+    shards = plan_shards(groups, durations, workers=2)
+
+    loads = sorted(sum(durations[name] for name in shard) for shard in shards)
+    assert loads == [12, 14]
+    assert any(shard[-2:] == ["c", "e"] for shard in shards)
+
+
+def test_suite_digest_covers_dependencies(tmp_path) -> None:
+    path = tmp_path / "dependencies.json"
+    without = suite_digest("csv", path)
+    path.write_text('{"b": ["a"]}', encoding="utf-8")
+    with_deps = suite_digest("csv", path)
+
+    # Другие зависимости — другие группы на воркере, значит другая версия набора
+    assert without != with_deps
+    assert with_deps == suite_digest("csv", path)
+    assert with_deps != suite_digest("other", path)
+
+
+@pytest.mark.asyncio
+async def test_historical_durations_use_report_index(tmp_path) -> None:
+    for duration in (1.0, 3.0, 2.0):
+        report = await RunReport(tmp_path).start()
+        await report.close([src.app.ScenarioResult("s", True, duration)])
+
+    assert historical_durations(tmp_path) == {"s": 2.0}
+
+
+async def start_worker(programs):
+    bot = simulator_for(programs)
+
+    def pool_factory():
+        return SessionPool([bot.adapter(f"user{i}", events=False) for i in range(2)])
+
+    config = uvicorn.Config(
+        create_app(pool_factory), host="127.0.0.1", port=0, log_level="warning"
+    )
+    server = uvicorn.Server(config)
+    task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.01)
+    port = server.servers[0].sockets[0].getsockname()[1]
+    return server, task, f"http://127.0.0.1:{port}"
+
+
+@pytest.mark.asyncio
+async def test_coordinator_shards_suite_across_local_workers(tmp_path, monkeypatch) -> None:
+    monkeypatch.setattr(src.app, "REPORT_DIR", tmp_path)
+    monkeypatch.setattr(src.distributed, "REPORT_DIR", tmp_path)
+    # Воркеры пишут текстовый лог: не в logs/ репозитория и без замены обработчиков логгера
+    monkeypatch.setattr(src.app, "setup_file_logging", lambda: tmp_path / "test_run.log")
+    store = OutcomeStore(tmp_path / "outcomes.json")
+    monkeypatch.setattr(src.app, "outcome_store", store)
+    monkeypatch.setattr(src.distributed, "outcome_store", store)
+    programs = list(scenario_repository.snapshot().programs.values())
+    workers = [await start_worker(programs) for _ in range(3)]
+    # Недоступный воркер: его шард уходит следующему
+    urls = ["http://127.0.0.1:9"] + [url for _, _, url in workers]
+
+    try:
+        results = await run_distributed(urls, poll_interval=0.05)
+    finally:
+        for server, task, _ in workers:
+            server.should_exit = True
+        await asyncio.gather(*(task for _, task, _ in workers))
+
+    assert [r.name for r in results] == list(scenario_repository.snapshot().names)
+    assert all(r.success for r in results)
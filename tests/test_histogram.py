@@ -0,0 +1,35 @@
+import math
+import random
+
+import pytest
+
+from src.histogram import HdrHistogram
+
+
+def test_percentiles_within_relative_precision() -> None:
+    rng = random.Random(7)
+    values = sorted(rng.lognormvariate(-3, 1) for _ in range(20000))
+    histogram = HdrHistogram(significant_figures=3)
+    for value in values:
+        histogram.record(value)
+
+    for q in (50, 90, 99, 99.9):
+        exact = values[math.ceil(q / 100 * len(values)) - 1]
+        assert histogram.percentile(q) == pytest.approx(exact, rel=1e-3, abs=1e-6)
+    assert histogram.count == len(values)
+    assert histogram.percentile(100) == values[-1]
+
+
+def test_merge_combines_counts() -> None:
+    first, second = HdrHistogram(), HdrHistogram()
+    for _ in range(90):
+        first.record(0.010)
+    for _ in range(10):
+        second.record(2.0)
+
+    first.merge(second)
+
+    assert first.count == 100
+    assert first.percentile(50) == pytest.approx(0.010, rel=1e-3)
+    assert first.percentile(95) == pytest.approx(2.0, rel=1e-3)
+    assert first.max == 2.0
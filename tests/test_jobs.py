@@ -0,0 +1,67 @@
+import asyncio
+
+import pytest
+
+from src.app import ScenarioResult
+from src.jobs import CANCELLED, COMPLETED, FAILED, JobManager, QueueFullError
+
+
+def make_runner(release: asyncio.Event, success: bool = True):
+    async def runner(job):
+        await release.wait()
+        return [ScenarioResult(job.scenario or "all", success, 0.01)]
+
+    return runner
+
+
+@pytest.mark.asyncio
+async def test_job_runs_and_reports_results() -> None:
+    release = asyncio.Event()
+    jobs = JobManager(make_runner(release), workers=1)
+    await jobs.start()
+    try:
+        ok = jobs.submit("s1")
+        assert ok.status == "queued"
+        release.set()
+        await asyncio.wait_for(jobs.wait(ok), timeout=1)
+    finally:
+        await jobs.stop()
+
+    data = ok.to_dict()
+    assert data["status"] == COMPLETED
+    assert data["results"] == [{"name": "s1", "success": True, "duration": 0.01, "skipped": False, "variant": None}]
+
+
+@pytest.mark.asyncio
+async def test_failed_scenario_fails_job() -> None:
+    release = asyncio.Event()
+    release.set()
+    jobs = JobManager(make_runner(release, success=False))
+    await jobs.start()
+    try:
+        job = await asyncio.wait_for(jobs.wait(jobs.submit()), timeout=1)
+    finally:
+        await jobs.stop()
+
+    assert job.status == FAILED
+
+
+@pytest.mark.asyncio
+async def test_cancel_running_and_queued_jobs() -> None:
+    jobs = JobManager(make_runner(asyncio.Event()), workers=1, max_queue=2)
+    await jobs.start()
+    try:
+        running, queued = jobs.submit("a"), jobs.submit("b")
+        await asyncio.sleep(0.01)
+        jobs.submit("c")
+        with pytest.raises(QueueFullError):
+            jobs.submit("d")
+
+        jobs.cancel(queued.id)
+        jobs.cancel(running.id)
+        await asyncio.wait_for(jobs.wait(running), timeout=1)
+    finally:
+        await jobs.stop()
+
+    assert running.status == CANCELLED
+    assert queued.status == CANCELLED
@@ -0,0 +1,70 @@
+import pytest
+
+from src.app import scenario_repository
+from src.load import (
+    ArrivalProfile,
+    LatencyStats,
+    LoadProfile,
+    arrival_offsets,
+    run_load,
+    run_open_loop,
+    simulator_pool,
+)
+from src.pool import SessionPool
+from src.simulator import Latency, simulator_for
+
+
+def test_latency_percentiles() -> None:
+    stats = LatencyStats()
+    for value in [5, 1, 4, 2, 3, 6, 7, 8, 9, 10]:
+        stats.record(value / 10)
+
+    assert stats.percentile(50) == 0.5
+    assert stats.percentile(95) == 1.0
+    assert stats.summary()["count"] == 10
+
+
+@pytest.mark.asyncio
+async def test_virtual_users_replay_scenarios_on_simulator() -> None:
+    programs = list(scenario_repository.snapshot().programs.values())
+    pool = simulator_pool(programs, users=4, events=False)
+    profile = LoadProfile(users=6, ramp_up=0, duration=30, iterations=2)
+
+    try:
+        report = await run_load(pool, programs, profile)
+    finally:
+        await pool.stop()
+
+    assert report["scenarios"] == 12
+    assert report["scenario_failures"] == 0
+    assert report["peak_users"] == 6
+    assert report["scenarios_per_sec"] > 0
+    assert {row["scenario"] for row in report["by_step"]} == {p.name for p in programs}
+    assert all(row["failures"] == 0 for row in report["by_step"])
+
+
+def test_arrival_offsets_constant_and_poisson() -> None:
+    constant = list(arrival_offsets(ArrivalProfile(rate=10, duration=1)))
+    poisson = list(arrival_offsets(ArrivalProfile(rate=200, duration=10, process="poisson", seed=3)))
+
+    assert constant == pytest.approx([n / 10 for n in range(10)])
+    assert len(poisson) == pytest.approx(2000, rel=0.1)
+    assert poisson == sorted(poisson)
+
+
+@pytest.mark.asyncio
+async def test_open_loop_counts_queueing_from_intended_start() -> None:
+    programs = list(scenario_repository.snapshot().programs.values())[:1]
+    bot = simulator_for(programs, latency=Latency(0.02))
+    # Одна сессия и старты чаще, чем бот успевает: сценарии ждут в очереди
+    pool = SessionPool([bot.adapter("user0", events=False)])
+
+    try:
+        report = await run_open_loop(pool, programs, ArrivalProfile(rate=50, duration=0.2))
+    finally:
+        await pool.stop()
+
+    assert report["scheduled"] == 10
+    assert report["scenario_failures"] == 0
+    assert report["start_delay"]["max"] > report["service"]["p50"]
+    assert report["latency"]["p99"] > report["service"]["p99"]
@@ -0,0 +1,26 @@
+import pytest
+
+from src.matcher import TemplateMatcher
+
+
+@pytest.mark.parametrize(
+    ("expected", "actual", "result"),
+    [
+        ("Привет, <username>!", "Привет, Юля! Я Джаги", True),
+        ("Отлично! Укажи пол:", "отлично! укажи пол:", True),
+        ("Привет, <username>!\nХочешь?", "Пока", False),
+        ("Цена (1+1)?", "цена (1+1)? да", True),
+        (None, "что угодно", True),
+        (float("nan"), "что угодно", True),
+    ],
+)
+def test_match(expected, actual, result) -> None:
+    assert TemplateMatcher().match(expected, actual) is result
+
+
+def test_cache_is_bounded() -> None:
+    matcher = TemplateMatcher(maxsize=2)
+    for expected in ("a <x>", "b", "c <y>"):
+        matcher.match(expected, "text")
+
+    assert matcher.cache_info() == {"size": 2, "maxsize": 2}
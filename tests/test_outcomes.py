@@ -0,0 +1,53 @@
+import pytest
+
+from src.app import ScenarioResult
+from src.outcomes import MODE_ALL, MODE_CHANGED, MODE_FAILED, OutcomeStore
+from src.scenarios import ScenarioSnapshot
+
+
+def snapshot(**hashes) -> ScenarioSnapshot:
+    return ScenarioSnapshot(digest="d", names=tuple(hashes), hashes=hashes)
+
+
+def test_select_failed_and_changed(tmp_path) -> None:
+    store = OutcomeStore(tmp_path / "outcomes.json")
+    store.update(
+        [
+            ScenarioResult("ok", True, 1.0),
+            ScenarioResult("broken", False, 2.0),
+            ScenarioResult("edited", True, 1.0),
+            ScenarioResult("skipped", False, 0.0, skipped=True),
+        ],
+        {"ok": "h1", "broken": "h2", "edited": "h3", "skipped": "h4"},
+    )
+    current = snapshot(ok="h1", broken="h2", edited="h3-new", skipped="h4", new="h5")
+
+    assert store.select(current, MODE_ALL) == ["ok", "broken", "edited", "skipped", "new"]
+    assert store.select(current, MODE_FAILED) == ["broken"]
+    assert store.select(current, MODE_CHANGED) == ["edited", "skipped", "new"]
+    assert store.select(current, MODE_FAILED, ["ok"]) == []
+
+
+def test_rerun_overwrites_previous_outcome(tmp_path) -> None:
+    store = OutcomeStore(tmp_path / "outcomes.json")
+    store.update([ScenarioResult("s", False, 1.0)], {"s": "h"})
+    store.update([ScenarioResult("s", True, 1.0)], {"s": "h"})
+
+    assert store.select(snapshot(s="h"), MODE_FAILED) == []
+    with pytest.raises(ValueError):
+        store.select(snapshot(s="h"), "unknown")
+
+
+def test_variants_merge_into_one_outcome(tmp_path) -> None:
+    store = OutcomeStore(tmp_path / "outcomes.json")
+    store.update(
+        [
+            ScenarioResult("m", True, 1.0, variant="шаг 2: Да"),
+            ScenarioResult("m", False, 3.0, variant="шаг 2: Нет"),
+        ],
+        {"m": "h"},
+    )
+
+    assert store.load()["m"]["success"] is False
+    assert store.load()["m"]["duration"] == 3.0
+    assert store.select(snapshot(m="h"), MODE_FAILED) == ["m"]
@@ -0,0 +1,143 @@
+import asyncio
+
+import pytest
+
+from src.app import run_scenarios_concurrently
+from src.pool import CONNECTED, DISCONNECTED, UNAUTHORIZED, NoSessionError, SessionPool
+from src.scenarios import compile_scenario
+
+
+class FlakyAdapter:
+    """Адаптер, у которого соединение один раз «падает» на ping."""
+
+    def __init__(self, name: str, authorized: bool = True, ping_failures: int = 0):
+        self.name = name
+        self.authorized = authorized
+        self.ping_failures = ping_failures
+        self.connects = 0
+
+    async def connect(self) -> None:
+        self.connects += 1
+
+    async def disconnect(self) -> None:
+        return None
+
+    async def is_user_authorized(self) -> bool:
+        return self.authorized
+
+    async def ping(self) -> None:
+        if self.ping_failures:
+            self.ping_failures -= 1
+            raise ConnectionError("connection lost")
+
+
+@pytest.mark.asyncio
+async def test_start_skips_unauthorized_sessions() -> None:
+    good, bad = FlakyAdapter("good"), FlakyAdapter("bad", authorized=False)
+    pool = SessionPool([good, bad])
+    await pool.start()
+
+    assert pool.health() == {"good": {"state": CONNECTED}, "bad": {"state": UNAUTHORIZED}}
+    async with pool.lease() as adapter:
+        assert adapter is good
+
+
+@pytest.mark.asyncio
+async def test_keepalive_reconnects_dead_session() -> None:
+    adapter = FlakyAdapter("tester", ping_failures=1)
+    pool = SessionPool([adapter], keepalive_interval=0.01)
+    task = asyncio.create_task(pool.keepalive())
+    try:
+        await asyncio.sleep(0.1)
+    finally:
+        task.cancel()
+
+    assert adapter.connects == 2
+    assert pool.states[adapter] == CONNECTED
+
+
+@pytest.mark.asyncio
+async def test_keepalive_leaves_leased_session_alone() -> None:
+    adapter = FlakyAdapter("tester", ping_failures=1)
+    pool = SessionPool([adapter], keepalive_interval=0.01)
+    await pool.start()
+    task = asyncio.create_task(pool.keepalive())
+    try:
+        async with pool.lease():
+            await asyncio.sleep(0.05)
+            # Пока идет сценарий, сессию не пингуют и не переподключают
+            assert adapter.ping_failures == 1
+            assert adapter.connects == 1
+        await asyncio.sleep(0.05)
+    finally:
+        task.cancel()
+
+    assert adapter.connects == 2
+    assert pool.states[adapter] == CONNECTED
+
+
+@pytest.mark.asyncio
+async def test_lease_prefers_session_that_is_not_cooling_down() -> None:
+    cooling, ready = FlakyAdapter("cooling"), FlakyAdapter("ready")
+    cooling.cooldown = lambda: 30.0
+    ready.cooldown = lambda: 0.0
+    pool = SessionPool([cooling, ready])
+    await pool.start()
+
+    async with pool.lease() as adapter:
+        assert adapter is ready
+
+
+class DeadAdapter(FlakyAdapter):
+    """Аккаунт, который не подключается никогда."""
+
+    async def connect(self) -> None:
+        self.connects += 1
+        raise ConnectionError("network is unreachable")
+
+
+@pytest.mark.asyncio
+async def test_lease_skips_session_that_cannot_connect() -> None:
+    dead, good = DeadAdapter("dead"), FlakyAdapter("good")
+    pool = SessionPool([dead, good], reconnect_attempts=1)
+    await pool.start()
+    assert pool.states[dead] == DISCONNECTED
+
+    # Подключенная сессия — первой, отключенная пробуется, и lease ждет занятую живую
+    waiting = pool.lease()
+    async with pool.lease() as first:
+        assert first is good
+        second = asyncio.create_task(waiting.__aenter__())
+        await asyncio.sleep(0.01)
+        assert dead.connects == 2 and not second.done()
+    assert await second is good
+    await waiting.__aexit__(None, None, None)
+
+
+@pytest.mark.asyncio
+async def test_no_connectable_session_fails_scenarios_instead_of_suite() -> None:
+    dead = DeadAdapter("dead")
+    pool = SessionPool([dead], reconnect_attempts=1)
+    pool._semaphore, pool._idle = asyncio.Semaphore(1), [dead]  # пул, у которого сессия отвалилась
+    with pytest.raises(NoSessionError):
+        async with pool.lease():
+            pass
+
+    program = compile_scenario("s", [{"Шаги": 1, "Действие юзера": "/start", "Ответ бота": "Привет"}])
+    results = await run_scenarios_concurrently(pool, [("s", program), ("s", program)])
+    assert [(r.name, r.success, r.skipped) for r in results] == [("s", False, False)] * 2
+
+
+@pytest.mark.asyncio
+async def test_lease_waits_for_preferred_session() -> None:
+    a, b = FlakyAdapter("a"), FlakyAdapter("b")
+    pool = SessionPool([a, b])
+    await pool.start()
+
+    async with pool.lease(prefer="b") as adapter:
+        assert adapter is b
+        # Нужная сессия занята: свободную a resume не берет, а ждет b
+        waiting = asyncio.create_task(pool.lease(prefer="b").__aenter__())
+        await asyncio.sleep(0.01)
+        assert not waiting.done()
+    assert await waiting is b
@@ -0,0 +1,122 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+from telethon.errors import FloodWaitError, PhoneNumberUnoccupiedError, SessionPasswordNeededError
+
+from src.config import _manifest_sessions
+from src.provision import ERROR, OK, PoolManifest, provision_pool
+from src.testdc import dc_phone, get_confirmation_code
+
+
+class FakeClient:
+    """Telethon-клиент Test DC: номера из registered уже заняты, из protected — с паролем."""
+
+    registered: set[str] = set()
+    protected: set[str] = set()
+    flood_once: set[str] = set()
+    active = 0
+    peak = 0
+
+    def __init__(self, session_file, dc, throttle):
+        self.session_file = session_file
+        self.dc = dc
+        self.throttle = throttle
+        self.phone = None
+
+    async def connect(self):
+        self.session_file.touch()  # как SQLite-сессия Telethon
+        FakeClient.active += 1
+        FakeClient.peak = max(FakeClient.peak, FakeClient.active)
+
+    async def disconnect(self):
+        FakeClient.active -= 1
+
+    async def is_user_authorized(self):
+        return False
+
+    async def send_code_request(self, phone):
+        async def call():
+            if phone in FakeClient.flood_once:
+                FakeClient.flood_once.discard(phone)
+                raise FloodWaitError(request=None, capture=0)
+            return SimpleNamespace(phone_code_hash=f"hash-{phone}")
+
+        return await self.throttle.call(call, name="SendCodeRequest")
+
+    async def sign_in(self, phone, code, phone_code_hash):
+        assert code == get_confirmation_code(phone)
+        if phone in FakeClient.protected:
+            raise SessionPasswordNeededError(request=None)
+        if phone not in FakeClient.registered:
+            raise PhoneNumberUnoccupiedError(request=None)
+        self.phone = phone
+
+    async def sign_up(self, code, first_name, last_name="", *, phone, phone_code_hash):
+        FakeClient.registered.add(phone)
+        self.phone = phone
+
+    async def get_me(self):
+        return SimpleNamespace(id=int(self.phone))
+
+
+@pytest.fixture(autouse=True)
+def fake_telegram():
+    FakeClient.registered = {"9996620001"}
+    FakeClient.protected = set()
+    FakeClient.flood_once = set()
+    FakeClient.active = FakeClient.peak = 0
+    yield
+
+
+def test_dc_phones_and_codes() -> None:
+    assert dc_phone(2, 17) == "9996620017"
+    assert get_confirmation_code("9996620017") == "22222"
+    assert get_confirmation_code("+9996620017") == "22222"
+    assert get_confirmation_code("79991234567") is None
+    assert get_confirmation_code("9996600017") is None  # DC 0 нет
+    assert get_confirmation_code("99966200170") is None
+
+
+@pytest.mark.asyncio
+async def test_provision_pool_writes_manifest(tmp_path) -> None:
+    manifest = PoolManifest(tmp_path / "pool.json")
+    results = await provision_pool(
+        5, dc=2, start=1, concurrency=2, rate=0, session_dir=tmp_path,
+        manifest=manifest, client_factory=FakeClient,
+    )
+
+    assert [r.status for r in results] == [OK] * 5
+    assert [r.phone for r in results] == [f"999662000{n}" for n in range(1, 6)]
+    assert FakeClient.peak <= 2
+    assert _manifest_sessions(manifest.path) == [f"tester{n}" for n in range(1, 6)]
+
+
+@pytest.mark.asyncio
+async def test_rerun_provisions_only_missing_sessions(tmp_path) -> None:
+    manifest = PoolManifest(tmp_path / "pool.json")
+    FakeClient.protected = {"9996620002"}
+    first = await provision_pool(
+        3, start=1, rate=0, session_dir=tmp_path, manifest=manifest, client_factory=FakeClient
+    )
+    assert [r.status for r in first] == [OK, ERROR, OK]
+    assert manifest.load()["tester2"].error == "2FA password required"
+
+    FakeClient.protected = set()
+    second = await provision_pool(
+        4, start=50, rate=0, session_dir=tmp_path, manifest=manifest, client_factory=FakeClient
+    )
+    # Упавший и новый берут номера от нового start
+    assert [(r.name, r.phone) for r in second] == [("tester2", "9996620051"), ("tester4", "9996620053")]
+    data = json.loads(manifest.path.read_text(encoding="utf-8"))
+    assert [entry["status"] for entry in data["sessions"]] == [OK] * 4
+
+
+@pytest.mark.asyncio
+async def test_flood_wait_pauses_and_retries(tmp_path) -> None:
+    FakeClient.flood_once = {"9996620001"}
+    results = await provision_pool(
+        1, start=1, rate=0, session_dir=tmp_path,
+        manifest=PoolManifest(tmp_path / "pool.json"), client_factory=FakeClient,
+    )
+    assert results[0].status == OK
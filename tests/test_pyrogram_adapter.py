@@ -0,0 +1,95 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("pyrogram")
+
+from pyrogram.errors import BotResponseTimeout  # noqa: E402
+from pyrogram.types import (  # noqa: E402
+    InlineKeyboardButton,
+    InlineKeyboardMarkup,
+    KeyboardButton,
+    ReplyKeyboardMarkup,
+)
+
+from src.pyrogram_adapter import PyrogramConversationAdapter, PyrogramMessage  # noqa: E402
+
+BOT = "@jugru_conf_bot"
+
+
+def message(message_id: int, text: str, markup=None, username: str = "jugru_conf_bot", outgoing=False):
+    return SimpleNamespace(
+        id=message_id,
+        chat=SimpleNamespace(id=77, username=username),
+        text=text,
+        caption=None,
+        outgoing=outgoing,
+        reply_markup=markup,
+    )
+
+
+class FakeClient:
+    def __init__(self, callback_error=None):
+        self.callback_error = callback_error
+        self.callbacks = []
+        self.sent = []
+
+    async def request_callback_answer(self, chat_id, message_id, callback_data, timeout=10):
+        self.callbacks.append((chat_id, message_id, callback_data))
+        if self.callback_error:
+            raise self.callback_error
+
+    async def send_message(self, chat_id, text):
+        self.sent.append((chat_id, text))
+
+
+@pytest.mark.asyncio
+async def test_inline_button_sends_callback() -> None:
+    client = FakeClient()
+    markup = InlineKeyboardMarkup([[InlineKeyboardButton("Да", callback_data="yes")]])
+    wrapped = PyrogramMessage(client, message(5, "Продолжить?", markup))
+
+    assert wrapped.text == "Продолжить?" and not wrapped.out
+    assert [[b.text for b in row] for row in wrapped.buttons] == [["Да"]]
+    await wrapped.buttons[0][0].click()
+    assert client.callbacks == [(77, 5, "yes")]
+
+
+@pytest.mark.asyncio
+async def test_unanswered_callback_is_a_timeout() -> None:
+    client = FakeClient(callback_error=BotResponseTimeout())
+    markup = InlineKeyboardMarkup([[InlineKeyboardButton("Да", callback_data="yes")]])
+    button = PyrogramMessage(client, message(5, "?", markup)).buttons[0][0]
+
+    with pytest.raises(asyncio.TimeoutError):
+        await button.click()
+
+
+@pytest.mark.asyncio
+async def test_reply_keyboard_button_sends_its_text() -> None:
+    client = FakeClient()
+    markup = ReplyKeyboardMarkup([[KeyboardButton("Расписание"), "Помощь"]])
+    wrapped = PyrogramMessage(client, message(6, "Меню", markup))
+
+    await wrapped.buttons[0][1].click()
+    assert client.sent == [(77, "Помощь")]
+
+
+@pytest.mark.asyncio
+async def test_adapter_routes_bot_messages_to_conversation_and_collector() -> None:
+    adapter = PyrogramConversationAdapter("sessions/tester.session")
+    adapter.client = client = FakeClient()
+
+    async with adapter.conversation(BOT, timeout=0.1) as conv, adapter.collector(BOT) as collector:
+        await adapter._on_message(client, message(1, "Чужой", username="other_bot"))
+        await adapter._on_message(client, message(2, "Мое", outgoing=True))
+        await adapter._on_message(client, message(3, "Привет"))
+        await adapter._on_edited(client, message(3, "Привет!"))
+
+        response = await conv.get_response()
+        assert (response.id, response.text) == (3, "Привет")
+        with pytest.raises(asyncio.TimeoutError):
+            await conv.get_response()  # редактирование — не новый ответ
+        batch = await collector.collect(0.1, 0.01, 1)
+        assert [m.text for m in batch] == ["Привет!"]
@@ -0,0 +1,52 @@
+import pytest
+
+from src.app import ScenarioResult, run_scenarios_concurrently, scenario_repository
+from src.pool import SessionPool
+from src.reports import RunReport, read_index, read_run
+from src.simulator import simulator_for
+
+
+@pytest.mark.asyncio
+async def test_report_rotates_and_indexes_run(tmp_path) -> None:
+    report = await RunReport(tmp_path, "run1", max_bytes=200).start()
+    for step in range(10):
+        report({"event": "step", "scenario": "s", "step": step, "status": "passed"})
+
+    summary = await report.close([ScenarioResult("s", True, 0.5)])
+
+    assert summary["status"] == "passed"
+    assert len(report.files) > 1
+    assert report.files[:2] == ["run1.jsonl", "run1.1.jsonl"]
+    assert [r["step"] for r in read_run(tmp_path, "run1")] == list(range(10))
+    assert read_index(tmp_path)[0]["run_id"] == "run1"
+    assert read_run(tmp_path, "missing") is None
+
+
+@pytest.mark.asyncio
+async def test_report_prunes_old_runs(tmp_path) -> None:
+    for idx in range(4):
+        report = await RunReport(tmp_path, f"run{idx}", keep_runs=2).start()
+        report({"event": "step", "scenario": "s"})
+        await report.close([ScenarioResult("s", False, 0.1)])
+
+    assert [entry["run_id"] for entry in read_index(tmp_path)] == ["run3", "run2"]
+    assert not (tmp_path / "run0.jsonl").exists()
+    assert (tmp_path / "run3.jsonl").exists()
+
+
+@pytest.mark.asyncio
+async def test_report_collects_step_events_from_runner(tmp_path) -> None:
+    programs = list(scenario_repository.snapshot().programs.values())
+    pool = SessionPool([simulator_for(programs).adapter(events=False)])
+    await pool.start()
+    report = await RunReport(tmp_path, "sim").start()
+
+    results = await run_scenarios_concurrently(
+        pool, [(p.name, p) for p in programs], listeners=[report]
+    )
+    summary = await report.close(results)
+
+    finished = read_run(tmp_path, "sim", event="scenario_finished")
+    assert summary["passed"] == len(programs)
+    assert {r["scenario"] for r in finished} == {p.name for p in programs}
+    assert all(r["status"] == "passed" for r in read_run(tmp_path, "sim", event="step"))
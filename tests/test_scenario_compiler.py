@@ -0,0 +1,98 @@
+import os
+
+import pandas as pd
+import pytest
+
+from src.config import SCENARIO_FILE
+from src.scenarios import (
+    PressButton,
+    Repeat,
+    ScenarioCompileError,
+    ScenarioRepository,
+    SendOneOf,
+    UntilReply,
+    compile_scenario,
+    dependency_groups,
+    load_steps,
+)
+
+
+def test_compiles_scenarios_csv() -> None:
+    df = pd.read_csv(SCENARIO_FILE).dropna(subset=["Сценарий"])
+    for name, steps in df.groupby("Сценарий"):
+        program = compile_scenario(name, steps.to_dict("records"))
+        assert len(program) == len(steps)
+
+
+def test_stdlib_loader_matches_pandas() -> None:
+    df = pd.read_csv(SCENARIO_FILE).dropna(subset=["Сценарий"])
+    grouped = load_steps(SCENARIO_FILE)
+
+    assert list(grouped) == [name for name, _ in df.groupby("Сценарий")]
+    for name, steps in df.groupby("Сценарий"):
+        assert compile_scenario(name, grouped[name]) == compile_scenario(
+            name, steps.to_dict("records")
+        )
+
+
+def test_stdlib_loader_empty_cells() -> None:
+    text = 'Сценарий,Шаги,Действие юзера,Ответ бота\ns,1,"Привет\nмир",\n,2,/start,NA\n'
+    (record,) = load_steps(text)["s"]
+
+    assert record.get("Действие юзера") == "Привет\nмир"
+    assert record.get("Ответ бота") is None
+    assert record.get("Шаги") == 1
+
+
+def test_resolves_jumps_and_options() -> None:
+    rows = [
+        {"Шаги": 1, "Действие юзера": "Отправляет одно из сообщений:\n1. DS\n2. <профессия>"},
+        {"Шаги": 2, "Действие юзера": "Нажимает кнопку \"Выбрать\"", "Ответ бота": "Ок"},
+        {"Шаги": 3, "Действие юзера": "REPEAT 2-2 3"},
+        {"Шаги": 4, "Действие юзера": "UNTIL_REPLY 2 'Готово'"},
+    ]
+    one_of, button, repeat, until = compile_scenario("loops", rows).instructions
+
+    assert isinstance(one_of, SendOneOf) and one_of.options == ("DS", "Тестировщик")
+    assert isinstance(button, PressButton) and button.label == "Выбрать"
+    assert isinstance(repeat, Repeat) and (repeat.target, repeat.count) == (1, 3)
+    assert isinstance(until, UntilReply) and (until.target, until.trigger) == (1, "Готово")
+
+
+@pytest.mark.parametrize(
+    "action",
+    ["REPEAT 9-9 2", "UNTIL_REPLY без шага", "Нажимает кнопку без кавычек", ""],
+)
+def test_malformed_rows_fail_at_compile_time(action: str) -> None:
+    with pytest.raises(ScenarioCompileError):
+        compile_scenario("broken", [{"Шаги": 1, "Действие юзера": action}])
+
+
+def test_repository_reloads_only_on_change(tmp_path) -> None:
+    path = tmp_path / "scenarios.csv"
+    header = "Сценарий,Шаги,Действие юзера,Ответ бота,Что проверяем,Как запишем ошибку\n"
+    path.write_text(header + "s1,1,/start,Привет,,\n", encoding="utf-8")
+    repository = ScenarioRepository(path)
+
+    first = repository.snapshot()
+    assert repository.snapshot() is first
+
+    # Тот же контент с новым mtime — снимок не пересобирается
+    os.utime(path, ns=(0, 0))
+    assert repository.snapshot() is first
+
+    path.write_text(header + "s1,1,/start,Привет,,\ns2,1,/help,Помощь,,\n", encoding="utf-8")
+    second = repository.snapshot()
+    assert second is not first
+    assert second.names == ("s1", "s2")
+    assert first.names == ("s1",)
+
+
+def test_dependency_groups_are_topologically_ordered() -> None:
+    names = ["profile", "smoke", "register", "edit"]
+    dependencies = {"profile": ["register"], "edit": ["profile"], "ghost": ["smoke"]}
+
+    assert dependency_groups(names) == [[0], [1], [2], [3]]
+    assert dependency_groups(names, dependencies) == [[2, 0, 3], [1]]
+    with pytest.raises(ScenarioCompileError):
+        dependency_groups(["a", "b"], {"a": ["b"], "b": ["a"]})
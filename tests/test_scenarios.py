@@ -5,8 +5,13 @@ from typing import Any
 
 import pandas as pd
 import pytest
+from prometheus_client import REGISTRY
 
-from src.app import BotTester
+import src.app
+from src.app import BotTester, run_scenarios_concurrently
+from src.checkpoints import CheckpointStore
+from src.collector import ResponseCollector
+from src.pool import SessionPool
 
 
 @dataclass
@@ -183,3 +188,273 @@ async def test_negative_scenario(negative_steps: pd.DataFrame) -> None:
     tester = BotTester(conversation_adapter=FakeConversationAdapter(responses))
 
     assert await tester.run_scenario("negative", negative_steps) is False
+
+
+class SlowConversationAdapter(FakeConversationAdapter):
+    """Фейковый адаптер, который отвечает с задержкой и считает параллельные диалоги."""
+
+    active = 0
+    peak = 0
+
+    def __init__(self, responses: list[FakeMessage], delay: float = 0.05):
+        super().__init__(responses)
+        self.delay = delay
+
+    @asynccontextmanager
+    async def conversation(self, bot_username: str, timeout: int = 15) -> Any:
+        cls = SlowConversationAdapter
+        cls.active += 1
+        cls.peak = max(cls.peak, cls.active)
+        try:
+            await asyncio.sleep(self.delay)
+            yield FakeConversation(self.responses)
+        finally:
+            cls.active -= 1
+
+
+@pytest.mark.asyncio
+async def test_pool_runs_scenarios_concurrently(
+    happy_path_steps: pd.DataFrame, negative_steps: pd.DataFrame
+) -> None:
+    responses = [
+        FakeMessage("Welcome", buttons=[[FakeButton("Go")]]),
+        FakeMessage("Next"),
+    ]
+    pool = SessionPool(
+        [SlowConversationAdapter(responses) for _ in range(2)],
+        concurrency=2,
+    )
+    await pool.start()
+    try:
+        results = await run_scenarios_concurrently(
+            pool,
+            [("happy", happy_path_steps), ("negative", negative_steps)],
+        )
+    finally:
+        await pool.stop()
+
+    assert [(r.name, r.success) for r in results] == [("happy", True), ("negative", False)]
+    assert SlowConversationAdapter.peak == 2
+
+
+
+@pytest.mark.asyncio
+async def test_dependent_scenarios_share_session_and_skip_after_failure(
+    happy_path_steps: pd.DataFrame, negative_steps: pd.DataFrame
+) -> None:
+    responses = [
+        FakeMessage("Welcome", buttons=[[FakeButton("Go")]]),
+        FakeMessage("Next"),
+    ]
+    pool = SessionPool([FakeConversationAdapter(list(responses)) for _ in range(2)])
+    await pool.start()
+
+    results = await run_scenarios_concurrently(
+        pool,
+        [("after", happy_path_steps), ("negative", negative_steps), ("happy", happy_path_steps)],
+        dependencies={"after": ["negative"]},
+    )
+
+    assert [(r.name, r.success) for r in results] == [
+        ("after", False),
+        ("negative", False),
+        ("happy", True),
+    ]
+    assert results[0].duration == 0.0
+
+
+@pytest.mark.asyncio
+async def test_fail_fast_stops_remaining_scenarios(
+    happy_path_steps: pd.DataFrame, negative_steps: pd.DataFrame
+) -> None:
+    responses = [
+        FakeMessage("Welcome", buttons=[[FakeButton("Go")]]),
+        FakeMessage("Next"),
+    ]
+    slow = SlowConversationAdapter(list(responses), delay=5)
+    pool = SessionPool([FakeConversationAdapter(list(responses)), slow])
+    await pool.start()
+
+    results = await asyncio.wait_for(
+        run_scenarios_concurrently(
+            pool,
+            [("negative", negative_steps), ("slow", happy_path_steps), ("later", happy_path_steps)],
+            fail_fast=True,
+        ),
+        timeout=2,
+    )
+
+    assert [(r.name, r.success, r.skipped) for r in results] == [
+        ("negative", False, False),
+        ("slow", False, True),
+        ("later", False, True),
+    ]
+
+class CollectingAdapter(FakeConversationAdapter):
+    """Адаптер с подпиской на события: бот отвечает пачками сразу после сообщения."""
+
+    def __init__(self, script: dict[str, list[FakeMessage]]):
+        super().__init__([])
+        self.script = script
+        self._collector: ResponseCollector | None = None
+
+    @asynccontextmanager
+    async def conversation(self, bot_username: str, timeout: int = 15) -> Any:
+        adapter = self
+
+        class Conversation(FakeConversation):
+            async def send_message(self, message: str) -> None:
+                self.sent_messages.append(message)
+                for reply in adapter.script.get(message, []):
+                    adapter._collector.feed(reply)
+
+        yield Conversation([])
+
+    @asynccontextmanager
+    async def collector(self, bot_username: str) -> Any:
+        self._collector = ResponseCollector()
+        yield self._collector
+
+
+@pytest.mark.asyncio
+async def test_collector_groups_burst_and_skips_fixed_wait(monkeypatch) -> None:
+    # Короткие окна ожидания: прежний фиксированный sleep(1) не уложился бы в границу ниже
+    monkeypatch.setattr(src.app, "NO_REPLY_TIMEOUT", 0.1)
+    monkeypatch.setattr(src.app, "RESPONSE_SETTLE_MS", 20)
+    steps = [
+        {"Шаги": 1, "Действие юзера": "/start", "Ответ бота": "Вот пара докладов"},
+        {"Шаги": 2, "Действие юзера": "Нажимает кнопку 'Выбрать'", "Ответ бота": ""},
+    ]
+    adapter = CollectingAdapter(
+        {
+            "/start": [
+                FakeMessage("Вот пара докладов"),
+                FakeMessage("Доклад A", buttons=[[FakeButton("Выбрать")]]),
+            ]
+        }
+    )
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+
+    assert await BotTester(conversation_adapter=adapter).run_scenario("burst", steps) is True
+    # Пачка закрывается через settle, шаг без ожидаемого ответа ждет только NO_REPLY_TIMEOUT
+    assert loop.time() - started < 0.5
+
+
+@pytest.mark.asyncio
+async def test_settled_latency_excludes_settle_window(monkeypatch) -> None:
+    monkeypatch.setattr(src.app, "RESPONSE_SETTLE_MS", 300)
+    steps = [{"Шаги": 1, "Действие юзера": "/start", "Ответ бота": "Привет"}]
+    adapter = CollectingAdapter({"/start": [FakeMessage("Привет"), FakeMessage("Как дела?")]})
+    events: list[dict] = []
+
+    assert await BotTester(adapter, listeners=[events.append]).run_scenario("settled", steps) is True
+    (response,) = [e for e in events if e["event"] == "response"]
+    # Ответы пришли сразу: settled — время последнего сообщения, а не конец окна тишины
+    assert response["settled"] < 0.1
+
+
+@pytest.mark.asyncio
+async def test_step_latency_and_loops_are_recorded(repeat_steps: pd.DataFrame) -> None:
+    def sample(name: str, **labels: str) -> float:
+        return REGISTRY.get_sample_value(name, {"scenario": "metrics", **labels}) or 0.0
+
+    responses = [FakeMessage("Pong")] * 3 + [FakeMessage("Ok")]
+    tester = BotTester(conversation_adapter=FakeConversationAdapter(responses))
+
+    assert await tester.run_scenario("metrics", repeat_steps) is True
+    assert sample("bot_step_first_response_seconds_count", step="1") == 3
+    assert sample("bot_step_settled_seconds_count", step="3") == 1
+    assert sample("bot_loop_iterations_total", step="2", kind="repeat") == 2
+
+
+class FlakyConversation(FakeConversation):
+    """None в списке ответов — таймаут сети на этом месте."""
+
+    async def get_response(self) -> FakeMessage:
+        response = await super().get_response()
+        if response is None:
+            raise asyncio.TimeoutError("Flaky network")
+        return response
+
+
+class FlakyConversationAdapter(FakeConversationAdapter):
+    def __init__(self, responses: list[FakeMessage | None]):
+        super().__init__(responses)
+        self.conversations: list[FlakyConversation] = []
+
+    @asynccontextmanager
+    async def conversation(self, bot_username: str, timeout: int = 15) -> Any:
+        conversation = FlakyConversation(self.responses)
+        self.conversations.append(conversation)
+        yield conversation
+
+
+@pytest.mark.asyncio
+async def test_step_is_retried_after_timeout(repeat_steps: pd.DataFrame) -> None:
+    def retries() -> float:
+        return REGISTRY.get_sample_value("bot_step_retries_total", {"scenario": "retry", "step": "3"}) or 0.0
+
+    before = retries()
+    adapter = FlakyConversationAdapter([FakeMessage("Pong")] * 3 + [None, FakeMessage("Ok")])
+    events: list[dict] = []
+    tester = BotTester(adapter, listeners=[events.append], step_retries=1, retry_delay=0)
+
+    assert await tester.run_scenario("retry", repeat_steps) is True
+    assert adapter.conversations[0].sent_messages == ["Ping"] * 3 + ["Done", "Done"]
+    assert [e["attempt"] for e in events if e["event"] == "retry"] == [1]
+    assert retries() - before == 1
+
+    adapter = FlakyConversationAdapter([FakeMessage("Pong")] * 3 + [None, None])
+    tester = BotTester(adapter, step_retries=1, retry_delay=0)
+    assert await tester.run_scenario("retry", repeat_steps) is False
+    assert tester.failure_reason == "Таймаут ожидания ответа"
+
+
+@pytest.mark.asyncio
+async def test_failed_scenario_resumes_from_checkpoint(tmp_path, repeat_steps: pd.DataFrame) -> None:
+    store = CheckpointStore(tmp_path / "checkpoints.json")
+    adapter = FlakyConversationAdapter([FakeMessage("Pong")] * 3)
+    tester = BotTester(adapter, checkpoints=store, step_retries=0)
+    assert await tester.run_scenario("resume", repeat_steps) is False
+
+    # Второй прогон начинает с упавшего шага 3, а не с начала цикла
+    adapter = FlakyConversationAdapter([FakeMessage("Ok")])
+    events: list[dict] = []
+    tester = BotTester(adapter, listeners=[events.append], checkpoints=store)
+    assert await tester.run_scenario("resume", repeat_steps, resume=True) is True
+    assert adapter.conversations[0].sent_messages == ["Done"]
+    assert [e["step"] for e in events if e["event"] == "resumed"] == [3]
+    assert tester.last_bot_response == "Ok"
+
+    # Успешный прогон удаляет чекпоинт: следующий resume идет с начала
+    adapter = FlakyConversationAdapter([FakeMessage("Pong")] * 3 + [FakeMessage("Ok")])
+    tester = BotTester(adapter, checkpoints=store)
+    assert await tester.run_scenario("resume", repeat_steps, resume=True) is True
+    assert adapter.conversations[0].sent_messages[0] == "Ping"
+
+
+class SilentCallbackButton(FakeButton):
+    """Бот не отвечает на callback (нет answerCallbackQuery), но присылает сообщение."""
+
+    async def click(self) -> None:
+        await asyncio.Event().wait()
+
+
+@pytest.mark.asyncio
+async def test_button_resolved_from_earlier_message_without_callback_answer() -> None:
+    steps = [
+        {"Шаги": 1, "Действие юзера": "/start", "Ответ бота": "Привет"},
+        {"Шаги": 2, "Действие юзера": "Справка", "Ответ бота": "Это бот"},
+        {"Шаги": 3, "Действие юзера": "Нажимает кнопку 'да'", "Ответ бота": "Отлично"},
+    ]
+    responses = [
+        FakeMessage("Привет", buttons=[[SilentCallbackButton("✅ Да"), FakeButton("Нет")]]),
+        FakeMessage("Это бот"),
+        FakeMessage("Отлично"),
+    ]
+    tester = BotTester(conversation_adapter=FakeConversationAdapter(responses))
+
+    # Кэшировано сообщение без кнопок, а callback никогда не завершится
+    assert await asyncio.wait_for(tester.run_scenario("buttons", steps), timeout=5) is True
+    assert tester.last_bot_response == "Отлично"
@@ -0,0 +1,80 @@
+import os
+
+from telethon.crypto import AuthKey
+from telethon.sessions import SQLiteSession
+
+from src.sessions import SessionStore
+
+KEY = bytes(range(256))
+
+
+def make_sqlite_session(path, dc=(2, "149.154.167.40", 443)) -> None:
+    session = SQLiteSession(str(path))
+    session.set_dc(*dc)
+    session.auth_key = AuthKey(KEY)
+    session.save()
+    session.close()
+
+
+def test_sqlite_session_is_read_once_into_memory(tmp_path, monkeypatch) -> None:
+    path = tmp_path / "tester.session"
+    make_sqlite_session(path)
+    before = path.stat().st_mtime_ns
+    store = SessionStore()
+    reads = []
+    read = store._read
+    monkeypatch.setattr(store, "_read", lambda p: reads.append(p) or read(p))
+
+    first, second = store.session(path), store.session(path)
+
+    assert len(reads) == 1
+    assert (first.dc_id, first.server_address, first.port) == (2, "149.154.167.40", 443)
+    assert second.auth_key.key == KEY
+    first.save()  # Telethon вызывает save() на каждое подключение
+    assert path.stat().st_mtime_ns == before
+    assert not store.string_file(path).exists()
+
+
+def test_only_real_changes_are_persisted(tmp_path) -> None:
+    path = tmp_path / "tester.session"
+    make_sqlite_session(path)
+    session = SessionStore().session(path)
+
+    session.set_dc(2, "149.154.167.40", 443)
+    session.save()
+    assert not SessionStore.string_file(path).exists()
+
+    session.set_dc(2, "149.154.167.50", 443)
+    session.save()
+    assert SessionStore.string_file(path).exists()
+    if os.name == "posix":
+        assert SessionStore.string_file(path).stat().st_mode & 0o777 == 0o600
+
+    # Другой процесс (новый store) берет более свежую строку, а не SQLite
+    reloaded = SessionStore().session(path)
+    assert reloaded.server_address == "149.154.167.50"
+    assert reloaded.auth_key.key == KEY
+
+
+def test_newer_sqlite_session_wins_over_old_string(tmp_path) -> None:
+    path = tmp_path / "tester.session"
+    make_sqlite_session(path)
+    session = SessionStore().session(path)
+    session.set_dc(1, "149.154.175.10", 443)
+    session.save()
+    string_file = SessionStore.string_file(path)
+    os.utime(string_file, (1, 1))  # сессию потом пересоздали (provision/generate_session)
+
+    assert SessionStore().session(path).dc_id == 2
+
+
+def test_missing_or_foreign_session_is_unauthorized(tmp_path) -> None:
+    foreign = tmp_path / "pyrogram.session"
+    foreign.write_bytes(b"not a sqlite database")
+    store = SessionStore()
+
+    for path in (tmp_path / "missing.session", foreign):
+        session = store.session(path)
+        assert session.auth_key is None
+        assert session.save() == ""
+        assert not store.string_file(path).exists()
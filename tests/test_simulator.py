@@ -0,0 +1,78 @@
+import random
+
+import pytest
+
+from src.app import BotTester, run_scenarios_concurrently, scenario_repository
+from src.collector import supports_collector
+from src.pool import SessionPool
+from src.simulator import BotSpec, Latency, SimulatedBot, simulator_for
+
+SPEC = {
+    "initial": "start",
+    "states": {
+        "start": {
+            "text": {
+                "/start": {
+                    "replies": [
+                        {"text": "Привет!"},
+                        {"text": "Пойдем дальше?", "buttons": [["Да", "Нет"]]},
+                    ],
+                    "next": "ask",
+                }
+            }
+        },
+        "ask": {
+            "buttons": {
+                "Да": {"replies": [{"text": "Отлично!", "edit": True}], "next": "done"},
+            }
+        },
+    },
+}
+
+STEPS = [
+    {"Шаги": 1, "Действие юзера": "/start", "Ответ бота": "Привет"},
+    {"Шаги": 2, "Действие юзера": "Нажимает кнопку 'Да'", "Ответ бота": "Отлично"},
+]
+
+
+def test_latency_distributions() -> None:
+    rng = random.Random(1)
+    assert Latency(0.2).sample(rng) == 0.2
+    assert 0.1 <= Latency(0.1, 0.05).sample(rng) <= 0.15
+    assert Latency(0.1, 0.5, "normal").sample(rng) >= 0
+
+
+@pytest.mark.asyncio
+async def test_declarative_spec_with_burst_and_edit() -> None:
+    bot = SimulatedBot(BotSpec.from_dict(SPEC), latency=Latency(0.01, 0.01), burst_gap=0.01, seed=1)
+
+    adapter = bot.adapter()
+
+    assert await BotTester(adapter).run_scenario("spec", STEPS) is True
+    assert bot.messages_received == 1
+
+
+def test_events_flag_disables_collector_without_shadowing_it() -> None:
+    bot = SimulatedBot(BotSpec.from_dict(SPEC))
+
+    assert supports_collector(bot.adapter())
+    adapter = bot.adapter(events=False)
+    assert callable(adapter.collector)
+    assert not supports_collector(adapter)
+
+
+@pytest.mark.asyncio
+async def test_simulator_passes_scenarios_csv_concurrently() -> None:
+    programs = list(scenario_repository.snapshot().programs.values())
+    bot = simulator_for(programs)
+    pool = SessionPool([bot.adapter(f"user{i}", events=False) for i in range(4)])
+    await pool.start()
+    try:
+        results = await run_scenarios_concurrently(
+            pool, [(p.name, p) for p in programs for _ in range(10)]
+        )
+    finally:
+        await pool.stop()
+
+    assert len(results) == 10 * len(programs)
+    assert all(result.success for result in results)
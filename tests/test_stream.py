@@ -0,0 +1,66 @@
+import asyncio
+import json
+
+import pytest
+
+from src.app import ScenarioResult
+from src.jobs import COMPLETED, JobManager
+from src.stream import EventStream, format_sse
+
+
+@pytest.mark.asyncio
+async def test_stream_replays_history_then_follows_live_events() -> None:
+    stream = EventStream()
+    stream({"event": "step_started", "step": 1})
+
+    received = []
+
+    async def consume():
+        async for record in stream.subscribe():
+            received.append(record["event"])
+
+    consumer = asyncio.create_task(consume())
+    await asyncio.sleep(0)
+    stream({"event": "step", "step": 1})
+    stream.close({"event": "job_finished"})
+    await asyncio.wait_for(consumer, timeout=1)
+
+    assert received == ["step_started", "step", "job_finished"]
+
+
+@pytest.mark.asyncio
+async def test_stream_sends_heartbeat_while_step_waits() -> None:
+    stream = EventStream()
+    frames = stream.subscribe(heartbeat=0.01)
+
+    assert await asyncio.wait_for(frames.__anext__(), timeout=1) is None
+    await frames.aclose()
+
+
+def test_format_sse_frame() -> None:
+    frame = format_sse({"event": "step", "step": 2, "status": "passed"})
+
+    event_line, data_line, *_ = frame.split("\n")
+    assert event_line == "event: step"
+    assert json.loads(data_line.removeprefix("data: "))["status"] == "passed"
+    assert frame.endswith("\n\n")
+    assert format_sse(None).startswith(":")
+
+
+@pytest.mark.asyncio
+async def test_job_events_end_with_job_finished() -> None:
+    async def runner(job):
+        job.events({"event": "step", "scenario": "s", "step": 1})
+        return [ScenarioResult("s", True, 0.01)]
+
+    jobs = JobManager(runner)
+    await jobs.start()
+    job = jobs.submit("s")
+    await jobs.wait(job)
+
+    events = [record async for record in job.events.subscribe()]
+    await jobs.stop()
+
+    assert job.status == COMPLETED
+    assert [e["event"] for e in events] == ["job_started", "step", "job_finished"]
+    assert events[-1]["status"] == COMPLETED
@@ -0,0 +1,107 @@
+import asyncio
+import time
+
+import pytest
+from telethon.errors import FloodWaitError, ServerError
+
+from src.throttle import SessionThrottle, TokenBucket, is_throttled
+
+
+class FlakyCall:
+    def __init__(self, *errors):
+        self.errors = list(errors)
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return "ok"
+
+
+@pytest.mark.asyncio
+async def test_token_bucket_limits_rate_after_burst() -> None:
+    bucket = TokenBucket(rate=100, burst=2)
+    started = time.monotonic()
+    for _ in range(6):
+        await bucket.acquire()
+
+    assert time.monotonic() - started >= 0.035
+
+
+@pytest.mark.asyncio
+async def test_flood_wait_pauses_session_and_retries_any_request() -> None:
+    throttle = SessionThrottle("s", rate=0)
+    call = FlakyCall(FloodWaitError(request=None, capture=0))
+
+    assert await throttle.call(call, idempotent=False) == "ok"
+    assert call.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_flood_wait_slows_bucket_down_and_recovers() -> None:
+    throttle = SessionThrottle("s", rate=10, burst=10)
+    throttle.pause(0.05)
+
+    assert throttle.bucket.rate == 5
+    assert throttle.cooldown() > 0
+    await asyncio.sleep(0.06)
+    for _ in range(5):
+        await throttle.call(FlakyCall())
+    assert throttle.bucket.rate == 10
+
+
+@pytest.mark.asyncio
+async def test_long_flood_wait_is_not_waited_out() -> None:
+    throttle = SessionThrottle("s", rate=0, max_flood_wait=10)
+    call = FlakyCall(FloodWaitError(request=None, capture=300))
+
+    with pytest.raises(FloodWaitError):
+        await throttle.call(call)
+    assert call.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_transient_errors_retry_only_idempotent_requests() -> None:
+    throttle = SessionThrottle("s", rate=0, base_delay=0.001)
+
+    read = FlakyCall(ServerError(request=None, message="RPC_CALL_FAIL", code=500))
+    assert await throttle.call(read, idempotent=True) == "ok"
+    assert read.calls == 2
+
+    send = FlakyCall(ServerError(request=None, message="RPC_CALL_FAIL", code=500))
+    with pytest.raises(ServerError):
+        await throttle.call(send, idempotent=False)
+    assert send.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_pyrogram_errors_are_recognized() -> None:
+    errors = pytest.importorskip("pyrogram.errors")
+    throttle = SessionThrottle("s", rate=0, base_delay=0.001)
+
+    flood = FlakyCall(errors.FloodWait(value=0))
+    assert await throttle.call(flood, idempotent=False) == "ok"
+    assert flood.calls == 2
+
+    read = FlakyCall(errors.InternalServerError())
+    assert await throttle.call(read, idempotent=True) == "ok"
+    assert read.calls == 2
+
+
+def test_only_message_sends_take_tokens() -> None:
+    from telethon.tl import functions
+
+    assert is_throttled(functions.messages.SendMessageRequest("bot", "hi"))
+    assert not is_throttled(functions.messages.ReadHistoryRequest("bot", max_id=1))
+    assert not is_throttled(functions.messages.GetBotCallbackAnswerRequest("bot", 1, data=b"x"))
+
+
+@pytest.mark.asyncio
+async def test_unthrottled_requests_skip_bucket() -> None:
+    throttle = SessionThrottle("s", rate=0.01, burst=1)
+    await throttle.call(FlakyCall(), throttled=True)  # единственный токен потрачен
+
+    # Прочтение и нажатие кнопки не ждут токен (иначе ждали бы ~100 с)
+    for _ in range(3):
+        await asyncio.wait_for(throttle.call(FlakyCall(), idempotent=False, throttled=False), 1)
@@ -0,0 +1,116 @@
+import itertools
+import random
+
+import pytest
+
+from src.app import run_scenarios_concurrently
+from src.pool import SessionPool
+from src.scenarios import SendOneOf, compile_scenario
+from src.simulator import simulator_for
+from src.variants import (
+    CARTESIAN,
+    PAIRWISE,
+    SAMPLE,
+    cartesian,
+    check_expansion,
+    expand_program,
+    option_axes,
+    pairwise,
+    sample,
+)
+
+ROWS = [
+    {"Шаги": 1, "Действие юзера": "/start", "Ответ бота": "Привет"},
+    {"Шаги": 2, "Действие юзера": "Отправляет одно из:\n1. Дизайнер\n2. <название случайной профессии>"},
+    {"Шаги": 3, "Действие юзера": "Отправляет одно из:\n1. Да\n2. Нет\n3. Не знаю", "Ответ бота": "Понял"},
+]
+
+
+def test_pairwise_covers_every_pair_with_fewer_rows() -> None:
+    sizes = [3, 3, 3, 3]
+    rows = pairwise(sizes)
+
+    for i, j in itertools.combinations(range(len(sizes)), 2):
+        assert {(row[i], row[j]) for row in rows} == set(itertools.product(range(3), range(3)))
+    assert len(rows) < len(cartesian(sizes, limit=1000))
+
+
+def test_cartesian_limit_and_seeded_sample() -> None:
+    with pytest.raises(ValueError):
+        cartesian([10, 10, 10], limit=100)
+
+    first = sample([10, 10, 10], 15, random.Random(7))
+    assert first == sample([10, 10, 10], 15, random.Random(7))
+    assert len(set(first)) == 15
+    assert len(sample([2, 2], 15, random.Random(7))) == 4
+
+
+def test_expand_program_fixes_choices() -> None:
+    program = compile_scenario("matrix", ROWS)
+
+    variants = expand_program(program, CARTESIAN, placeholder_values=("Тестировщик", "Аналитик"))
+    assert len(variants) == 9
+    assert variants[0].variant == "шаг 2: Дизайнер; шаг 3: Да"
+    assert all(
+        len(step.options) == 1
+        for variant in variants
+        for step in variant.instructions
+        if isinstance(step, SendOneOf)
+    )
+    assert {v.instructions[1].options[0] for v in variants} == {"Дизайнер", "Тестировщик", "Аналитик"}
+
+    assert len(expand_program(program, PAIRWISE)) == 6  # без значений плейсхолдер — одно значение
+    assert expand_program(compile_scenario("plain", ROWS[:1]), SAMPLE)[0].variant is None
+
+
+def test_placeholder_is_marked_at_compile_time() -> None:
+    rows = [{"Шаги": 1, "Действие юзера": "Отправляет одно из:\n1. Тестировщик\n2. <профессия>"}]
+    program = compile_scenario("roles", rows)
+    assert program.instructions[0].placeholders == (1,)
+
+    # Настоящий вариант «Тестировщик» остается, раскрывается только плейсхолдер
+    assert option_axes(program, ("Аналитик", "Дизайнер")) == [(0, ("Тестировщик", "Аналитик", "Дизайнер"))]
+
+
+def test_check_expansion_rejects_cartesian_over_limit() -> None:
+    program = compile_scenario("matrix", ROWS)
+    with pytest.raises(ValueError):
+        check_expansion(program, CARTESIAN, limit=5)
+    check_expansion(program, CARTESIAN, limit=6)
+    check_expansion(program, PAIRWISE, limit=6)
+    with pytest.raises(ValueError):
+        check_expansion(program, PAIRWISE, limit=5)
+
+
+def test_pairwise_respects_limit() -> None:
+    with pytest.raises(ValueError):
+        pairwise([20, 20], limit=256)
+    with pytest.raises(ValueError):
+        pairwise([3, 3, 3, 3], limit=9)  # нижняя граница 9 проходит, жадное покрытие — нет
+    assert len(pairwise([3, 3, 3, 3], limit=20)) <= 20
+    with pytest.raises(ValueError):
+        expand_program(compile_scenario("matrix", ROWS), PAIRWISE, limit=5)
+
+
+@pytest.mark.asyncio
+async def test_variants_run_concurrently_with_results_per_variant() -> None:
+    program = compile_scenario("matrix", ROWS)
+    variants = expand_program(program, PAIRWISE)
+    bot = simulator_for([program])
+    pool = SessionPool([bot.adapter(f"user{i}", events=False) for i in range(3)])
+    events: list[dict] = []
+    await pool.start()
+    try:
+        results = await run_scenarios_concurrently(
+            pool, [(program.name, v) for v in variants], listeners=[events.append]
+        )
+    finally:
+        await pool.stop()
+
+    # Имя сценария (и метки метрик) без варианта, вариант — отдельным полем
+    assert {e["scenario"] for e in events} == {"matrix"}
+    assert {e["variant"] for e in events} == {v.variant for v in variants}
+
+    assert [r.name for r in results] == ["matrix"] * len(variants)
+    assert [r.variant for r in results] == [v.variant for v in variants]
+    assert all(r.success for r in results)